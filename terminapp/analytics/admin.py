@@ -1 +1,13 @@
-# Register your models here.
+# analytics/admin.py
+from django.contrib import admin
+from .models import Report
+
+
+@admin.register(Report)
+class ReportAdmin(admin.ModelAdmin):
+    list_display = ('name', 'report_type', 'company', 'user', 'status', 'computed_at', 'updated_at')
+    list_filter = ('report_type', 'status', 'company')
+    search_fields = ('name',)
+    readonly_fields = (
+        'status', 'error', 'computed_at', 'data_version', 'claimed_at', 'data', 'created_at', 'updated_at',
+    )
@@ -1,18 +1,21 @@
 # analytics/api.py
 from rest_framework import viewsets, status, permissions, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend, DateFromToRangeFilter
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-from cashflow.models import Transaction  # Добавлен импорт модели
+from cashflow.models import Transaction, normalize_tags  # Добавлен импорт модели
 from .models import Report
-from .services import get_cashflow_data, get_wallet_data
+from .cache import cached_report, current_data_version
+from jobs.services import enqueue
+from .services import get_cashflow_data, get_wallet_data, get_tag_data, get_category_rollup, get_pivot_12_data
 from .serializers import (
     ReportSerializer,
     CashflowAnalysisSerializer,
     CashflowTotalSerializer,
-    WalletBalanceSerializer
+    WalletBalanceSerializer,
+    TagCashflowSerializer,
+    CategoryRollupSerializer
 )
 import django_filters
 
@@ -23,7 +26,7 @@ class ReportFilter(django_filters.FilterSet):
 
     class Meta:
         model = Report
-        fields = ['name']
+        fields = ['name', 'report_type', 'status']
 
 
 class BaseViewSet(viewsets.GenericViewSet):
@@ -32,23 +35,71 @@ class BaseViewSet(viewsets.GenericViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     pagination_class = None
 
-    @method_decorator(cache_page(60 * 5))
-    def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+    @staticmethod
+    def _company(request):
+        """
+        Отчёты строятся только по компании запроса: без неё (главный домен,
+        админка, пользователь без компании) — 400, а не свод по всем компаниям.
+        """
+        company = getattr(request, 'current_company', None)
+        if company is None:
+            raise ValidationError({"detail": "Компания не определена."})
+        return company
 
 
 class ReportViewSet(BaseViewSet, viewsets.ModelViewSet):
-    """CRUD для аналитических отчетов"""
+    """
+    Сохранённые отчёты компании. Результат (data) считает фоновый воркер
+    (задача analytics.compute_report после создания/изменения, периодическая
+    analytics.compute_reports — после изменения данных компании);
+    API отдаёт сохранённый результат без расчёта.
+    is_stale — результат устарел и ждёт пересчёта.
+    """
     serializer_class = ReportSerializer
     filterset_class = ReportFilter
-    search_fields = ['name', 'data']
-    ordering_fields = ['created_at', 'updated_at', 'name']
+    search_fields = ['name']
+    ordering_fields = ['created_at', 'updated_at', 'computed_at', 'name']
     queryset = Report.objects.all()
 
     def get_queryset(self):
+        company = getattr(self.request, 'current_company', None)
+        if not company:
+            return Report.objects.none()
         return super().get_queryset().filter(
+            company=company,
             user=self.request.user
-        ).select_related('user')
+        ).select_related('user', 'company')
+
+    def get_serializer_context(self):
+        # Версия данных компании — одна на запрос: is_stale сравнивает
+        # с ней каждый отчёт списка без отдельного запроса
+        context = super().get_serializer_context()
+        company = getattr(self.request, 'current_company', None)
+        if company is not None:
+            context['data_version'] = current_data_version(company)
+        return context
+
+    @staticmethod
+    def _enqueue_compute(report):
+        enqueue('analytics.compute_report', {'report_id': report.pk}, dedupe_key=f'analytics.report:{report.pk}')
+
+    def perform_create(self, serializer):
+        report = serializer.save(company=self._company(self.request), user=self.request.user)
+        self._enqueue_compute(report)
+
+    def perform_update(self, serializer):
+        report = serializer.save()
+        if report.status == Report.STATUS_PENDING:
+            self._enqueue_compute(report)
+
+    @action(detail=True, methods=['post'])
+    def refresh(self, request, pk=None):
+        """Поставить отчёт в очередь на пересчёт (даже если данные не менялись)"""
+        report = self.get_object()
+        report.status = Report.STATUS_PENDING
+        report.save(update_fields=['status', 'updated_at'])
+        self._enqueue_compute(report)
+        return Response(self.get_serializer(report).data, status=status.HTTP_202_ACCEPTED)
 
 
 class AnalyticsFilter(django_filters.FilterSet):
@@ -89,26 +140,90 @@ class AnalyticsViewSet(BaseViewSet):
                 "detail": "Используйте кастомные экшены:",
                 "available_endpoints": {
                     "wallet_balances": "/wallet_balances/",
-                    "cashflow": "/cashflow/"
+                    "cashflow": "/cashflow/",
+                    "tags": "/tags/",
+                    "categories": "/categories/",
+                    "pivot": "/pivot/"
                 }
             },
             status=status.HTTP_200_OK
         )
 
+    def _filter_params(self, request) -> dict:
+        """
+        Проверенные параметры фильтра в именах аргументов сервисов.
+        Компания передаётся отдельно и в ключ кэша не входит (она в нём и так есть).
+        """
+        filterset = self.filterset_class(request.GET, queryset=self.queryset)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        params = filterset.form.cleaned_data
+        return {
+            'start_date': params.get('start_date'),
+            'end_date': params.get('end_date'),
+            'wallet_id': params.get('wallet'),
+            'activity_type': params.get('category_type') or None,
+        }
+
     @action(detail=False, methods=['get'], url_path='wallet_balances')
     def get_wallet_balances(self, request):
         """Балансы кошельков с фильтрацией"""
-        filters = self.filterset_class(request.GET, queryset=self.queryset).data
-        balances = get_wallet_data(**filters)
-        serializer = WalletBalanceSerializer(balances, many=True)
-        return Response(serializer.data)
+        company = self._company(request)
+        params = self._filter_params(request)
+        params.pop('activity_type')
+        return Response(cached_report(
+            'wallet_balances', company, params,
+            lambda: WalletBalanceSerializer(get_wallet_data(**params, company=company), many=True).data
+        ))
 
     @action(detail=False, methods=['get'])
     def cashflow(self, request):
         """Анализ денежных потоков с фильтрацией"""
-        filters = self.filterset_class(request.GET, queryset=self.queryset).data
-        data = get_cashflow_data(**filters)
-        return Response({
-            "details": CashflowAnalysisSerializer(data['details'], many=True).data,
-            "total": CashflowTotalSerializer(data['total']).data
-        })
\ No newline at end of file
+        company = self._company(request)
+        params = self._filter_params(request)
+
+        def compute():
+            data = get_cashflow_data(**params, company=company)
+            return {
+                "details": CashflowAnalysisSerializer(data['details'], many=True).data,
+                "total": CashflowTotalSerializer(data['total']).data
+            }
+
+        return Response(cached_report('cashflow', company, params, compute))
+
+    @action(detail=False, methods=['get'])
+    def tags(self, request):
+        """Движение денежных средств по меткам (?tags=промо,филиал — только эти метки)"""
+        company = self._company(request)
+        params = self._filter_params(request)
+        try:
+            tags = normalize_tags(request.GET.get('tags'))
+        except ValueError as exc:
+            return Response({'tags': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        params['tags'] = tags
+        return Response(cached_report(
+            'tags', company, params,
+            lambda: TagCashflowSerializer(get_tag_data(**params, company=company), many=True).data
+        ))
+
+    @action(detail=False, methods=['get'])
+    def categories(self, request):
+        """Итоги по статьям вместе с вложенными статьями"""
+        company = self._company(request)
+        params = self._filter_params(request)
+        params.pop('activity_type')
+        return Response(cached_report(
+            'categories', company, params,
+            lambda: CategoryRollupSerializer(get_category_rollup(**params, company=company), many=True).data
+        ))
+
+    @action(detail=False, methods=['get'])
+    def pivot(self, request):
+        """Pivot-отчёт: виды деятельности и статьи × 12 месяцев по end_date включительно"""
+        company = self._company(request)
+        params = self._filter_params(request)
+        params = {'end_date': params['end_date'], 'wallet_id': params['wallet_id']}
+        return Response(cached_report(
+            'pivot', company, params,
+            lambda: get_pivot_12_data(**params, company=company)
+        ))
@@ -0,0 +1,69 @@
+# analytics/cache.py
+"""
+Кэш готовых отчётов аналитики по компании.
+
+Ключ — (отчёт, компания, нормализованные параметры, версия данных компании).
+Версию данных (счётчик в БД, cashflow/data_version.py) меняет любая запись
+транзакций, кошельков и статей компании. Поэтому отчёт отдаётся из кэша, пока
+данные не изменились, и не бывает устаревшим; старые ключи просто
+вытесняются по таймауту (settings.ANALYTICS_CACHE_TIMEOUT). Кэш может быть
+и локальным для процесса: устаревание определяет версия из БД.
+Без компании отчёты не строятся (cached_report — ValueError).
+"""
+import hashlib
+import json
+from typing import Any, Callable, Dict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from cashflow.data_version import get_data_version
+from hr.models import Company
+
+# Сколько живёт запись отчёта, если данные не меняются (settings.ANALYTICS_CACHE_TIMEOUT переопределяет)
+DEFAULT_TIMEOUT = 60 * 60
+
+
+def get_timeout() -> int:
+    return getattr(settings, 'ANALYTICS_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+
+def current_data_version(company: Company) -> str:
+    """
+    Версия входных данных отчётов компании (из БД, общая для всех процессов).
+    """
+    return str(get_data_version(company.pk))
+
+
+def report_cache_key(report: str, company: Company, params: Dict[str, Any]) -> str:
+    """
+    Параметры нормализуются: пустые значения отбрасываются, ключи сортируются,
+    даты и числа приводятся к строкам — ?wallet=1&start_date= и ?wallet=1
+    дают один ключ.
+    """
+    normalized = {key: value for key, value in params.items() if value not in (None, '', [])}
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+    digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    return f'analytics:{report}:{company.pk}:{current_data_version(company)}:{digest}'
+
+
+def cached_report(
+        report: str,
+        company: Company,
+        params: Dict[str, Any],
+        compute: Callable[[], Any]
+) -> Any:
+    """
+    Результат compute() из кэша или вычисленный и сохранённый.
+    Версия читается до вычисления: если данные изменятся во время расчёта,
+    результат ляжет под уже устаревшую версию и не будет отдан.
+    """
+    if company is None:
+        # Без компании отчёт считался бы по всем компаниям сразу
+        raise ValueError("Отчёт аналитики строится только в рамках компании.")
+    key = report_cache_key(report, company, params)
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, get_timeout())
+    return result
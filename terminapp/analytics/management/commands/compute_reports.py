@@ -0,0 +1,39 @@
+# analytics/management/commands/compute_reports.py
+from django.core.management.base import BaseCommand, CommandError
+
+from hr.models import Company
+from analytics.services import compute_reports
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает сохранённые отчёты, данные которых изменились после расчёта "
+        "(или ещё не рассчитанные). Запускать по расписанию; параллельные запуски делят работу."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help="ID компании (по умолчанию — все компании)")
+        parser.add_argument('--force', action='store_true', help="Пересчитать все отчёты, даже актуальные")
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help="Отчётов в одной пачке (по умолчанию 50)",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError("--batch-size должен быть положительным.")
+
+        company = None
+        if options['company']:
+            try:
+                company = Company.objects.get(pk=options['company'])
+            except Company.DoesNotExist:
+                raise CommandError(f"Компания с id={options['company']} не найдена.")
+
+        stats = compute_reports(company=company, force=options['force'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Устаревших отчётов: {stats['checked']}, пересчитано: {stats['computed']}, "
+            f"с ошибкой: {stats['failed']}"
+        ))
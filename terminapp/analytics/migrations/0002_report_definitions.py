@@ -0,0 +1,71 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:43
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('hr', '0005_employee_created_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='report',
+            options={'verbose_name': 'Отчёт', 'verbose_name_plural': 'Отчёты'},
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reports', to='hr.company', verbose_name='Компания'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='computed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Рассчитан'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='data_version',
+            field=models.CharField(blank=True, max_length=80, verbose_name='Версия данных'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='error',
+            field=models.TextField(blank=True, verbose_name='Ошибка расчёта'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='filters',
+            field=models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Фильтры'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='report_type',
+            field=models.CharField(choices=[('cashflow', 'Движение денежных средств по видам деятельности'), ('monthly_categories', 'Помесячно по статьям'), ('wallet_balances', 'Балансы кошельков'), ('tags', 'По меткам'), ('categories', 'Итоги по дереву статей'), ('pivot', 'Pivot за 12 месяцев')], default='cashflow', max_length=32, verbose_name='Тип отчёта'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Ожидает расчёта'), ('ready', 'Рассчитан'), ('failed', 'Ошибка расчёта')], default='pending', max_length=16, verbose_name='Статус'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reports', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.AlterField(
+            model_name='report',
+            name='data',
+            field=models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Данные отчёта'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['company', 'status'], name='analytics_report_company_st'),
+        ),
+    ]
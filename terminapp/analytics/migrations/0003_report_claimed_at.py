@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_report_definitions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Взят на расчёт'),
+        ),
+    ]
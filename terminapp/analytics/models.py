@@ -1,16 +1,80 @@
 # analytics/models.py
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
+from hr.models import Company
+
 
 class Report(models.Model):
     """
-    Сохранённые данные аналитических отчётов.
+    Сохранённый отчёт: определение (тип + фильтры) и результат,
+    который считает фоновый воркер (manage.py compute_reports).
+    data_version — версия данных компании (cashflow.CompanyDataVersion,
+    счётчик в БД), по которой посчитан data; пока версия не изменилась,
+    пересчёт не нужен.
     """
+    TYPE_CASHFLOW = 'cashflow'
+    TYPE_MONTHLY_CATEGORIES = 'monthly_categories'
+    TYPE_WALLET_BALANCES = 'wallet_balances'
+    TYPE_TAGS = 'tags'
+    TYPE_CATEGORIES = 'categories'
+    TYPE_PIVOT = 'pivot'
+    TYPE_CHOICES = [
+        (TYPE_CASHFLOW, "Движение денежных средств по видам деятельности"),
+        (TYPE_MONTHLY_CATEGORIES, "Помесячно по статьям"),
+        (TYPE_WALLET_BALANCES, "Балансы кошельков"),
+        (TYPE_TAGS, "По меткам"),
+        (TYPE_CATEGORIES, "Итоги по дереву статей"),
+        (TYPE_PIVOT, "Pivot за 12 месяцев"),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_READY = 'ready'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Ожидает расчёта"),
+        (STATUS_READY, "Рассчитан"),
+        (STATUS_FAILED, "Ошибка расчёта"),
+    ]
+
     objects = None
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="reports",
+        null=True,
+        blank=True,
+        verbose_name="Компания"
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="reports",
+        verbose_name="Автор"
+    )
     name = models.CharField("Название отчёта", max_length=255)
+    report_type = models.CharField("Тип отчёта", max_length=32, choices=TYPE_CHOICES, default=TYPE_CASHFLOW)
+    filters = models.JSONField("Фильтры", default=dict, blank=True, encoder=DjangoJSONEncoder)
+    status = models.CharField("Статус", max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    error = models.TextField("Ошибка расчёта", blank=True)
+    computed_at = models.DateTimeField("Рассчитан", null=True, blank=True)
+    data_version = models.CharField("Версия данных", max_length=80, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    data = models.JSONField("Данные отчёта")
+    data = models.JSONField("Данные отчёта", null=True, blank=True, encoder=DjangoJSONEncoder)
+    # Отчёт взят воркером на расчёт (services.claim_reports); результат сохраняется,
+    # только если отметка не изменилась
+    claimed_at = models.DateTimeField("Взят на расчёт", null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'status'], name='analytics_report_company_st'),
+        ]
+        verbose_name = "Отчёт"
+        verbose_name_plural = "Отчёты"
 
     def __str__(self):
         return self.name
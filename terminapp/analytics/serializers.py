@@ -1,12 +1,96 @@
 # analytics/serializers.py
+from datetime import date
+
 from rest_framework import serializers
+
+from cashflow.models import Wallet, Category, normalize_tags
 from .models import Report
+from .services import REPORT_BUILDERS, is_report_stale
+
+
+class ReportFiltersSerializer(serializers.Serializer):
+    """
+    Фильтры сохранённого отчёта (какие из них допустимы, зависит от типа отчёта).
+    """
+    start_date = serializers.DateField(required=False, allow_null=True)
+    end_date = serializers.DateField(required=False, allow_null=True)
+    wallet_id = serializers.IntegerField(required=False, allow_null=True)
+    category_id = serializers.IntegerField(required=False, allow_null=True)
+    activity_type = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    tags = serializers.ListField(child=serializers.CharField(), required=False)
+
+    def validate_tags(self, value):
+        try:
+            return normalize_tags(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
+    def validate(self, attrs):
+        start_date, end_date = attrs.get('start_date'), attrs.get('end_date')
+        if start_date and end_date and start_date > end_date:
+            raise serializers.ValidationError("start_date не может быть позже end_date.")
+        return attrs
+
 
 class ReportSerializer(serializers.ModelSerializer):
+    is_stale = serializers.SerializerMethodField()
+
     class Meta:
         model = Report
-        fields = '__all__'
-        read_only_fields = ['created_at', 'updated_at']
+        fields = [
+            'id', 'name', 'report_type', 'filters', 'status', 'error', 'computed_at',
+            'data_version', 'is_stale', 'data', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['status', 'error', 'computed_at', 'data_version', 'data', 'created_at', 'updated_at']
+
+    def get_is_stale(self, obj):
+        return obj.company_id is not None and is_report_stale(obj, self.context.get('data_version'))
+
+    def validate(self, attrs):
+        report_type = attrs.get('report_type', self.instance.report_type if self.instance else Report.TYPE_CASHFLOW)
+        filters = attrs.get('filters', self.instance.filters if self.instance else {}) or {}
+        if not isinstance(filters, dict):
+            raise serializers.ValidationError({'filters': "Ожидается объект."})
+
+        _, allowed = REPORT_BUILDERS[report_type]
+        unknown = sorted(set(filters) - set(allowed))
+        if unknown:
+            raise serializers.ValidationError({
+                'filters': f"Недопустимые фильтры для отчёта {report_type}: {', '.join(unknown)}"
+            })
+        params = ReportFiltersSerializer(data=filters)
+        if not params.is_valid():
+            raise serializers.ValidationError({'filters': params.errors})
+        # Даты храним строками ГГГГ-ММ-ДД — так же, как они лежат в JSON
+        filters = {
+            key: value.isoformat() if isinstance(value, date) else value
+            for key, value in params.validated_data.items() if value not in (None, '', [])
+        }
+
+        company = getattr(self.context.get('request'), 'current_company', None)
+        if company is None:
+            raise serializers.ValidationError("Компания не определена.")
+        if 'wallet_id' in filters and not Wallet.objects.filter(pk=filters['wallet_id'], company=company).exists():
+            raise serializers.ValidationError({'filters': "Кошелёк не найден в компании."})
+        if 'category_id' in filters and not Category.objects.visible_to(company).filter(
+                pk=filters['category_id']).exists():
+            raise serializers.ValidationError({'filters': "Статья не найдена."})
+
+        attrs['filters'] = filters
+        if self.instance is None or report_type != self.instance.report_type or filters != self.instance.filters:
+            # Определение изменилось — прежний результат больше не соответствует отчёту;
+            # идущий расчёт старого определения теряет отметку и не сохранится
+            attrs['status'] = Report.STATUS_PENDING
+            attrs['claimed_at'] = None
+        return attrs
+
+    def update(self, instance, validated_data):
+        # Только изменённые поля: полный save() затёр бы результат,
+        # который воркер записал, пока шёл запрос
+        for name, value in validated_data.items():
+            setattr(instance, name, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
 
 class CashflowAnalysisSerializer(serializers.Serializer):
     activity_type = serializers.CharField(
@@ -24,4 +108,20 @@ class CashflowTotalSerializer(serializers.Serializer):
 
 class WalletBalanceSerializer(serializers.Serializer):
     wallet__name = serializers.CharField()
-    balance = serializers.DecimalField(max_digits=10, decimal_places=2)
\ No newline at end of file
+    balance = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+class TagCashflowSerializer(serializers.Serializer):
+    tag = serializers.CharField()
+    income = serializers.DecimalField(max_digits=12, decimal_places=2)
+    expense = serializers.DecimalField(max_digits=12, decimal_places=2)
+    net_flow = serializers.DecimalField(max_digits=12, decimal_places=2)
+    count = serializers.IntegerField()
+
+
+class CategoryRollupSerializer(serializers.Serializer):
+    category_id = serializers.IntegerField()
+    name = serializers.CharField()
+    parent_id = serializers.IntegerField(allow_null=True)
+    income = serializers.DecimalField(max_digits=12, decimal_places=2)
+    expense = serializers.DecimalField(max_digits=12, decimal_places=2)
+    net_flow = serializers.DecimalField(max_digits=12, decimal_places=2)
@@ -1,110 +1,157 @@
-from cashflow.models import Transaction
-from django.db.models import Sum, Case, When, F, DecimalField, Value
-from django.db.models.functions import ExtractMonth, ExtractYear
+from cashflow.models import (
+    Transaction, DailyCashflow, ClosedPeriod, PeriodClosingBalance,
+    DIRECTION_INCOME, DIRECTION_EXPENSE, normalize_tags,
+)
+from cashflow.reference import registry
+from hr.models import Company
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.db.models import Sum, F, Q, CharField, Value
+from django.db.models.functions import Cast, Coalesce, ExtractMonth, ExtractYear
 from collections import defaultdict
 from datetime import date, timedelta
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
 from django.db.models import QuerySet  # Добавьте этот импорт
 
 import decimal
 
+import numpy as np
 
-def _apply_filters(qs: QuerySet, filters: Dict) -> QuerySet:
-    """Применяет фильтры к QuerySet"""
+from .cache import current_data_version
+from .models import Report
+
+# Отметка claimed_at старше этого считается брошенной (воркер упал);
+# settings.ANALYTICS_REPORT_CLAIM_TIMEOUT переопределяет
+DEFAULT_CLAIM_TIMEOUT = timedelta(minutes=30)
+
+
+def _apply_filters(
+        qs: QuerySet,
+        filters: Dict,
+        date_field: str = 'date',
+        company: Optional[Company] = None
+) -> QuerySet:
+    """Применяет фильтры к QuerySet (Transaction или DailyCashflow с date_field='day')"""
     if start_date := filters.get('start_date'):
-        qs = qs.filter(date__gte=start_date)
+        qs = qs.filter(**{f'{date_field}__gte': start_date})
     if end_date := filters.get('end_date'):
-        qs = qs.filter(date__lte=end_date)
+        qs = qs.filter(**{f'{date_field}__lte': end_date})
     if wallet_id := filters.get('wallet_id'):
         qs = qs.filter(wallet_id=wallet_id)
     if category_id := filters.get('category_id'):
-        qs = qs.filter(category_id=category_id)
+        # Статья вместе со всеми вложенными — JOIN с замыканием дерева (CategoryClosure)
+        qs = qs.filter(category__ancestor_links__ancestor_id=category_id)
     if activity_type := filters.get('activity_type'):
-        qs = qs.filter(category__activity_type__name=activity_type)
+        qs = qs.filter(category_id__in=registry.category_ids_for_activity(activity_type, company))
     return qs
 
 
+def _next_month(month: date) -> date:
+    return (month.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _cashflow_sources(filters: Dict, company: Optional[Company] = None) -> List[Tuple[QuerySet, str]]:
+    """
+    Источники строк движения денег: [(QuerySet, поле даты)].
+    Для компании закрытые месяцы, целиком попадающие в период, читаются
+    из замороженных итогов PeriodClosingBalance, а дневной свод сканируется
+    только за остальные (открытые) дни. Без компании — только дневной свод.
+    """
+    daily = DailyCashflow.objects.all()
+    if company is None:
+        return [(_apply_filters(daily, filters, date_field='day'), 'day')]
+
+    daily = _apply_filters(daily.filter(company=company), filters, date_field='day', company=company)
+    start_date, end_date = filters.get('start_date'), filters.get('end_date')
+    frozen_months = [
+        month for month in ClosedPeriod.objects.filter(company=company).values_list('month', flat=True)
+        if (not start_date or month >= start_date)
+        and (not end_date or _next_month(month) - timedelta(days=1) <= end_date)
+    ]
+    if not frozen_months:
+        return [(daily, 'day')]
+
+    open_days = Q()
+    for month in frozen_months:
+        open_days |= Q(day__gte=month, day__lt=_next_month(month))
+    frozen = _apply_filters(
+        PeriodClosingBalance.objects.filter(company=company, month__in=frozen_months),
+        {key: value for key, value in filters.items() if key not in ('start_date', 'end_date')},
+        date_field='month',
+        company=company
+    )
+    return [(daily.exclude(open_days), 'day'), (frozen, 'month')]
+
+
+def _sources_sql(sources: List[Tuple[QuerySet, str]]) -> Tuple[str, List]:
+    """
+    SQL источников одним подзапросом (UNION ALL) с колонками
+    category_id, income, expense, net_flow, on_date — для отчётов,
+    итоги которых считает PostgreSQL (GROUP BY ROLLUP / GROUPING SETS).
+    """
+    # QuerySet.union() переименовывает колонки в col1..colN, поэтому ветки склеиваются вручную
+    parts, params = [], []
+    for qs, date_field in sources:
+        sql, part_params = qs.annotate(on_date=F(date_field)).values(
+            'category_id', 'income', 'expense', 'net_flow', 'on_date'
+        ).order_by().query.sql_with_params()
+        parts.append(sql)
+        params.extend(part_params)
+    return " UNION ALL ".join(parts), params
+
+
 def get_cashflow_data(
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
         wallet_id: Optional[int] = None,
         category_id: Optional[int] = None,
-        activity_type: Optional[str] = None
+        activity_type: Optional[str] = None,
+        company: Optional[Company] = None
 ) -> Dict:
     """
     Сводка движения денежных средств с фильтрацией
+    (дневной свод + замороженные итоги закрытых месяцев).
+    Строки по видам деятельности и общий итог — один запрос
+    с GROUP BY ROLLUP; строка итога отличается от статей
+    без вида деятельности по GROUPING().
     """
-    qs = _apply_filters(
-        Transaction.objects.all(),
+    sources = _cashflow_sources(
         {'start_date': start_date, 'end_date': end_date,
          'wallet_id': wallet_id, 'category_id': category_id,
-         'activity_type': activity_type}
+         'activity_type': activity_type},
+        company=company
     )
+    inner_sql, inner_params = _sources_sql(sources)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT a.name,
+                   GROUPING(a.name),
+                   COALESCE(SUM(s.income), 0),
+                   COALESCE(SUM(s.expense), 0),
+                   COALESCE(SUM(s.net_flow), 0)
+            FROM ({inner_sql}) AS s
+            JOIN cashflow_category c ON c.id = s.category_id
+            LEFT JOIN cashflow_activitytype a ON a.id = c.activity_type_id
+            GROUP BY ROLLUP (a.name)
+            ORDER BY GROUPING(a.name), a.name NULLS LAST
+            """,
+            inner_params
+        )
+        rows = cursor.fetchall()
 
-    data = qs.values(
-        activity_type=F('category__activity_type__name')
-    ).annotate(
-        income=Sum(
-            Case(
-                When(category__operation_type__in=['income', 'technical_income'], then=F('amount')),
-                default=Value(0),
-                output_field=DecimalField(),
-            )
-        ),
-        expense=Sum(
-            Case(
-                When(category__operation_type__in=['expense', 'technical_expense'], then=F('amount')),
-                default=Value(0),
-                output_field=DecimalField(),
-            )
-        ),
-        net_flow=Sum(
-            Case(
-                When(category__operation_type__in=['income', 'technical_income'], then=F('amount')),
-                When(category__operation_type__in=['expense', 'technical_expense'], then=-F('amount')),
-                default=Value(0),
-                output_field=DecimalField(),
-            )
-        ),
-    )
-
-    total = qs.aggregate(
-        income=Sum(
-            Case(
-                When(category__operation_type__in=['income', 'technical_income'], then=F('amount')),
-                default=Value(0),
-                output_field=DecimalField(),
-            )
-        ),
-        expense=Sum(
-            Case(
-                When(category__operation_type__in=['expense', 'technical_expense'], then=F('amount')),
-                default=Value(0),
-                output_field=DecimalField(),
-            )
-        ),
-        net_flow=Sum(
-            Case(
-                When(category__operation_type__in=['income', 'technical_income'], then=F('amount')),
-                When(category__operation_type__in=['expense', 'technical_expense'], then=-F('amount')),
-                default=Value(0),
-                output_field=DecimalField(),
-            )
-        ),
-    )
+    details, total = [], {'income': 0, 'expense': 0, 'net_flow': 0}
+    for name, is_total, income, expense, net_flow in rows:
+        values = {'income': income, 'expense': expense, 'net_flow': net_flow}
+        if is_total:
+            total = values
+        else:
+            details.append({'activity_type': name, **values})
 
     return {
-        'details': [{
-            'activity_type': item['activity_type'],
-            'income': item['income'] or 0,
-            'expense': item['expense'] or 0,
-            'net_flow': item['net_flow'] or 0
-        } for item in data],
-        'total': {
-            'income': total['income'] or 0,
-            'expense': total['expense'] or 0,
-            'net_flow': total['net_flow'] or 0
-        }
+        'details': details,
+        'total': total
     }
 
 
@@ -112,147 +159,448 @@ def get_monthly_category_data(
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
         wallet_id: Optional[int] = None,
-        activity_type: Optional[str] = None
+        activity_type: Optional[str] = None,
+        company: Optional[Company] = None
 ) -> Dict:
     """
     Месячный кэшфлоу по категориям с фильтрацией
+    (дневной свод + замороженные итоги закрытых месяцев).
+    Суммы по статьям, итоги месяцев и общий итог — один запрос
+    с GROUPING SETS ((месяц, статья), (месяц), ()).
     """
-    qs = _apply_filters(
-        Transaction.objects.all(),
+    sources = _cashflow_sources(
         {'start_date': start_date, 'end_date': end_date,
-         'wallet_id': wallet_id, 'activity_type': activity_type}
+         'wallet_id': wallet_id, 'activity_type': activity_type},
+        company=company
     )
-
-    monthly_data = qs.annotate(
-        month=ExtractMonth('date'),
-        year=ExtractYear('date')
-    ).values(
-        'year', 'month', 'category__name'
-    ).annotate(
-        net_flow=Sum(
-            Case(
-                When(category__operation_type__in=['income', 'technical_income'], then=F('amount')),
-                When(category__operation_type__in=['expense', 'technical_expense'], then=-F('amount')),
-                default=Value(0),
-                output_field=DecimalField(),
+    inner_sql, inner_params = _sources_sql(sources)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT EXTRACT(YEAR FROM s.on_date)::int AS year,
+                   EXTRACT(MONTH FROM s.on_date)::int AS month,
+                   s.category_id,
+                   GROUPING(s.category_id),
+                   GROUPING(EXTRACT(YEAR FROM s.on_date)::int),
+                   COALESCE(SUM(s.net_flow), 0)
+            FROM ({inner_sql}) AS s
+            GROUP BY GROUPING SETS (
+                (EXTRACT(YEAR FROM s.on_date)::int, EXTRACT(MONTH FROM s.on_date)::int, s.category_id),
+                (EXTRACT(YEAR FROM s.on_date)::int, EXTRACT(MONTH FROM s.on_date)::int),
+                ()
             )
+            ORDER BY 5, 1, 2, 4 DESC, 3
+            """,
+            inner_params
         )
-    ).order_by('year', 'month')
-
-    result = defaultdict(lambda: defaultdict(lambda: {'categories': [], 'total_net_flow': 0}))
+        rows = cursor.fetchall()
 
-    for item in monthly_data:
-        key = f"{item['year']}-{item['month']}"
-        result[key]['categories'].append({
-            'category': item['category__name'],
-            'net_flow': item['net_flow']
-        })
-        result[key]['total_net_flow'] += item['net_flow']
+    # Итог месяца идёт перед его статьями, общий итог — последней строкой
+    categories = registry.category_map({row[2] for row in rows if row[2] is not None})
+    result, grand_total = {}, 0
+    for year, month, category_id, is_month_total, is_grand_total, net_flow in rows:
+        if is_grand_total:
+            grand_total = net_flow
+        elif is_month_total:
+            result[f"{year}-{month}"] = {'categories': [], 'total_net_flow': net_flow}
+        else:
+            result[f"{year}-{month}"]['categories'].append({
+                'category': categories[category_id].name,
+                'net_flow': net_flow
+            })
 
     return {
-        'details': dict(result),
-        'grand_total_net_flow': sum(
-            month_data['total_net_flow']
-            for year_data in result.values()
-            for month_data in year_data.values()
-        )
+        'details': result,
+        'grand_total_net_flow': grand_total
     }
 
 
+def _to_cents(value) -> int:
+    return int(decimal.Decimal(value or 0).scaleb(2))
+
+
+def _from_cents(value) -> decimal.Decimal:
+    return decimal.Decimal(int(value)).scaleb(-2)
+
+
 def get_pivot_12_data(
         end_date: Optional[date] = None,
         wallet_id: Optional[int] = None,
-        category_id: Optional[int] = None
+        category_id: Optional[int] = None,
+        company: Optional[Company] = None
 ) -> Dict:
     """
-    Pivot-отчёт по Activity Types за период
+    Pivot-отчёт по Activity Types за 12 месяцев, заканчивая месяцем end_date.
+    Сгруппированные строки (месяц × статья) читаются одним проходом по своду,
+    раскладываются в плотную матрицу статьи × 12 месяцев (NumPy, суммы
+    в копейках int64 — без потерь точности, пустые клетки — нули),
+    итоги по строкам, блокам видов деятельности, месяцам и общий итог
+    считаются суммированием матрицы по осям.
+    Формат — periods / data[блоки] / categories / year_month_data,
+    как в templates/analytics/dashboard.html.
     """
     end_date = end_date or date.today()
-    start_date = end_date - timedelta(days=365)
+    last_month = end_date.year * 12 + end_date.month - 1
+    first_month = last_month - 11
+    periods = [(month // 12, month % 12 + 1) for month in range(first_month, last_month + 1)]
+    start_date = date(*periods[0], 1)
 
-    qs = _apply_filters(
-        Transaction.objects.filter(
-            date__range=(start_date, end_date)
-        ),
-        {'wallet_id': wallet_id, 'category_id': category_id}
+    sources = _cashflow_sources(
+        {'start_date': start_date, 'end_date': end_date,
+         'wallet_id': wallet_id, 'category_id': category_id},
+        company=company
     )
+    row_ids, col_ids, cents = [], [], []
+    for qs, date_field in sources:
+        # on_year/on_month: у замороженных итогов (PeriodClosingBalance) есть поле month
+        for item in qs.annotate(
+            on_year=ExtractYear(date_field),
+            on_month=ExtractMonth(date_field)
+        ).values(
+            'on_year', 'on_month', 'category_id'
+        ).annotate(
+            net_flow_sum=Sum('net_flow')
+        ).order_by():
+            row_ids.append(item['category_id'])
+            col_ids.append(item['on_year'] * 12 + item['on_month'] - 1 - first_month)
+            cents.append(_to_cents(item['net_flow_sum']))
 
-    pivot_data = qs.annotate(
-        year=ExtractYear('date'),
-        month=ExtractMonth('date')
-    ).values(
-        'year', 'month',
-        'category__activity_type__name',
-        'category__name'
-    ).annotate(
-        net_flow=Sum(
-            Case(
-                When(category__operation_type__in=['income', 'technical_income'], then=F('amount')),
-                When(category__operation_type__in=['expense', 'technical_expense'], then=-F('amount')),
-                default=Value(0),
-                output_field=DecimalField(),
-            )
+    # Строки матрицы — статьи, упорядоченные по виду деятельности (без вида — в конце) и названию
+    category_map = registry.category_map(set(row_ids))
+
+    def sort_key(cat_id):
+        category = category_map[cat_id]
+        activity = category.activity_type
+        return (activity is None, activity.name if activity else '', category.name, cat_id)
+
+    categories = sorted(set(row_ids), key=sort_key)
+    row_index = {cat_id: index for index, cat_id in enumerate(categories)}
+    matrix = np.zeros((len(categories), len(periods)), dtype=np.int64)
+    if cents:
+        np.add.at(
+            matrix,
+            (np.fromiter((row_index[cat_id] for cat_id in row_ids), dtype=np.intp, count=len(row_ids)),
+             np.asarray(col_ids, dtype=np.intp)),
+            np.asarray(cents, dtype=np.int64)
         )
-    )
+    row_totals = matrix.sum(axis=1)
 
-    # Обработка и группировка данных остается без изменений
-    ...
+    blocks, block_rows = [], []
+    for row, cat_id in enumerate(categories):
+        category = category_map[cat_id]
+        activity_name = category.activity_type.name if category.activity_type else 'Без вида деятельности'
+        if not blocks or blocks[-1]['activity_type'] != activity_name:
+            blocks.append({'activity_type': activity_name, 'categories': []})
+            block_rows.append(row)
+        blocks[-1]['categories'].append({
+            'category_id': cat_id,
+            'category': category.name,
+            'year_month_data': [
+                {'year': year, 'month': month, 'net_flow': _from_cents(value)}
+                for (year, month), value in zip(periods, matrix[row])
+            ],
+            'total': _from_cents(row_totals[row]),
+        })
+    # Итоги блоков: суммы по строкам блока (строки блока идут подряд)
+    for block, first_row in zip(blocks, block_rows):
+        month_totals = matrix[first_row:first_row + len(block['categories'])].sum(axis=0)
+        block['month_totals'] = [_from_cents(value) for value in month_totals]
+        block['total'] = _from_cents(month_totals.sum())
+
+    return {
+        'periods': periods,
+        'data': blocks,
+        'month_totals': [_from_cents(value) for value in matrix.sum(axis=0)],
+        'grand_total': _from_cents(matrix.sum()),
+    }
 
 
 def get_wallet_data(
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
-        wallet_id: Optional[int] = None
-) -> Dict:
+        wallet_id: Optional[int] = None,
+        company: Optional[Company] = None
+) -> List[Dict]:
     """
     Балансы кошельков с фильтрацией
+    (дневной свод + замороженные итоги закрытых месяцев)
     """
-    qs = _apply_filters(
-        Transaction.objects.all(),
-        {'start_date': start_date, 'end_date': end_date, 'wallet_id': wallet_id}
+    sources = _cashflow_sources(
+        {'start_date': start_date, 'end_date': end_date, 'wallet_id': wallet_id},
+        company=company
     )
 
-    return (
-        qs.values('wallet__name')
-        .annotate(
-            balance=Sum(
-                Case(
-                    When(category__operation_type__in=['income', 'technical_income'], then=F('amount')),
-                    When(category__operation_type__in=['expense', 'technical_expense'], then=-F('amount')),
-                    output_field=DecimalField(),
-                )
-            )
-        )
-        .order_by('wallet__name')
+    balances = defaultdict(lambda: 0)
+    for qs, _ in sources:
+        for item in qs.values('wallet__name').annotate(balance=Sum('net_flow')).order_by():
+            balances[item['wallet__name']] += item['balance'] or 0
+
+    return [
+        {'wallet__name': name, 'balance': balance}
+        for name, balance in sorted(balances.items())
+    ]
+
+
+def get_category_rollup(
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        wallet_id: Optional[int] = None,
+        company: Optional[Company] = None
+) -> List[Dict]:
+    """
+    Итоги по статьям с учётом вложенных: строки свода соединяются
+    с CategoryClosure по descendant_id и группируются по предку,
+    так что каждая статья получает сумму всего своего поддерева.
+    """
+    sources = _cashflow_sources(
+        {'start_date': start_date, 'end_date': end_date, 'wallet_id': wallet_id},
+        company=company
     )
 
+    totals = defaultdict(lambda: {'income': 0, 'expense': 0, 'net_flow': 0})
+    for qs, _ in sources:
+        for item in qs.values(
+            ancestor_id=F('category__ancestor_links__ancestor_id')
+        ).annotate(
+            income_sum=Sum('income'),
+            expense_sum=Sum('expense'),
+            net_flow_sum=Sum('net_flow'),
+        ).order_by():
+            row = totals[item['ancestor_id']]
+            for field in ('income', 'expense', 'net_flow'):
+                row[field] += item[f'{field}_sum'] or 0
+
+    categories = registry.category_map(totals)
+    result = []
+    for category_id, values in totals.items():
+        category = categories[category_id]
+        result.append({
+            'category_id': category_id,
+            'name': category.name,
+            'parent_id': category.parent_id,
+            **values
+        })
+    return sorted(result, key=lambda row: (row['name'], row['category_id']))
+
 
-def get_all_transactions(
+def get_tag_data(
         start_date: Optional[date] = None,
         end_date: Optional[date] = None,
         wallet_id: Optional[int] = None,
         category_id: Optional[int] = None,
-        activity_type: Optional[str] = None
-) -> tuple[QuerySet, decimal.Decimal]:
+        activity_type: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        company: Optional[Company] = None
+) -> List[Dict]:
     """
-    Возвращает отфильтрованные транзакции и общую сумму
+    Движение денежных средств в разрезе меток.
+    Метки не попадают в дневной свод, поэтому строки читаются из транзакций
+    и разворачиваются unnest(tags) в SQL. Транзакция с несколькими метками
+    учитывается в каждой из них — суммы по меткам не складываются в общий итог.
+    tags — только эти метки (фильтр tags && ARRAY[...] по GIN-индексу).
     """
     qs = _apply_filters(
-        Transaction.objects.select_related('wallet', 'category'),
+        Transaction.objects.all(),
         {'start_date': start_date, 'end_date': end_date,
          'wallet_id': wallet_id, 'category_id': category_id,
-         'activity_type': activity_type}
-    ).order_by('-date')
-
-    total_sum = qs.aggregate(
-        total=Sum(
-            Case(
-                When(category__operation_type__in=['income', 'technical_income'], then=F('amount')),
-                When(category__operation_type__in=['expense', 'technical_expense'], then=-F('amount')),
-                default=Value(0),
-                output_field=DecimalField(),
-            )
+         'activity_type': activity_type},
+        company=company
+    )
+    if company is not None:
+        qs = qs.filter(company=company)
+    tags = normalize_tags(tags)
+    if tags:
+        qs = qs.filter(tags__overlap=tags)
+
+    inner_sql, inner_params = qs.values('tags', 'amount', 'direction').query.sql_with_params()
+    tag_filter = "WHERE tag = ANY(%s)" if tags else ""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT tag,
+                   SUM(CASE WHEN t.direction = %s THEN t.amount ELSE 0 END),
+                   SUM(CASE WHEN t.direction = %s THEN t.amount ELSE 0 END),
+                   SUM(t.amount * t.direction),
+                   COUNT(*)
+            FROM ({inner_sql}) AS t
+            CROSS JOIN LATERAL unnest(t.tags) AS tag
+            {tag_filter}
+            GROUP BY tag
+            ORDER BY tag
+            """,
+            [DIRECTION_INCOME, DIRECTION_EXPENSE, *inner_params, *([tags] if tags else [])]
+        )
+        rows = cursor.fetchall()
+
+    return [
+        {'tag': tag, 'income': income, 'expense': expense, 'net_flow': net_flow, 'count': count}
+        for tag, income, expense, net_flow, count in rows
+    ]
+
+
+# Тип сохранённого отчёта -> (функция расчёта, допустимые фильтры)
+REPORT_BUILDERS = {
+    Report.TYPE_CASHFLOW: (
+        get_cashflow_data, ('start_date', 'end_date', 'wallet_id', 'category_id', 'activity_type')
+    ),
+    Report.TYPE_MONTHLY_CATEGORIES: (
+        get_monthly_category_data, ('start_date', 'end_date', 'wallet_id', 'activity_type')
+    ),
+    Report.TYPE_WALLET_BALANCES: (
+        get_wallet_data, ('start_date', 'end_date', 'wallet_id')
+    ),
+    Report.TYPE_TAGS: (
+        get_tag_data, ('start_date', 'end_date', 'wallet_id', 'category_id', 'activity_type', 'tags')
+    ),
+    Report.TYPE_CATEGORIES: (
+        get_category_rollup, ('start_date', 'end_date', 'wallet_id')
+    ),
+    Report.TYPE_PIVOT: (
+        get_pivot_12_data, ('end_date', 'wallet_id', 'category_id')
+    ),
+}
+
+
+def report_filter_kwargs(report_type: str, filters: Dict) -> Dict:
+    """
+    Аргументы функции расчёта из сохранённых фильтров отчёта
+    (даты в JSON хранятся строками ГГГГ-ММ-ДД).
+    """
+    _, allowed = REPORT_BUILDERS[report_type]
+    kwargs = {key: value for key, value in (filters or {}).items() if key in allowed}
+    for key in ('start_date', 'end_date'):
+        if isinstance(kwargs.get(key), str):
+            kwargs[key] = date.fromisoformat(kwargs[key])
+    return kwargs
+
+
+def is_report_stale(report: Report, data_version: Optional[str] = None) -> bool:
+    """
+    Отчёт нужно пересчитать: он ещё не рассчитан (или расчёт упал),
+    либо данные компании изменились после расчёта. Текущая версия читается
+    из БД (cashflow/data_version.py) — одинаково во всех процессах,
+    независимо от настроек кэша.
+    """
+    if report.status != Report.STATUS_READY:
+        return True
+    return report.data_version != (data_version or current_data_version(report.company))
+
+
+def stale_reports(reports: QuerySet) -> QuerySet:
+    """
+    Отчёты, которые нужно пересчитать (то же условие, что is_report_stale),
+    отобранные в SQL: версия данных компании берётся JOIN с
+    CompanyDataVersion, и актуальные отчёты не читаются вовсе.
+    Текущая версия — в аннотации current_data_version.
+    """
+    current = Cast(Coalesce('company__data_version__version', Value(0)), CharField())
+    return reports.annotate(current_data_version=current).filter(
+        ~Q(status=Report.STATUS_READY) | ~Q(data_version=F('current_data_version'))
+    )
+
+
+def claim_reports(reports: QuerySet, claim_timeout: Optional[timedelta] = None) -> List[Report]:
+    """
+    Берёт отчёты на расчёт: в короткой транзакции строки выбираются
+    FOR UPDATE SKIP LOCKED и получают отметку claimed_at. Отчёты, уже взятые
+    другим воркером (и не брошенные дольше claim_timeout), пропускаются.
+    Расчёт идёт вне транзакции; compute_report сохраняет результат,
+    только если отметка не изменилась.
+    """
+    claimed_at = timezone.now()
+    cutoff = claimed_at - (claim_timeout or getattr(settings, 'ANALYTICS_REPORT_CLAIM_TIMEOUT', DEFAULT_CLAIM_TIMEOUT))
+    with transaction.atomic():
+        ids = list(
+            reports.filter(Q(claimed_at__isnull=True) | Q(claimed_at__lt=cutoff))
+            .order_by('id')
+            .select_for_update(skip_locked=True, of=('self',))
+            .values_list('id', flat=True)
         )
-    )['total'] or 0
+        if not ids:
+            return []
+        Report.objects.filter(pk__in=ids).update(claimed_at=claimed_at)
+    return list(Report.objects.filter(pk__in=ids).select_related('company').order_by('id'))
+
+
+def release_report(report: Report) -> None:
+    """
+    Снимает отметку claim_reports без расчёта (отчёт уже актуален).
+    """
+    Report.objects.filter(pk=report.pk, claimed_at=report.claimed_at).update(claimed_at=None)
+    report.claimed_at = None
+
+
+def compute_report(report: Report) -> Optional[Report]:
+    """
+    Считает отчёт и сохраняет результат вместе с версией данных,
+    прочитанной до расчёта (изменение данных во время расчёта оставит
+    отчёт устаревшим, и следующий прогон его пересчитает).
+    Запись — условным UPDATE: если за время расчёта отчёт взял другой
+    воркер или изменилось определение (тип, фильтры), результат
+    отбрасывается и возвращается None.
+    """
+    builder, _ = REPORT_BUILDERS[report.report_type]
+    data_version = current_data_version(report.company)
+    try:
+        data = builder(**report_filter_kwargs(report.report_type, report.filters), company=report.company)
+    except Exception as exc:
+        changes = {'status': Report.STATUS_FAILED, 'error': str(exc)}
+    else:
+        changes = {
+            'data': data,
+            'status': Report.STATUS_READY,
+            'error': '',
+            'computed_at': timezone.now(),
+            'data_version': data_version,
+        }
+    changes.update(claimed_at=None, updated_at=timezone.now())
+    saved = Report.objects.filter(
+        pk=report.pk,
+        claimed_at=report.claimed_at,
+        report_type=report.report_type,
+        filters=report.filters,
+    ).update(**changes)
+    if not saved:
+        return None
+    for name, value in changes.items():
+        setattr(report, name, value)
+    return report
+
+
+def compute_reports(
+        company: Optional[Company] = None,
+        force: bool = False,
+        batch_size: int = 50
+) -> Dict[str, int]:
+    """
+    Пересчитывает устаревшие сохранённые отчёты (force — все).
+    Устаревшие отбираются в SQL (stale_reports), checked — сколько их нашлось.
+    Пачки берутся claim_reports (SKIP LOCKED в короткой транзакции):
+    параллельные воркеры и задачи analytics.compute_report делят работу
+    и не считают один отчёт одновременно. Каждый отчёт считается вне
+    транзакции и сохраняется своим условным UPDATE.
+    """
+    reports = Report.objects.filter(company__isnull=False).select_related('company')
+    if company is not None:
+        reports = reports.filter(company=company)
+    if not force:
+        reports = stale_reports(reports)
 
-    return qs, total_sum
\ No newline at end of file
+    stats = {'checked': 0, 'computed': 0, 'failed': 0}
+    last_id = 0
+    while True:
+        batch = list(reports.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].pk
+        stats['checked'] += len(batch)
+        versions = {report.pk: getattr(report, 'current_data_version', None) for report in batch}
+        for report in claim_reports(Report.objects.filter(pk__in=versions)):
+            # Пока отчёт ждал отметки, его мог пересчитать другой воркер
+            if not force and not is_report_stale(report, versions[report.pk]):
+                release_report(report)
+                continue
+            if compute_report(report) is None:
+                continue
+            stats['failed' if report.status == Report.STATUS_FAILED else 'computed'] += 1
+    return stats
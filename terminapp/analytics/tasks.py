@@ -0,0 +1,25 @@
+# analytics/tasks.py
+from hr.models import Company
+from jobs.registry import task
+from .models import Report
+from .services import claim_reports, compute_reports, compute_report
+
+
+@task('analytics.compute_reports', queue='reports')
+def compute_stale_reports(company_id=None, force=False):
+    company = Company.objects.get(pk=company_id) if company_id else None
+    return compute_reports(company=company, force=force)
+
+
+@task('analytics.compute_report', queue='reports')
+def compute_single_report(report_id):
+    """
+    Пересчёт одного отчёта сразу после создания/изменения/refresh,
+    не дожидаясь периодического compute_reports.
+    """
+    reports = claim_reports(Report.objects.filter(pk=report_id, company__isnull=False))
+    if not reports:
+        # Отчёта нет или его уже считает другой воркер
+        return {'status': None}
+    report = compute_report(reports[0])
+    return {'status': report.status if report is not None else None}
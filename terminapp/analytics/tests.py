@@ -1 +1,270 @@
-# Create your tests here.
+# analytics/tests.py
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from account.models import User
+from cashflow.data_version import get_data_version
+from cashflow.models import ActivityType, Category, Transaction
+from cashflow.services import create_wallet, create_transaction, close_period
+from hr.models import Company
+from .models import Report
+from .services import (
+    claim_reports, compute_report, compute_reports, is_report_stale,
+    get_cashflow_data, get_monthly_category_data, get_pivot_12_data,
+)
+
+
+class AnalyticsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'pw12345678')
+        self.company = Company.objects.create(name='Компания', subdomain='acme', owner=self.user)
+        self.wallet = create_wallet(self.company, 'Касса')
+        self.income = Category.objects.create(company=self.company, name='Продажи', operation_type='income')
+
+    def add(self, amount):
+        # Версия данных меняется после коммита — выполняем отложенные колбэки
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_transaction(self.company, self.wallet, self.income, Decimal(amount))
+
+
+def month_start(months_ago: int) -> date:
+    month = date.today().replace(day=1)
+    for _ in range(months_ago):
+        month = (month - timedelta(days=1)).replace(day=1)
+    return month
+
+
+class AggregationTestCase(AnalyticsTestCase):
+    """
+    Транзакции в нескольких месяцах и видах деятельности; старший месяц
+    закрыт — его итоги отчёты берут из замороженных сумм, а не из свода.
+    """
+    def setUp(self):
+        super().setUp()
+        operating = ActivityType.objects.create(company=self.company, name='Операционная')
+        investing = ActivityType.objects.create(company=self.company, name='Инвестиционная')
+        self.income.activity_type = operating
+        self.income.save()
+        self.supplies = Category.objects.create(
+            company=self.company, name='Закупки', operation_type='expense', activity_type=operating
+        )
+        self.equipment = Category.objects.create(
+            company=self.company, name='Оборудование', operation_type='expense', activity_type=investing
+        )
+        self.other = Category.objects.create(company=self.company, name='Прочее', operation_type='income')
+        for months_ago, amount, category in [
+            (13, '500', self.income),
+            (3, '100', self.income), (3, '40', self.supplies), (3, '25.50', self.equipment),
+            (1, '70', self.income), (1, '12.25', self.other),
+            (0, '30', self.supplies), (0, '9.99', self.income),
+        ]:
+            Transaction.objects.create(
+                company=self.company, wallet=self.wallet, category=category,
+                amount=Decimal(amount), date=month_start(months_ago) + timedelta(days=1)
+            )
+        close_period(self.company, month_start(3))
+
+    def reference(self, start_date):
+        """Эталон: net_flow по (год, месяц, статья) прямо из транзакций."""
+        sums = defaultdict(Decimal)
+        for tx in Transaction.objects.filter(company=self.company, date__gte=start_date):
+            sums[(tx.date.year, tx.date.month, tx.category_id)] += tx.amount * tx.direction
+        return sums
+
+
+class PivotTests(AggregationTestCase):
+    def test_pivot_matches_reference_aggregation(self):
+        expected = self.reference(month_start(11))
+
+        pivot = get_pivot_12_data(company=self.company)
+
+        self.assertEqual(len(pivot['periods']), 12)
+        cells = {}
+        for block in pivot['data']:
+            for row in block['categories']:
+                for cell in row['year_month_data']:
+                    cells[(cell['year'], cell['month'], row['category_id'])] = cell['net_flow']
+                self.assertEqual(row['total'], sum(cell['net_flow'] for cell in row['year_month_data']))
+        self.assertEqual({key: value for key, value in cells.items() if value}, expected)
+        self.assertEqual(
+            pivot['month_totals'],
+            [sum(value for (y, m, _), value in expected.items() if (y, m) == period) for period in pivot['periods']],
+        )
+        self.assertEqual(pivot['grand_total'], sum(expected.values()))
+        self.assertEqual(
+            [block['activity_type'] for block in pivot['data']],
+            ['Инвестиционная', 'Операционная', 'Без вида деятельности'],
+        )
+
+
+class RollupTests(AggregationTestCase):
+    def test_cashflow_rows_and_total_match_reference(self):
+        expected = defaultdict(lambda: {'income': Decimal('0'), 'expense': Decimal('0'), 'net_flow': Decimal('0')})
+        for tx in Transaction.objects.filter(company=self.company).select_related('category__activity_type'):
+            activity = tx.category.activity_type.name if tx.category.activity_type else None
+            for key in (activity, 'total'):
+                expected[key]['income' if tx.direction > 0 else 'expense'] += tx.amount
+                expected[key]['net_flow'] += tx.amount * tx.direction
+
+        data = get_cashflow_data(company=self.company)
+
+        self.assertEqual(
+            {row['activity_type']: {k: row[k] for k in ('income', 'expense', 'net_flow')} for row in data['details']},
+            {key: values for key, values in expected.items() if key != 'total'},
+        )
+        self.assertEqual(data['total'], expected['total'])
+
+    def test_monthly_totals_match_reference(self):
+        expected = self.reference(date.min)
+        names = dict(Category.objects.filter(company=self.company).values_list('id', 'name'))
+
+        data = get_monthly_category_data(company=self.company)
+
+        months = {(y, m) for y, m, _ in expected}
+        self.assertEqual(set(data['details']), {f'{y}-{m}' for y, m in months})
+        for year, month in months:
+            details = data['details'][f'{year}-{month}']
+            in_month = {cat: value for (y, m, cat), value in expected.items() if (y, m) == (year, month)}
+            self.assertEqual(
+                sorted((row['category'], row['net_flow']) for row in details['categories']),
+                sorted((names[cat], value) for cat, value in in_month.items()),
+            )
+            self.assertEqual(details['total_net_flow'], sum(in_month.values()))
+        self.assertEqual(data['grand_total_net_flow'], sum(expected.values()))
+
+
+class DataVersionTests(AnalyticsTestCase):
+    def test_write_bumps_company_version_after_commit(self):
+        before = get_data_version(self.company.pk)
+
+        self.add('5')
+
+        self.assertGreater(get_data_version(self.company.pk), before)
+
+    def test_other_company_version_is_unchanged(self):
+        other_owner = User.objects.create_user('other@example.com', 'pw12345678')
+        other = Company.objects.create(name='Другая', subdomain='other', owner=other_owner)
+        before = get_data_version(other.pk)
+
+        self.add('5')
+
+        self.assertEqual(get_data_version(other.pk), before)
+
+
+class ComputeReportsTests(AnalyticsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.report = Report.objects.create(
+            company=self.company, user=self.user, name='Балансы', report_type=Report.TYPE_WALLET_BALANCES
+        )
+
+    def balance(self):
+        self.report.refresh_from_db()
+        return Decimal(self.report.data[0]['balance'])
+
+    def test_recomputes_after_data_change(self):
+        self.add('10')
+        self.assertEqual(compute_reports()['computed'], 1)
+        self.assertEqual(self.balance(), Decimal('10'))
+
+        self.add('5')
+        self.report.refresh_from_db()
+        self.assertTrue(is_report_stale(self.report))
+
+        self.assertEqual(compute_reports()['computed'], 1)
+        self.assertEqual(self.balance(), Decimal('15'))
+        self.assertFalse(is_report_stale(self.report))
+
+    def test_fresh_report_is_not_recomputed(self):
+        self.add('10')
+        compute_reports()
+
+        stats = compute_reports()
+
+        self.assertEqual(stats, {'checked': 0, 'computed': 0, 'failed': 0})
+
+    def test_claimed_report_is_skipped(self):
+        claimed = claim_reports(Report.objects.filter(pk=self.report.pk))
+
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(claim_reports(Report.objects.filter(pk=self.report.pk)), [])
+        self.assertEqual(compute_reports()['computed'], 0)
+
+        self.assertIsNotNone(compute_report(claimed[0]))
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.status, Report.STATUS_READY)
+        self.assertIsNone(self.report.claimed_at)
+
+    def test_result_is_dropped_when_definition_changes(self):
+        claimed = claim_reports(Report.objects.filter(pk=self.report.pk))[0]
+        client = APIClient(HTTP_HOST='acme.lvh.me')
+        client.force_authenticate(self.user)
+        response = client.patch(
+            f'/api/analytics/reports/{self.report.pk}/', {'filters': {'wallet_id': self.wallet.pk}}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertIsNone(compute_report(claimed))
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.status, Report.STATUS_PENDING)
+
+
+class AnalyticsApiTests(AnalyticsTestCase):
+    def test_reports_require_current_company(self):
+        client = APIClient(HTTP_HOST='admin.lvh.me')
+        client.force_authenticate(self.user)
+
+        response = client.get('/api/analytics/analytics/wallet_balances/')
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_reports_are_scoped_to_company(self):
+        self.add('7')
+        other_owner = User.objects.create_user('other@example.com', 'pw12345678')
+        Company.objects.create(name='Другая', subdomain='other', owner=other_owner)
+        client = APIClient(HTTP_HOST='other.lvh.me')
+        client.force_authenticate(other_owner)
+
+        response = client.get('/api/analytics/analytics/wallet_balances/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [])
+
+    def test_report_list_reads_data_version_once(self):
+        client = APIClient(HTTP_HOST='acme.lvh.me')
+        client.force_authenticate(self.user)
+
+        def list_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get('/api/analytics/reports/')
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        def ready_report(name):
+            # Рассчитанный отчёт: is_stale сравнивает его версию с текущей
+            Report.objects.create(
+                company=self.company, user=self.user, name=name, report_type=Report.TYPE_TAGS,
+                status=Report.STATUS_READY, data_version='0',
+            )
+
+        ready_report('Один')
+        single = list_queries()
+        ready_report('Два')
+        ready_report('Три')
+
+        self.assertEqual(list_queries(), single)
+
+    def test_report_create_requires_current_company(self):
+        client = APIClient(HTTP_HOST='admin.lvh.me')
+        client.force_authenticate(self.user)
+
+        response = client.post('/api/analytics/reports/', {'name': 'Теги', 'report_type': 'tags'}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Report.objects.exists())
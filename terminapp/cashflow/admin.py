@@ -1,20 +1,41 @@
 # cashflow/admin.py
 from django.contrib import admin
-from .models import Wallet, Category, Transaction, ActivityType
+from .models import (
+    Wallet, WalletBalance, WalletBalanceCheckpoint, DailyCashflow, Category, Transaction, ActivityType, Transfer,
+    ClosedPeriod, PeriodClosingBalance, RecurringTransaction,
+)
 
 
 @admin.register(Wallet)
 class WalletAdmin(admin.ModelAdmin):
     list_display = ('name', 'company', 'created_at', 'updated_at' )
 
+@admin.register(WalletBalance)
+class WalletBalanceAdmin(admin.ModelAdmin):
+    list_display = ('wallet', 'balance', 'income_total', 'expense_total', 'updated_at')
+    readonly_fields = ('wallet', 'balance', 'income_total', 'expense_total', 'updated_at')
+
+@admin.register(WalletBalanceCheckpoint)
+class WalletBalanceCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('wallet', 'day', 'balance', 'created_at')
+    list_filter = ('day',)
+    readonly_fields = ('wallet', 'day', 'balance', 'created_at')
+
+@admin.register(DailyCashflow)
+class DailyCashflowAdmin(admin.ModelAdmin):
+    list_display = ('day', 'company', 'wallet', 'category', 'income', 'expense', 'net_flow')
+    list_filter = ('company', 'day')
+
 @admin.register(ActivityType)
 class ActivityTypeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name')
+    list_display = ('id', 'name', 'company')
+    list_filter = ('company',)
     search_fields = ('name',)
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('name', 'operation_type', 'description')
+    list_display = ('name', 'operation_type', 'parent', 'company', 'description')
+    list_filter = ('company', 'operation_type')
 
 
 @admin.register(Transaction)
@@ -30,3 +51,45 @@ class TransactionAdmin(admin.ModelAdmin):
         return obj.transaction_type
 
     transaction_type_display.short_description = "Тип транзакции"
+
+
+@admin.register(Transfer)
+class TransferAdmin(admin.ModelAdmin):
+    list_display = ('date', 'company', 'from_wallet', 'to_wallet', 'amount', 'created_at')
+    list_filter = ('company', 'date')
+
+    # Перевод пишется вместе с ногами только через services.create_transfer()
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ClosedPeriod)
+class ClosedPeriodAdmin(admin.ModelAdmin):
+    list_display = ('company', 'month', 'closed_at', 'closed_by')
+    list_filter = ('company',)
+    readonly_fields = ('company', 'month', 'closed_at', 'closed_by')
+
+    # Закрытие/открытие — через API или manage.py close_period (замораживает итоги)
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(PeriodClosingBalance)
+class PeriodClosingBalanceAdmin(admin.ModelAdmin):
+    list_display = ('month', 'company', 'wallet', 'category', 'income', 'expense', 'net_flow')
+    list_filter = ('company', 'month')
+
+
+@admin.register(RecurringTransaction)
+class RecurringTransactionAdmin(admin.ModelAdmin):
+    list_display = (
+        'company', 'wallet', 'category', 'amount', 'frequency', 'interval',
+        'start_date', 'end_date', 'is_active', 'generated_until',
+    )
+    list_filter = ('company', 'frequency', 'is_active')
+    readonly_fields = ('generated_until', 'created_at')
@@ -1,32 +1,68 @@
 # cashflow/api.py
 
-from rest_framework import viewsets, filters, permissions
+from datetime import date, datetime
+
+from django.http import StreamingHttpResponse
+from rest_framework import viewsets, filters, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import Transaction, Wallet, Category, ActivityType
+from idempotency.api import IdempotentCreateMixin
+from .models import (
+    Transaction, Wallet, Category, ActivityType, Transfer, ClosedPeriod, RecurringTransaction, PeriodClosedError,
+)
 from .serializers import (
     TransactionSerializer,
     WalletSerializer,
     CategorySerializer,
-    ActivityTypeSerializer
+    ActivityTypeSerializer,
+    TransactionImportSerializer,
+    TransferSerializer,
+    ClosedPeriodSerializer,
+    RecurringTransactionSerializer,
 )
+from .pagination import TransactionKeysetPagination
 # Импортируем функции из service.py
 from .services import (
     create_wallet,
     create_transaction,
     get_wallets_for_company,
     parse_transaction_filters,
-    get_filtered_transactions
+    get_filtered_transactions,
+    with_window_totals,
+    read_window_totals,
+    filter_totals,
+    parse_transaction_import,
+    bulk_create_transactions,
+    iter_transactions_export,
+    get_wallet_balance_as_of,
+    iter_wallet_statement,
+    create_transfer,
+    close_period,
+    reopen_period,
 )
 
 
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
 class BaseViewSet(viewsets.ModelViewSet):
     """Базовый ViewSet с общими настройками."""
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     permission_classes = [permissions.IsAuthenticated]  # или IsAuthenticatedOrReadOnly
     pagination_class = None  # Можно подключить PageNumberPagination
 
+    def handle_exception(self, exc):
+        # Изменение закрытого месяца — ошибка клиента (400), а не сервера
+        if isinstance(exc, PeriodClosedError):
+            exc = ValidationError({"detail": str(exc)})
+        return super().handle_exception(exc)
+
 
 class WalletViewSet(BaseViewSet):
     serializer_class = WalletSerializer
@@ -57,8 +93,54 @@ class WalletViewSet(BaseViewSet):
         )
         serializer.instance = wallet
 
+    @action(detail=True, methods=['get'])
+    def balance(self, request, pk=None):
+        """
+        Остаток кошелька на конец дня: ?as_of=ГГГГ-ММ-ДД (по умолчанию — сегодня).
+        Считается от ближайшей контрольной точки (get_wallet_balance_as_of).
+        """
+        wallet = self.get_object()
+        as_of_str = request.query_params.get('as_of')
+        try:
+            as_of = datetime.strptime(as_of_str, "%Y-%m-%d").date() if as_of_str else date.today()
+        except ValueError:
+            return Response({"detail": "as_of должен быть в формате ГГГГ-ММ-ДД."}, status=400)
+        return Response(get_wallet_balance_as_of(wallet, as_of))
+
+    @action(detail=True, methods=['get'])
+    def statement(self, request, pk=None):
+        """
+        Потоковая выписка по кошельку с остатком после каждой операции.
+        ?start_date=&end_date=ГГГГ-ММ-ДД (по умолчанию — с начала месяца по сегодня),
+        ?export_format=csv|ndjson.
+        """
+        wallet = self.get_object()
+        file_format = request.query_params.get('export_format', 'csv')
+        if file_format not in EXPORT_CONTENT_TYPES:
+            return Response({"detail": "export_format должен быть csv или ndjson."}, status=400)
+
+        today = date.today()
+        try:
+            start_str = request.query_params.get('start_date')
+            end_str = request.query_params.get('end_date')
+            start_date = datetime.strptime(start_str, "%Y-%m-%d").date() if start_str else today.replace(day=1)
+            end_date = datetime.strptime(end_str, "%Y-%m-%d").date() if end_str else today
+        except ValueError:
+            return Response({"detail": "Даты должны быть в формате ГГГГ-ММ-ДД."}, status=400)
+        if start_date > end_date:
+            return Response({"detail": "start_date позже end_date."}, status=400)
+
+        response = StreamingHttpResponse(
+            iter_wallet_statement(wallet, start_date, end_date, file_format),
+            content_type=EXPORT_CONTENT_TYPES[file_format],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="statement_{wallet.pk}_{start_date}_{end_date}.{file_format}"'
+        )
+        return response
+
 
-class TransactionViewSet(BaseViewSet):
+class TransactionViewSet(IdempotentCreateMixin, BaseViewSet):
     """
     Здесь основные изменения:
     - Списки (list) строим через parse_transaction_filters() + get_filtered_transactions().
@@ -73,8 +155,11 @@ class TransactionViewSet(BaseViewSet):
         'category': ['exact'],
         'wallet': ['exact']
     }
-    search_fields = ['description']
+    # Поиск по описанию — параметр ?search= (parse_transaction_filters ->
+    # get_filtered_transactions), один путь для списка и выгрузки
     ordering_fields = ['date', 'amount']
+    # Курсорная пагинация по (date, id): без OFFSET и COUNT(*)
+    pagination_class = TransactionKeysetPagination
 
     def get_queryset(self):
         """
@@ -87,9 +172,10 @@ class TransactionViewSet(BaseViewSet):
         """
         Переопределяем list(), чтобы использовать сервисный слой:
         1) Парсим фильтры
-        2) Получаем QS и total_sum
-        3) Применяем пагинацию (если нужно)
-        4) Отдаём результат + total_sum
+        2) Получаем QS; на первой странице итоги по фильтру считаются
+           оконными функциями в том же запросе, что и строки
+        3) Применяем курсорную пагинацию
+        4) Отдаём результат + total_sum (чистая сумма) и totals
         """
         company = getattr(request, 'current_company', None)
         if not company:
@@ -98,17 +184,29 @@ class TransactionViewSet(BaseViewSet):
         # Парсим GET-параметры (period, exact_date, start_date, и т.п.)
         filters = parse_transaction_filters(request)
 
-        # Вызываем сервисный метод, передавая company и распаковывая filters
-        queryset, total_sum = get_filtered_transactions(company=company, **filters)
+        # Итоги по фильтру — только на первой странице: следующие страницы
+        # курсора не должны сканировать весь фильтр. Без курсора итоги
+        # приходят оконными функциями вместе со строками
+        first_request = not request.query_params.get(self.paginator.cursor_query_param)
 
-        # Если хотите применить встроенную пагинацию DRF:
-        page = self.paginate_queryset(queryset)
+        # Поиск (?search=) сортируется по релевантности, затем по (date, id)
+        if filters.get('search'):
+            self.keyset_ordering = ('-rank', '-date', '-id')
+
+        # Вызываем сервисный метод, передавая company и распаковывая filters
+        queryset, _ = get_filtered_transactions(company=company, with_total=False, **filters)
+        page = self.paginate_queryset(with_window_totals(queryset) if first_request else queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response({
-                'results': serializer.data,
-                'total_sum': total_sum,
-            })
+            data = {'results': serializer.data}
+            # Первая страница в порядке сортировки — и по ссылке previous
+            if not self.paginator.has_previous:
+                totals = read_window_totals(page) if first_request else filter_totals(queryset)
+                data['total_sum'] = totals['net']
+                data['totals'] = totals
+            return self.get_paginated_response(data)
+
+        queryset, total_sum = get_filtered_transactions(company=company, **filters)
 
         # Без пагинации — просто сериализуем все записи
         serializer = self.get_serializer(queryset, many=True)
@@ -117,6 +215,59 @@ class TransactionViewSet(BaseViewSet):
             'total_sum': total_sum,
         })
 
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        Потоковая выгрузка транзакций с теми же фильтрами, что и list().
+        ?export_format=csv|ndjson (параметр format занят DRF).
+        """
+        company = getattr(request, 'current_company', None)
+        if not company:
+            return Response({"detail": "Компания не определена."}, status=400)
+
+        file_format = request.query_params.get('export_format', 'csv')
+        if file_format not in EXPORT_CONTENT_TYPES:
+            return Response({"detail": "export_format должен быть csv или ndjson."}, status=400)
+
+        filters = parse_transaction_filters(request)
+        queryset, _ = get_filtered_transactions(company=company, with_total=False, **filters)
+
+        response = StreamingHttpResponse(
+            iter_transactions_export(queryset, file_format),
+            content_type=EXPORT_CONTENT_TYPES[file_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="transactions.{file_format}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Массовая загрузка транзакций (CSV/JSON).
+        Возвращает количество созданных строк и ошибки по номерам строк.
+        """
+        company = getattr(request, 'current_company', None)
+        if not company:
+            return Response({"detail": "Компания не определена."}, status=400)
+
+        if isinstance(request.data, list):
+            params = TransactionImportSerializer(data={'rows': request.data})
+        else:
+            params = TransactionImportSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+
+        if data.get('file'):
+            try:
+                rows = parse_transaction_import(data['file'].read(), data['format'])
+            except (ValueError, UnicodeDecodeError) as e:
+                return Response({"detail": f"Не удалось разобрать файл: {e}"}, status=400)
+        else:
+            rows = data['rows']
+
+        result = bulk_create_transactions(company=company, rows=rows, dry_run=data['dry_run'])
+        response_status = status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK
+        return Response(result, status=response_status)
+
     def perform_create(self, serializer):
         """
         Создаём транзакцию через сервис create_transaction(...).
@@ -140,36 +291,154 @@ class TransactionViewSet(BaseViewSet):
             amount=amount,
             description=description,
             reason_object=reason_object,
+            tags=serializer.validated_data.get('tags'),
         )
         serializer.instance = new_tx
 
 
-class CategoryViewSet(BaseViewSet):
+class TenantReferenceMixin:
+    """
+    Справочник: общие строки (company пусто) видны всем компаниям и только
+    читаются, собственные строки компании создаются и меняются через API.
+    """
+    def perform_create(self, serializer):
+        company = getattr(self.request, 'current_company', None)
+        if not company:
+            raise ValueError("Невозможно создать запись справочника без текущей компании.")
+        serializer.save(company=company)
+
+    def check_object_permissions(self, request, obj):
+        super().check_object_permissions(request, obj)
+        if request.method not in permissions.SAFE_METHODS and obj.company_id is None:
+            raise PermissionDenied("Общие записи справочника изменяются только администратором.")
+
+
+class CategoryViewSet(TenantReferenceMixin, BaseViewSet):
     serializer_class = CategorySerializer
-    filterset_fields = ['operation_type', 'activity_type']
+    filterset_fields = ['operation_type', 'activity_type', 'parent']
     search_fields = ['name']
 
     def get_queryset(self):
         """
-        Если категории общие — возвращаем все.
-        Если нужно привязать категории к компании —
-        тогда фильтруем их по company или используем сервис.
+        Общие статьи и собственные статьи текущей компании.
         """
-        return Category.objects.all()
-        # Или (если у Category есть поле company):
-        # company = getattr(self.request, 'current_company', None)
-        # if not company:
-        #     return Category.objects.none()
-        # return Category.objects.filter(company=company)
+        company = getattr(self.request, 'current_company', None)
+        if not company:
+            return Category.objects.filter(company__isnull=True)
+        return Category.objects.visible_to(company)
+
+    def perform_destroy(self, instance):
+        if instance.children.exists():
+            raise ValidationError({"detail": "Сначала перенесите или удалите вложенные статьи."})
+        instance.delete()
 
 
-class ActivityTypeViewSet(BaseViewSet):
+class ActivityTypeViewSet(TenantReferenceMixin, BaseViewSet):
     serializer_class = ActivityTypeSerializer
     search_fields = ['name']
 
     def get_queryset(self):
         """
-        Аналогично Category. Если ActivityType глобальны, возвращаем все.
-        Если нужно привязать к company, фильтруем (или используем сервис).
+        Аналогично Category: общие виды деятельности и виды текущей компании.
         """
-        return ActivityType.objects.prefetch_related('categories')
\ No newline at end of file
+        company = getattr(self.request, 'current_company', None)
+        qs = ActivityType.objects.prefetch_related('categories')
+        if not company:
+            return qs.filter(company__isnull=True)
+        return qs.visible_to(company)
+
+
+class TransferViewSet(IdempotentCreateMixin, BaseViewSet):
+    """
+    Переводы между кошельками компании. Изменять перевод нельзя —
+    только удалить (вместе с ногами) и создать заново.
+    """
+    serializer_class = TransferSerializer
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+    filterset_fields = ['from_wallet', 'to_wallet', 'date']
+    ordering_fields = ['date', 'amount']
+
+    def get_queryset(self):
+        company = getattr(self.request, 'current_company', None)
+        if not company:
+            return Transfer.objects.none()
+        return Transfer.objects.filter(company=company).prefetch_related('legs').order_by('-date', '-id')
+
+    def perform_create(self, serializer):
+        company = getattr(self.request, 'current_company', None)
+        if not company:
+            raise ValueError("Невозможно создать перевод без текущей компании.")
+
+        data = serializer.validated_data
+        try:
+            transfer = create_transfer(
+                company=company,
+                from_wallet=data['from_wallet'],
+                to_wallet=data['to_wallet'],
+                amount=data['amount'],
+                day=data.get('date'),
+                description=data.get('description', ""),
+                allow_overdraft=data['allow_overdraft'],
+                from_category=data.get('from_category'),
+                to_category=data.get('to_category'),
+            )
+        except ValueError as e:
+            raise ValidationError({"detail": str(e)})
+        serializer.instance = transfer
+
+
+
+class ClosedPeriodViewSet(BaseViewSet):
+    """
+    Закрытие учётных месяцев компании: POST закрывает месяц
+    (замораживает итоги), DELETE открывает его обратно.
+    """
+    serializer_class = ClosedPeriodSerializer
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+    ordering_fields = ['month']
+
+    def get_queryset(self):
+        company = getattr(self.request, 'current_company', None)
+        if not company:
+            return ClosedPeriod.objects.none()
+        return ClosedPeriod.objects.filter(company=company).order_by('-month')
+
+    def perform_create(self, serializer):
+        company = getattr(self.request, 'current_company', None)
+        if not company:
+            raise ValueError("Невозможно закрыть период без текущей компании.")
+        try:
+            serializer.instance = close_period(
+                company=company,
+                month=serializer.validated_data['month'],
+                user=self.request.user,
+            )
+        except ValueError as e:
+            raise ValidationError({"detail": str(e)})
+
+    def perform_destroy(self, instance):
+        reopen_period(company=instance.company, month=instance.month)
+
+
+class RecurringTransactionViewSet(BaseViewSet):
+    """
+    Регулярные операции компании (аренда, зарплата, подписки).
+    Изменения действуют на ещё не созданные вхождения; созданные
+    транзакции остаются как есть.
+    """
+    serializer_class = RecurringTransactionSerializer
+    filterset_fields = ['frequency', 'is_active', 'wallet', 'category']
+    search_fields = ['description']
+    ordering_fields = ['start_date', 'amount']
+
+    def get_queryset(self):
+        company = getattr(self.request, 'current_company', None)
+        if not company:
+            return RecurringTransaction.objects.none()
+        return RecurringTransaction.objects.filter(company=company).order_by('id')
+
+    def perform_create(self, serializer):
+        company = getattr(self.request, 'current_company', None)
+        if not company:
+            raise ValueError("Невозможно создать регулярную операцию без текущей компании.")
+        serializer.save(company=company)
@@ -0,0 +1,60 @@
+# cashflow/data_version.py
+"""
+Версия денежных данных компании (таблица CompanyDataVersion).
+
+Любая запись транзакций компании (сигналы Transaction, apply_ledger_changes
+в пакетных путях, пересборка дневного свода), её кошельков и статей
+после коммита увеличивает счётчик, и закэшированные отчёты аналитики
+(analytics/cache.py), ключ которых содержит версию, перестают находиться;
+сохранённые отчёты (analytics.Report) становятся устаревшими.
+Версия хранится в БД, а не в кэше: её видят все веб-процессы и воркеры
+независимо от settings.CACHES.
+
+Увеличение — отдельным коротким UPSERT после коммита, а не в транзакции
+записи: иначе строка версии блокировалась бы на всё время транзакции
+и параллельные записи компании (в разные кошельки) ждали бы друг друга.
+"""
+from typing import Iterable
+
+from django.db import connection, transaction
+
+from .models import CompanyDataVersion
+from hr.models import Company
+
+
+def get_data_version(company_id: int) -> int:
+    version = CompanyDataVersion.objects.filter(company_id=company_id).values_list('version', flat=True).first()
+    return version or 0
+
+
+def _increment(company_ids) -> None:
+    table = CompanyDataVersion._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (company_id, version, updated_at)
+            SELECT company_id, 1, now() FROM unnest(%s::bigint[]) AS company_id
+            ORDER BY company_id
+            ON CONFLICT (company_id) DO UPDATE
+            SET version = {table}.version + 1, updated_at = EXCLUDED.updated_at
+            """,
+            [list(company_ids)]
+        )
+
+
+def bump_data_version(company_ids: Iterable[int]) -> None:
+    """
+    Новая версия данных компаний после коммита текущей транзакции БД
+    (вне транзакции — сразу).
+    """
+    company_ids = sorted({company_id for company_id in company_ids if company_id is not None})
+    if company_ids:
+        transaction.on_commit(lambda: _increment(company_ids))
+
+
+def bump_all_data_versions() -> None:
+    """
+    Новая версия у всех компаний — после изменения общих (без компании)
+    статей и видов деятельности, которые видны во всех отчётах.
+    """
+    transaction.on_commit(lambda: _increment(Company.objects.order_by('pk').values_list('pk', flat=True)))
@@ -0,0 +1,36 @@
+# cashflow/management/commands/close_period.py
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hr.models import Company
+from cashflow.services import close_period, reopen_period
+
+
+class Command(BaseCommand):
+    help = "Закрывает учётный месяц компании (замораживает итоги) или открывает его обратно (--reopen)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, required=True, help="ID компании")
+        parser.add_argument('--month', required=True, help="Месяц, ГГГГ-ММ")
+        parser.add_argument('--reopen', action='store_true', help="Открыть закрытый месяц")
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(pk=options['company'])
+        except Company.DoesNotExist:
+            raise CommandError(f"Компания с id={options['company']} не найдена.")
+        try:
+            month = datetime.strptime(options['month'], "%Y-%m").date()
+        except ValueError:
+            raise CommandError(f"Неверный месяц: {options['month']} (ожидается ГГГГ-ММ)")
+
+        try:
+            if options['reopen']:
+                reopen_period(company, month)
+                self.stdout.write(self.style.SUCCESS(f"Период {month:%m.%Y} открыт."))
+            else:
+                close_period(company, month)
+                self.stdout.write(self.style.SUCCESS(f"Период {month:%m.%Y} закрыт."))
+        except ValueError as exc:
+            raise CommandError(str(exc))
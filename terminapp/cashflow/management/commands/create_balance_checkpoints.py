@@ -0,0 +1,48 @@
+# cashflow/management/commands/create_balance_checkpoints.py
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hr.models import Company
+from cashflow.services import create_balance_checkpoints
+
+
+class Command(BaseCommand):
+    help = (
+        "Ставит контрольные точки остатков кошельков на конец дня "
+        "(по умолчанию — последний день прошлого месяца)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help="ID компании (по умолчанию — все компании)")
+        parser.add_argument('--day', help="День контрольной точки, ГГГГ-ММ-ДД")
+        parser.add_argument(
+            '--daily',
+            action='store_true',
+            help="Точка на вчерашний день (для ежедневного запуска)",
+        )
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company']:
+            try:
+                company = Company.objects.get(pk=options['company'])
+            except Company.DoesNotExist:
+                raise CommandError(f"Компания с id={options['company']} не найдена.")
+
+        today = date.today()
+        if options['day']:
+            try:
+                day = datetime.strptime(options['day'], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError(f"Неверная дата: {options['day']} (ожидается ГГГГ-ММ-ДД)")
+        elif options['daily']:
+            day = today - timedelta(days=1)
+        else:
+            day = today.replace(day=1) - timedelta(days=1)
+
+        try:
+            count = create_balance_checkpoints(day, company=company)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"Контрольных точек на {day}: {count}"))
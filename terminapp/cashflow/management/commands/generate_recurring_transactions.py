@@ -0,0 +1,46 @@
+# cashflow/management/commands/generate_recurring_transactions.py
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hr.models import Company
+from cashflow.services import generate_recurring_transactions
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт транзакции регулярных операций по указанный день (по умолчанию — сегодня). "
+        "Повторный запуск не дублирует транзакции; запускать по расписанию."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--until', help="По какой день создавать вхождения, ГГГГ-ММ-ДД")
+        parser.add_argument('--company', type=int, help="ID компании (по умолчанию — все компании)")
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Расписаний в одной пачке (по умолчанию 500)",
+        )
+
+    def handle(self, *args, **options):
+        until = None
+        if options['until']:
+            try:
+                until = datetime.strptime(options['until'], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError(f"Неверная дата: {options['until']} (ожидается ГГГГ-ММ-ДД)")
+        if options['batch_size'] <= 0:
+            raise CommandError("--batch-size должен быть положительным.")
+
+        company = None
+        if options['company']:
+            try:
+                company = Company.objects.get(pk=options['company'])
+            except Company.DoesNotExist:
+                raise CommandError(f"Компания с id={options['company']} не найдена.")
+
+        stats = generate_recurring_transactions(until=until, batch_size=options['batch_size'], company=company)
+        self.stdout.write(self.style.SUCCESS(
+            f"Расписаний обработано: {stats['schedules']}, создано транзакций: {stats['created']}"
+        ))
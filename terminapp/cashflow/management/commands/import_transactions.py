@@ -0,0 +1,53 @@
+# cashflow/management/commands/import_transactions.py
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hr.models import Company
+from cashflow.services import parse_transaction_import, bulk_create_transactions
+
+
+class Command(BaseCommand):
+    help = (
+        "Массовая загрузка транзакций компании из CSV/JSON. "
+        "Колонки: wallet_id, category_id, amount, date (ГГГГ-ММ-ДД), description."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Путь к файлу CSV или JSON")
+        parser.add_argument('--company', type=int, required=True, help="ID компании")
+        parser.add_argument('--format', choices=['csv', 'json'], help="Формат (по умолчанию — по расширению)")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Строк на один INSERT")
+        parser.add_argument('--dry-run', action='store_true', help="Только проверить строки, без записи")
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(pk=options['company'])
+        except Company.DoesNotExist:
+            raise CommandError(f"Компания с id={options['company']} не найдена.")
+
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"Файл не найден: {path}")
+        file_format = options['format'] or ('json' if path.suffix.lower() == '.json' else 'csv')
+
+        try:
+            rows = parse_transaction_import(path.read_bytes(), file_format)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise CommandError(f"Не удалось разобрать файл: {e}")
+
+        result = bulk_create_transactions(
+            company=company,
+            rows=rows,
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+        )
+
+        for error in result['errors']:
+            details = "; ".join(f"{field}: {message}" for field, message in error['errors'].items())
+            self.stderr.write(f"Строка {error['row']}: {details}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Строк: {result['total']}, корректных: {result['valid']}, "
+            f"загружено: {result['created']}, с ошибками: {len(result['errors'])}"
+        ))
@@ -0,0 +1,43 @@
+# cashflow/management/commands/partition_transactions.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from cashflow.partitioning import convert_to_partitioned, ensure_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Помесячные секции таблицы транзакций: создаёт секции на будущие месяцы "
+        "(запускать по расписанию) или однократно переводит таблицу на секции (--convert)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=3,
+            help="На сколько месяцев вперёд держать готовые секции (по умолчанию 3)",
+        )
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help="Перевести существующую таблицу на секции (блокирует таблицу на время копирования)",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Секционирование поддерживается только на PostgreSQL.")
+        if options['months_ahead'] < 0:
+            raise CommandError("--months-ahead не может быть отрицательным.")
+
+        try:
+            if options['convert']:
+                created = convert_to_partitioned(months_ahead=options['months_ahead'])
+            else:
+                created = ensure_partitions(months_ahead=options['months_ahead'])
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+
+        for name in created:
+            self.stdout.write(f"Создана секция {name}")
+        self.stdout.write(self.style.SUCCESS(f"Создано секций: {len(created)}"))
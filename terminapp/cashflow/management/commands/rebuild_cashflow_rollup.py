@@ -0,0 +1,57 @@
+# cashflow/management/commands/rebuild_cashflow_rollup.py
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hr.models import Company
+from cashflow.services import rebuild_daily_cashflow
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise CommandError(f"Неверная дата: {value} (ожидается ГГГГ-ММ-ДД)")
+
+
+class Command(BaseCommand):
+    help = "Заполняет/сверяет дневной свод движения денег (DailyCashflow) по транзакциям."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help="ID компании (по умолчанию — все компании)")
+        parser.add_argument('--start-date', help="Начало периода, ГГГГ-ММ-ДД")
+        parser.add_argument('--end-date', help="Конец периода, ГГГГ-ММ-ДД")
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="Только проверить расхождения, ничего не изменяя",
+        )
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company']:
+            try:
+                company = Company.objects.get(pk=options['company'])
+            except Company.DoesNotExist:
+                raise CommandError(f"Компания с id={options['company']} не найдена.")
+
+        mismatches = rebuild_daily_cashflow(
+            company=company,
+            start_date=_parse_date(options['start_date']) if options['start_date'] else None,
+            end_date=_parse_date(options['end_date']) if options['end_date'] else None,
+            verify_only=options['verify'],
+        )
+
+        for item in mismatches[:50]:
+            company_id, wallet_id, category_id, day = item['key']
+            self.stdout.write(
+                f"{day} компания {company_id}, кошелёк {wallet_id}, категория {category_id}: "
+                f"сохранено {item['stored']}, по транзакциям {item['expected']}"
+            )
+
+        if options['verify']:
+            if mismatches:
+                raise CommandError(f"Найдено расхождений: {len(mismatches)}")
+            self.stdout.write(self.style.SUCCESS("Свод совпадает с транзакциями."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Исправлено строк свода: {len(mismatches)}"))
@@ -0,0 +1,15 @@
+# cashflow/management/commands/rebuild_category_closure.py
+from django.core.management.base import BaseCommand
+
+from cashflow.services import rebuild_category_closure
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобирает замыкание дерева статей (CategoryClosure) по полям parent — "
+        "например, после загрузки фикстур, где дочерние статьи идут раньше родителей."
+    )
+
+    def handle(self, *args, **options):
+        rows = rebuild_category_closure()
+        self.stdout.write(self.style.SUCCESS(f"Записано связей: {rows}"))
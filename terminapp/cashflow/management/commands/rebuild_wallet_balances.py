@@ -0,0 +1,40 @@
+# cashflow/management/commands/rebuild_wallet_balances.py
+from django.core.management.base import BaseCommand, CommandError
+
+from hr.models import Company
+from cashflow.services import rebuild_wallet_balances
+
+
+class Command(BaseCommand):
+    help = "Пересобирает таблицу балансов кошельков по транзакциям (или только сверяет с --verify)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', type=int, help="ID компании (по умолчанию — все компании)")
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="Только проверить расхождения, ничего не изменяя",
+        )
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company']:
+            try:
+                company = Company.objects.get(pk=options['company'])
+            except Company.DoesNotExist:
+                raise CommandError(f"Компания с id={options['company']} не найдена.")
+
+        mismatches = rebuild_wallet_balances(company=company, verify_only=options['verify'])
+
+        for item in mismatches:
+            self.stdout.write(
+                f"Кошелёк {item['wallet_id']}: сохранено {item['stored_balance']}, "
+                f"по транзакциям {item['expected_balance']}"
+            )
+
+        if options['verify']:
+            if mismatches:
+                raise CommandError(f"Найдено расхождений: {len(mismatches)}")
+            self.stdout.write(self.style.SUCCESS("Балансы совпадают с транзакциями."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Исправлено балансов: {len(mismatches)}"))
@@ -0,0 +1,31 @@
+# cashflow/management/commands/resign_transactions.py
+from django.core.management.base import BaseCommand, CommandError
+
+from cashflow.models import Category
+from cashflow.services import resign_category_transactions
+
+
+class Command(BaseCommand):
+    help = (
+        "Приводит Transaction.direction в соответствие с operation_type категорий "
+        "и пересобирает затронутые балансы и дневной свод."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--category', type=int, help="ID категории (по умолчанию — все категории)")
+
+    def handle(self, *args, **options):
+        categories = Category.objects.order_by('id')
+        if options['category']:
+            categories = categories.filter(pk=options['category'])
+            if not categories.exists():
+                raise CommandError(f"Категория с id={options['category']} не найдена.")
+
+        total = 0
+        for category in categories:
+            updated = resign_category_transactions(category)
+            if updated:
+                self.stdout.write(f"Категория {category.id} ({category.name}): {updated} транзакций")
+            total += updated
+
+        self.stdout.write(self.style.SUCCESS(f"Перезаписано транзакций: {total}"))
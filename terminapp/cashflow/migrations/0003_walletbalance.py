@@ -0,0 +1,61 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:05
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum, Case, When, F, Value, DecimalField
+
+
+def fill_wallet_balances(apps, schema_editor):
+    """
+    Начальное заполнение балансов по уже существующим транзакциям.
+    """
+    Transaction = apps.get_model('cashflow', 'Transaction')
+    WalletBalance = apps.get_model('cashflow', 'WalletBalance')
+    amount_field = DecimalField(max_digits=14, decimal_places=2)
+
+    rows = Transaction.objects.values('wallet_id').annotate(
+        income_total=Sum(Case(
+            When(category__operation_type__in=['income', 'technical_income'], then=F('amount')),
+            default=Value(0), output_field=amount_field,
+        )),
+        expense_total=Sum(Case(
+            When(category__operation_type__in=['expense', 'technical_expense'], then=F('amount')),
+            default=Value(0), output_field=amount_field,
+        )),
+    ).order_by()
+
+    WalletBalance.objects.bulk_create([
+        WalletBalance(
+            wallet_id=row['wallet_id'],
+            balance=row['income_total'] - row['expense_total'],
+            income_total=row['income_total'],
+            expense_total=row['expense_total'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0002_transaction_company_wallet_company_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletBalance',
+            fields=[
+                ('wallet', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='balance_state', serialize=False, to='cashflow.wallet', verbose_name='Кошелёк')),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Баланс')),
+                ('income_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Итого поступлений')),
+                ('expense_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Итого выбытий')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Баланс кошелька',
+                'verbose_name_plural': 'Балансы кошельков',
+            },
+        ),
+        migrations.RunPython(fill_wallet_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:06
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum, Count, Case, When, F, Q, Value, DecimalField
+
+INCOME_TYPES = ['income', 'technical_income']
+EXPENSE_TYPES = ['expense', 'technical_expense']
+
+
+def fill_daily_cashflow(apps, schema_editor):
+    """
+    Начальное заполнение дневного свода по уже существующим транзакциям.
+    """
+    Transaction = apps.get_model('cashflow', 'Transaction')
+    DailyCashflow = apps.get_model('cashflow', 'DailyCashflow')
+    amount_field = DecimalField(max_digits=14, decimal_places=2)
+
+    rows = Transaction.objects.values('company_id', 'wallet_id', 'category_id', 'date').annotate(
+        income=Sum(Case(
+            When(category__operation_type__in=INCOME_TYPES, then=F('amount')),
+            default=Value(0), output_field=amount_field,
+        )),
+        expense=Sum(Case(
+            When(category__operation_type__in=EXPENSE_TYPES, then=F('amount')),
+            default=Value(0), output_field=amount_field,
+        )),
+        income_count=Count('id', filter=Q(category__operation_type__in=INCOME_TYPES)),
+        expense_count=Count('id', filter=Q(category__operation_type__in=EXPENSE_TYPES)),
+    ).order_by()
+
+    DailyCashflow.objects.bulk_create((
+        DailyCashflow(
+            company_id=row['company_id'],
+            wallet_id=row['wallet_id'],
+            category_id=row['category_id'],
+            day=row['date'],
+            net_flow=row['income'] - row['expense'],
+            income=row['income'],
+            expense=row['expense'],
+            income_count=row['income_count'],
+            expense_count=row['expense_count'],
+        )
+        for row in rows.iterator()
+        if row['income_count'] or row['expense_count']
+    ), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0003_walletbalance'),
+        ('hr', '0005_employee_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCashflow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('net_flow', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Чистый поток')),
+                ('income', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Поступления')),
+                ('expense', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Выбытия')),
+                ('income_count', models.IntegerField(default=0, verbose_name='Кол-во поступлений')),
+                ('expense_count', models.IntegerField(default=0, verbose_name='Кол-во выбытий')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_cashflow', to='cashflow.category', verbose_name='Категория')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_cashflow', to='hr.company', verbose_name='Компания')),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_cashflow', to='cashflow.wallet', verbose_name='Кошелёк')),
+            ],
+            options={
+                'verbose_name': 'Дневной свод',
+                'verbose_name_plural': 'Дневной свод',
+                'indexes': [models.Index(fields=['company', 'day'], name='cashflow_daily_company_day')],
+                'constraints': [models.UniqueConstraint(fields=('company', 'wallet', 'category', 'day'), name='unique_daily_cashflow_row')],
+            },
+        ),
+        migrations.RunPython(fill_daily_cashflow, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0004_dailycashflow'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('hr', '0005_employee_created_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['company', 'date', 'id'], name='cashflow_tx_company_date_id'),
+        ),
+    ]
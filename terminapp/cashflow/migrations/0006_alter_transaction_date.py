@@ -0,0 +1,19 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:08
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0005_transaction_company_date_id_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='date',
+            field=models.DateField(default=datetime.date.today),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:10
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0006_alter_transaction_date'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('hr', '0005_employee_created_at'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('description'), name='gin_trgm_ops'), name='cashflow_tx_desc_trgm'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:12
+
+from django.db import migrations, models
+
+
+def fill_direction(apps, schema_editor):
+    """
+    Проставляет direction уже существующим транзакциям по operation_type категорий.
+    """
+    Transaction = apps.get_model('cashflow', 'Transaction')
+    Transaction.objects.filter(
+        category__operation_type__in=['income', 'technical_income']
+    ).update(direction=1)
+    Transaction.objects.filter(
+        category__operation_type__in=['expense', 'technical_expense']
+    ).update(direction=-1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0007_transaction_description_trigram'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('hr', '0005_employee_created_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='direction',
+            field=models.SmallIntegerField(choices=[(1, 'Поступление'), (-1, 'Выбытие'), (0, 'Не определено')], default=0, editable=False, verbose_name='Направление'),
+        ),
+        migrations.RunPython(fill_direction, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['company', 'date'], include=('wallet', 'category', 'direction', 'amount'), name='cashflow_tx_ledger_cover'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:16
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0008_transaction_direction'),
+        ('hr', '0005_employee_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletBalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Остаток на конец дня')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Контрольная точка остатка',
+                'verbose_name_plural': 'Контрольные точки остатков',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='dailycashflow',
+            index=models.Index(fields=['wallet', 'day'], name='cashflow_daily_wallet_day'),
+        ),
+        migrations.AddField(
+            model_name='walletbalancecheckpoint',
+            name='wallet',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_checkpoints', to='cashflow.wallet', verbose_name='Кошелёк'),
+        ),
+        migrations.AddConstraint(
+            model_name='walletbalancecheckpoint',
+            constraint=models.UniqueConstraint(fields=('wallet', 'day'), name='unique_wallet_balance_checkpoint'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:17
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0009_walletbalancecheckpoint'),
+        ('hr', '0005_employee_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Transfer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Сумма')),
+                ('date', models.DateField(default=datetime.date.today)),
+                ('description', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transfers', to='hr.company', verbose_name='Компания')),
+                ('from_wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outgoing_transfers', to='cashflow.wallet', verbose_name='Из кошелька')),
+                ('to_wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='incoming_transfers', to='cashflow.wallet', verbose_name='В кошелёк')),
+            ],
+            options={
+                'verbose_name': 'Перевод между кошельками',
+                'verbose_name_plural': 'Переводы между кошельками',
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:21
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0011_transaction_wallet_date_id_index'),
+        ('hr', '0005_employee_created_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClosedPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Месяц (первое число)')),
+                ('closed_at', models.DateTimeField(auto_now_add=True)),
+                ('closed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Кто закрыл')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='closed_periods', to='hr.company', verbose_name='Компания')),
+            ],
+            options={
+                'verbose_name': 'Закрытый период',
+                'verbose_name_plural': 'Закрытые периоды',
+                'constraints': [models.UniqueConstraint(fields=('company', 'month'), name='unique_closed_period')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PeriodClosingBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Месяц (первое число)')),
+                ('net_flow', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Чистый поток')),
+                ('income', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Поступления')),
+                ('expense', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Выбытия')),
+                ('income_count', models.IntegerField(default=0, verbose_name='Кол-во поступлений')),
+                ('expense_count', models.IntegerField(default=0, verbose_name='Кол-во выбытий')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_closing_balances', to='cashflow.category', verbose_name='Категория')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_closing_balances', to='hr.company', verbose_name='Компания')),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_closing_balances', to='cashflow.wallet', verbose_name='Кошелёк')),
+            ],
+            options={
+                'verbose_name': 'Итоги закрытого периода',
+                'verbose_name_plural': 'Итоги закрытых периодов',
+                'constraints': [models.UniqueConstraint(fields=('company', 'month', 'wallet', 'category'), name='unique_period_closing_balance')],
+            },
+        ),
+    ]
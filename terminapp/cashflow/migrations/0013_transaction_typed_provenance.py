@@ -0,0 +1,51 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_typed_provenance(apps, schema_editor):
+    """
+    Переносит ссылки content_type/object_id на позиции заказа и возвраты
+    в типизированные FK (строки с уже удалёнными источниками пропускаются).
+    """
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Transaction = apps.get_model('cashflow', 'Transaction')
+    for model_name, field in (('orderitem', 'order_item'), ('orderitemrefund', 'order_item_refund')):
+        content_type = ContentType.objects.filter(app_label='orders', model=model_name).first()
+        if content_type is None:
+            continue
+        source = apps.get_model('orders', model_name)
+        Transaction.objects.filter(
+            content_type=content_type,
+            object_id__in=source.objects.values('id'),
+        ).update(**{f'{field}_id': F('object_id')})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0012_period_close'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('hr', '0005_employee_created_at'),
+        ('orders', '0003_order_company_orderitem_company_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='order_item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='orders.orderitem', verbose_name='Позиция заказа'),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='order_item_refund',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='orders.orderitemrefund', verbose_name='Возврат'),
+        ),
+        migrations.RunPython(fill_typed_provenance, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['content_type', 'object_id'], name='cashflow_tx_reason'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_category_closure(apps, schema_editor):
+    """
+    Существующие статьи становятся общими (company пусто) корнями дерева:
+    каждой нужна строка замыкания на саму себя.
+    """
+    Category = apps.get_model('cashflow', 'Category')
+    CategoryClosure = apps.get_model('cashflow', 'CategoryClosure')
+    CategoryClosure.objects.bulk_create(
+        [CategoryClosure(ancestor_id=pk, descendant_id=pk, depth=0)
+         for pk in Category.objects.values_list('id', flat=True)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0014_transaction_tags'),
+        ('hr', '0005_employee_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField(verbose_name='Глубина')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='activitytype',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='activity_types', to='hr.company', verbose_name='Компания'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='categories', to='hr.company', verbose_name='Компания'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='children', to='cashflow.category', verbose_name='Родительская статья'),
+        ),
+        migrations.AlterField(
+            model_name='activitytype',
+            name='name',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name='activitytype',
+            constraint=models.UniqueConstraint(fields=('company', 'name'), name='cashflow_activity_type_company_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='activitytype',
+            constraint=models.UniqueConstraint(condition=models.Q(('company__isnull', True)), fields=('name',), name='cashflow_activity_type_shared_name'),
+        ),
+        migrations.AddField(
+            model_name='categoryclosure',
+            name='ancestor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='cashflow.category', verbose_name='Предок'),
+        ),
+        migrations.AddField(
+            model_name='categoryclosure',
+            name='descendant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='cashflow.category', verbose_name='Потомок'),
+        ),
+        migrations.AddIndex(
+            model_name='categoryclosure',
+            index=models.Index(fields=['descendant', 'ancestor'], name='cashflow_category_closure_desc'),
+        ),
+        migrations.AddConstraint(
+            model_name='categoryclosure',
+            constraint=models.UniqueConstraint(fields=('ancestor', 'descendant'), name='cashflow_category_closure_pair'),
+        ),
+        migrations.RunPython(fill_category_closure, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:30
+
+import datetime
+import django.contrib.postgres.fields
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0015_tenant_category_tree'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('hr', '0005_employee_created_at'),
+        ('orders', '0003_order_company_orderitem_company_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Сумма')),
+                ('description', models.TextField(blank=True, default='')),
+                ('tags', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=50), blank=True, default=list, size=None, verbose_name='Метки')),
+                ('frequency', models.CharField(choices=[('daily', 'Ежедневно'), ('weekly', 'Еженедельно'), ('monthly', 'Ежемесячно'), ('yearly', 'Ежегодно')], max_length=10, verbose_name='Периодичность')),
+                ('interval', models.PositiveSmallIntegerField(default=1, help_text='Каждые N дней/недель/месяцев/лет', validators=[django.core.validators.MinValueValidator(1)], verbose_name='Интервал')),
+                ('day_of_month', models.PositiveSmallIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(31)], verbose_name='Число месяца')),
+                ('start_date', models.DateField(default=datetime.date.today, verbose_name='Дата начала')),
+                ('end_date', models.DateField(blank=True, null=True, verbose_name='Дата окончания')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активна')),
+                ('generated_until', models.DateField(blank=True, editable=False, null=True, verbose_name='Создано по')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_transactions', to='cashflow.category', verbose_name='Категория')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_transactions', to='hr.company', verbose_name='Компания')),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_transactions', to='cashflow.wallet', verbose_name='Кошелёк')),
+            ],
+            options={
+                'verbose_name': 'Регулярная операция',
+                'verbose_name_plural': 'Регулярные операции',
+            },
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='recurring',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='transactions', to='cashflow.recurringtransaction', verbose_name='Регулярная операция'),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('recurring__isnull', False)), fields=('recurring', 'date'), name='cashflow_tx_recurring_date'),
+        ),
+        migrations.AddIndex(
+            model_name='recurringtransaction',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['generated_until', 'id'], name='cashflow_recurring_due'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0016_recurring_transaction'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('hr', '0005_employee_created_at'),
+        ('orders', '0003_order_company_orderitem_company_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['wallet', 'amount', 'date'], name='cashflow_tx_wallet_amount_date'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cashflow', '0017_transaction_wallet_amount_date_index'),
+        ('hr', '0005_employee_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyDataVersion',
+            fields=[
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='data_version', serialize=False, to='hr.company', verbose_name='Компания')),
+                ('version', models.BigIntegerField(default=0, verbose_name='Версия')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Версия данных компании',
+                'verbose_name_plural': 'Версии данных компаний',
+            },
+        ),
+    ]
@@ -1,32 +1,77 @@
 # cashflow/models.py
-from django.db import models
-from django.db.models import Sum, Case, When, F, DecimalField, Value
-from django.contrib.contenttypes.fields import GenericForeignKey
+import calendar
+import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db import connection, models, transaction
+from django.db.models import Sum, F, DecimalField, Value
+from django.db.models.functions import Coalesce, Upper
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
 
 from hr.models import Company  # <-- Импорт вашей модели Company
 
+INCOME_TYPES = ('income', 'technical_income')
+EXPENSE_TYPES = ('expense', 'technical_expense')
+
+# Направление движения денег, хранимое в Transaction.direction
+DIRECTION_INCOME = 1
+DIRECTION_EXPENSE = -1
+DIRECTION_NONE = 0
+
+
+def direction_for(operation_type) -> int:
+    """
+    Знак движения денег для operation_type категории.
+    """
+    if operation_type in INCOME_TYPES:
+        return DIRECTION_INCOME
+    if operation_type in EXPENSE_TYPES:
+        return DIRECTION_EXPENSE
+    return DIRECTION_NONE
+
+
+TAG_MAX_LENGTH = 50
+
+
+def normalize_tags(tags) -> list:
+    """
+    Метки транзакции в каноническом виде: без пробелов по краям, в нижнем
+    регистре, без повторов, по алфавиту. Принимает список или строку
+    через запятую. Фильтры по меткам сравнивают значения точно, поэтому
+    «Промо» и « промо» должны храниться одинаково.
+    """
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    cleaned = {str(tag).strip().lower() for tag in tags}
+    cleaned.discard('')
+    too_long = [tag for tag in cleaned if len(tag) > TAG_MAX_LENGTH]
+    if too_long:
+        raise ValueError(f"Метка длиннее {TAG_MAX_LENGTH} символов: {too_long[0]}")
+    return sorted(cleaned)
+
+
+class PeriodClosedError(ValueError):
+    """Попытка изменить транзакции закрытого месяца (см. ClosedPeriod)."""
+
 
 class WalletQuerySet(models.QuerySet):
     def annotate_balance(self):
         """
-        Аннотирует баланс кошелька, исходя из связанных транзакций.
-        """
-        return self.annotate(
-            balance=Sum(
-                Case(
-                    When(
-                        transactions__category__operation_type__in=['income', 'technical_income'],
-                        then=F('transactions__amount')
-                    ),
-                    When(
-                        transactions__category__operation_type__in=['expense', 'technical_expense'],
-                        then=-F('transactions__amount')
-                    ),
-                    default=Value(0),
-                    output_field=DecimalField(max_digits=10, decimal_places=2)
-                )
-            )
+        Аннотирует баланс кошелька и итоги поступлений/выбытий
+        из таблицы WalletBalance (без пересчёта транзакций).
+        """
+        zero = Value(Decimal('0.00'), output_field=DecimalField(max_digits=14, decimal_places=2))
+        return self.select_related('balance_state').annotate(
+            balance=Coalesce(F('balance_state__balance'), zero),
+            income_total=Coalesce(F('balance_state__income_total'), zero),
+            expense_total=Coalesce(F('balance_state__expense_total'), zero),
         )
 
 
@@ -50,22 +95,68 @@ class Wallet(models.Model):
         return f"{self.name} (компания: {self.company})"
 
 
+class WalletBalance(models.Model):
+    """
+    Текущий баланс кошелька и итоги поступлений/выбытий.
+    Поддерживается инкрементально при каждой записи/удалении транзакции
+    (см. cashflow/signals.py), поэтому список кошельков не пересчитывает
+    историю транзакций. Пересборка/сверка: manage.py rebuild_wallet_balances.
+    """
+    wallet = models.OneToOneField(
+        Wallet,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="balance_state",
+        verbose_name="Кошелёк"
+    )
+    balance = models.DecimalField("Баланс", max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    income_total = models.DecimalField("Итого поступлений", max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    expense_total = models.DecimalField("Итого выбытий", max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    class Meta:
+        verbose_name = "Баланс кошелька"
+        verbose_name_plural = "Балансы кошельков"
+
+    def __str__(self):
+        return f"{self.wallet_id}: {self.balance}"
+
+
+class ReferenceQuerySet(models.QuerySet):
+    def visible_to(self, company):
+        """
+        Общие строки справочника (company пусто) и собственные строки компании.
+        """
+        return self.filter(models.Q(company__isnull=True) | models.Q(company=company))
+
+
 class ActivityType(models.Model):
     """
     Вид деятельности (Операционная, Инвестиционная, Финансовая, Техническая операция и т.д.)
-    Если нужно разделять по компаниям, добавьте company = ForeignKey(Company, ...)
+    Без компании — общий для всех компаний, с компанией — собственный вид деятельности компании.
     """
-    # Если хотите сделать ActivityType глобальным для всех компаний – не добавляйте поле company.
-    # Если нужно разделять ActivityType по компаниям, раскомментируйте:
-    #
-    # company = models.ForeignKey(
-    #     Company,
-    #     on_delete=models.CASCADE,
-    #     related_name="activity_types",
-    #     null=True, blank=True
-    # )
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="activity_types",
+        null=True, blank=True,
+        verbose_name="Компания"
+    )
+
+    name = models.CharField(max_length=100)
 
-    name = models.CharField(max_length=100, unique=True)
+    objects = ReferenceQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'name'], name='cashflow_activity_type_company_name'),
+            # NULL не равен NULL — уникальность общих видов деятельности отдельным условием
+            models.UniqueConstraint(
+                fields=['name'],
+                condition=models.Q(company__isnull=True),
+                name='cashflow_activity_type_shared_name',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -79,13 +170,22 @@ class Category(models.Model):
         ('technical_expense', 'Техническое выбытие'),
     ]
 
-    # Аналогично ActivityType, если категории должны быть уникальны на каждую компанию:
-    # company = models.ForeignKey(
-    #     Company,
-    #     on_delete=models.CASCADE,
-    #     related_name="categories",
-    #     null=True, blank=True
-    # )
+    # Без компании — общая статья (план статей по умолчанию), с компанией — собственная
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="categories",
+        null=True, blank=True,
+        verbose_name="Компания"
+    )
+    # Вложенные статьи; связи «предок — потомок» хранятся в CategoryClosure
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.PROTECT,
+        related_name="children",
+        null=True, blank=True,
+        verbose_name="Родительская статья"
+    )
 
     name = models.CharField("Название статьи", max_length=255)
     description = models.TextField("Описание статьи", blank=True, null=True)
@@ -105,10 +205,89 @@ class Category(models.Model):
         help_text="Укажите вид деятельности для данной категории"
     )
 
+    objects = ReferenceQuerySet.as_manager()
+
+    @property
+    def direction(self) -> int:
+        """
+        Знак сумм транзакций этой категории (см. Transaction.direction).
+        """
+        return direction_for(self.operation_type)
+
+    def save(self, *args, **kwargs):
+        if self.parent_id is not None:
+            self.check_parent(self.parent)
+        # Смена operation_type перезаписывает транзакции статьи (post_save) — в одной
+        # транзакции БД: если перезапись отклонена, статья тоже не сохраняется
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def check_parent(self, parent: 'Category') -> None:
+        """
+        Родитель — общая статья или статья той же компании и не лежит
+        в собственном поддереве категории (иначе дерево зациклится).
+        """
+        if parent.company_id is not None and parent.company_id != self.company_id:
+            raise ValueError("Родительская статья принадлежит другой компании.")
+        if self.pk is not None and (
+            parent.pk == self.pk
+            or CategoryClosure.objects.filter(ancestor_id=self.pk, descendant_id=parent.pk).exists()
+        ):
+            raise ValueError("Статья не может быть вложена в саму себя или в свою дочернюю статью.")
+
     def __str__(self):
         return self.name
 
 
+def persisted_category_directions(category_ids) -> dict:
+    """
+    {id категории: direction} по operation_type из БД. Для путей записи
+    транзакций: реестр справочников (cashflow/reference.py) в процессе
+    может отставать от только что изменённой статьи, а direction хранится
+    в транзакции и попадает в балансы.
+    """
+    return {
+        category_id: direction_for(operation_type)
+        for category_id, operation_type in Category.objects.filter(
+            id__in=set(category_ids)
+        ).values_list('id', 'operation_type')
+    }
+
+
+class CategoryClosure(models.Model):
+    """
+    Замыкание дерева статей: строка на каждую пару (предок, потомок), включая
+    саму статью (depth=0). Итог «статья со всеми вложенными» — один JOIN
+    по ancestor_id без рекурсии. Ведётся сигналами Category
+    (services.update_category_closure).
+    """
+    ancestor = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name="descendant_links",
+        verbose_name="Предок"
+    )
+    descendant = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name="ancestor_links",
+        verbose_name="Потомок"
+    )
+    depth = models.PositiveSmallIntegerField("Глубина")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='cashflow_category_closure_pair'),
+        ]
+        indexes = [
+            # Предки статьи и свод по предкам: JOIN ... ON descendant_id = category_id
+            models.Index(fields=['descendant', 'ancestor'], name='cashflow_category_closure_desc'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} → {self.descendant_id} ({self.depth})"
+
+
 class Transaction(models.Model):
     """
     Финансовая транзакция (доход/расход).
@@ -132,32 +311,164 @@ class Transaction(models.Model):
         verbose_name="Категория"
     )
     amount = models.DecimalField(max_digits=10, decimal_places=2)
-    date = models.DateField(auto_now_add=True)
+    # default, а не auto_now_add: массовая загрузка переносит исторические даты
+    date = models.DateField(default=datetime.date.today)
     description = models.TextField(blank=True, null=True)
+    # Копия знака category.operation_type на момент записи: агрегаты суммируют
+    # amount * direction без JOIN на cashflow_category.
+    # При смене operation_type категории пересчитывается resign_category_transactions().
+    direction = models.SmallIntegerField(
+        "Направление",
+        choices=[
+            (DIRECTION_INCOME, 'Поступление'),
+            (DIRECTION_EXPENSE, 'Выбытие'),
+            (DIRECTION_NONE, 'Не определено'),
+        ],
+        default=DIRECTION_NONE,
+        editable=False,
+    )
+    # Произвольные метки (мероприятие, акция, филиал) поверх справочника категорий.
+    # Хранятся нормализованными (normalize_tags) — фильтры сравнивают точно.
+    tags = ArrayField(
+        models.CharField(max_length=TAG_MAX_LENGTH),
+        default=list,
+        blank=True,
+        verbose_name="Метки",
+    )
 
     # ----------- GenericForeignKey для возможных "причин" транзакции -----------
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, null=True, blank=True)
     object_id = models.PositiveIntegerField(null=True, blank=True)
     reason_transaction = GenericForeignKey('content_type', 'object_id')
 
+    # ----------- Типизированные источники (индексируются и джойнятся в SQL) -----------
+    order_item = models.ForeignKey(
+        'orders.OrderItem',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='transactions',
+        verbose_name="Позиция заказа"
+    )
+    order_item_refund = models.ForeignKey(
+        'orders.OrderItemRefund',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='transactions',
+        verbose_name="Возврат"
+    )
+    # Регулярная операция, по расписанию которой создана транзакция
+    recurring = models.ForeignKey(
+        'cashflow.RecurringTransaction',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='transactions',
+        verbose_name="Регулярная операция"
+    )
+
     # ---------------------------------------------------------------------------
 
+    class Meta:
+        # На PostgreSQL таблица может быть секционирована по месяцам (cashflow/partitioning.py):
+        # уникальные индексы должны включать date, внешние ключи на Transaction — db_constraint=False
+        indexes = [
+            # Курсорная пагинация списка: WHERE company = ? ORDER BY date DESC, id DESC
+            models.Index(fields=['company', 'date', 'id'], name='cashflow_tx_company_date_id'),
+            # Выписка по кошельку: WHERE wallet = ? AND date BETWEEN ... ORDER BY date, id
+            models.Index(fields=['wallet', 'date', 'id'], name='cashflow_tx_wallet_date_id'),
+            # Сверка с банковской выпиской: wallet = ? AND amount = ? AND date BETWEEN ...
+            models.Index(fields=['wallet', 'amount', 'date'], name='cashflow_tx_wallet_amount_date'),
+            # Поиск по описанию: icontains → UPPER(description) LIKE UPPER('%...%')
+            GinIndex(OpClass(Upper('description'), name='gin_trgm_ops'), name='cashflow_tx_desc_trgm'),
+            # Метки: tags @> ARRAY[...] («все из») и tags && ARRAY[...] («любая из»)
+            GinIndex(fields=['tags'], name='cashflow_tx_tags'),
+            # Остальные «причины» (переводы и т.п.): поиск ног по (content_type, object_id)
+            models.Index(fields=['content_type', 'object_id'], name='cashflow_tx_reason'),
+            # Покрывающий индекс для сумм по компании/периоду (index-only scan)
+            models.Index(
+                fields=['company', 'date'],
+                include=['wallet', 'category', 'direction', 'amount'],
+                name='cashflow_tx_ledger_cover',
+            ),
+        ]
+        constraints = [
+            # Одно вхождение расписания на дату: повторный прогон генератора
+            # пропускает уже созданные (INSERT ... ON CONFLICT DO NOTHING)
+            models.UniqueConstraint(
+                fields=['recurring', 'date'],
+                condition=models.Q(recurring__isnull=False),
+                name='cashflow_tx_recurring_date',
+            ),
+        ]
+
+    # Поля, от которых зависят балансы кошельков (см. ledger_state)
+    LEDGER_FIELDS = ('company_id', 'wallet_id', 'category_id', 'date', 'amount', 'direction')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_ledger_state()
+        return instance
+
+    def remember_ledger_state(self):
+        """
+        Запоминает значения полей, попавшие в балансы, чтобы при изменении
+        транзакции можно было снять старую сумму и добавить новую.
+        """
+        deferred = self.get_deferred_fields()
+        if any(name in deferred for name in self.LEDGER_FIELDS):
+            self._ledger_state = None
+        else:
+            self._ledger_state = self.ledger_state()
+
+    def ledger_state(self):
+        return tuple(getattr(self, name) for name in self.LEDGER_FIELDS)
+
+    def _lock_category(self):
+        """
+        (operation_type статьи, company_id кошелька) одним запросом. Строка
+        статьи блокируется FOR SHARE до конца транзакции: смена типа статьи
+        (UPDATE + пересчёт direction в сигнале) ждёт её коммита и видит
+        новую транзакцию, а эта — уже изменённый тип.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT c.operation_type, "
+                f"(SELECT w.company_id FROM {Wallet._meta.db_table} w WHERE w.id = %s) "
+                f"FROM {Category._meta.db_table} c WHERE c.id = %s FOR SHARE",
+                [self.wallet_id, self.category_id],
+            )
+            row = cursor.fetchone()
+        if row is None:
+            raise Category.DoesNotExist(f"Статья {self.category_id} не найдена.")
+        return row
+
     def save(self, *args, **kwargs):
-        # Дополнительная проверка, чтобы не было рассинхронизации:
-        # wallet.company == transaction.company
-        if self.wallet.company_id != self.company_id:
-            raise ValueError("Кошелёк и транзакция должны принадлежать одной и той же компании.")
-        super().save(*args, **kwargs)
+        # Строковая дата (скрипты, update_or_create) приводится к date
+        # до сравнения состояний баланса и проверки закрытых периодов
+        if isinstance(self.date, str):
+            self.date = datetime.date.fromisoformat(self.date)
+        self.tags = normalize_tags(self.tags)
+        # Запись транзакции и обновление баланса (post_save) — одна транзакция БД
+        with transaction.atomic():
+            operation_type, wallet_company_id = self._lock_category()
+            # Дополнительная проверка, чтобы не было рассинхронизации:
+            # wallet.company == transaction.company
+            if wallet_company_id != self.company_id:
+                raise ValueError("Кошелёк и транзакция должны принадлежать одной и той же компании.")
+            self.direction = direction_for(operation_type)
+            super().save(*args, **kwargs)
 
     @property
     def transaction_type(self):
         """
-        Определяет тип транзакции (income/expense) на основе category.operation_type.
+        Определяет тип транзакции (income/expense) по сохранённому direction.
         """
-        op_type = self.category.operation_type
-        if op_type in ['income', 'technical_income']:
+        if self.direction == DIRECTION_INCOME:
             return 'Доход'
-        elif op_type in ['expense', 'technical_expense']:
+        elif self.direction == DIRECTION_EXPENSE:
             return 'Расход'
         return 'Не определено'
 
@@ -172,11 +483,8 @@ class Transaction(models.Model):
             .values('wallet__name')
             .annotate(
                 balance=Sum(
-                    Case(
-                        When(category__operation_type__in=['income', 'technical_income'], then=F('amount')),
-                        When(category__operation_type__in=['expense', 'technical_expense'], then=-F('amount')),
-                        output_field=DecimalField(),
-                    )
+                    F('amount') * F('direction'),
+                    output_field=DecimalField(max_digits=14, decimal_places=2),
                 )
             )
             .order_by('wallet__name')
@@ -187,9 +495,366 @@ class Transaction(models.Model):
         """
         Возвращает сумму с учётом типа транзакции (расход — отрицательный).
         """
-        if self.category.operation_type in ['expense', 'technical_expense']:
+        if self.direction == DIRECTION_EXPENSE:
             return -self.amount
         return self.amount
 
     def __str__(self):
-        return f"{self.transaction_type}: {self.amount} {self.category} (кошелёк: {self.wallet})"
\ No newline at end of file
+        return f"{self.transaction_type}: {self.amount} {self.category} (кошелёк: {self.wallet})"
+
+
+class DailyCashflow(models.Model):
+    """
+    Дневной свод движения денег по (компания, кошелёк, категория, день).
+    Поддерживается инкрементально вместе с WalletBalance и служит
+    источником данных для analytics/services.py.
+    Пересборка/сверка: manage.py rebuild_cashflow_rollup.
+    """
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="daily_cashflow",
+        verbose_name="Компания"
+    )
+    wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.CASCADE,
+        related_name="daily_cashflow",
+        verbose_name="Кошелёк"
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name="daily_cashflow",
+        verbose_name="Категория"
+    )
+    day = models.DateField("День")
+    net_flow = models.DecimalField("Чистый поток", max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    income = models.DecimalField("Поступления", max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    expense = models.DecimalField("Выбытия", max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    income_count = models.IntegerField("Кол-во поступлений", default=0)
+    expense_count = models.IntegerField("Кол-во выбытий", default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['company', 'wallet', 'category', 'day'],
+                name='unique_daily_cashflow_row'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['company', 'day'], name='cashflow_daily_company_day'),
+            # Дельта баланса кошелька от контрольной точки (get_wallet_balance_as_of)
+            models.Index(fields=['wallet', 'day'], name='cashflow_daily_wallet_day'),
+        ]
+        verbose_name = "Дневной свод"
+        verbose_name_plural = "Дневной свод"
+
+    def __str__(self):
+        return f"{self.day} {self.wallet_id}/{self.category_id}: {self.net_flow}"
+
+
+class WalletBalanceCheckpoint(models.Model):
+    """
+    Остаток кошелька на конец дня day (контрольная точка).
+    Баланс на произвольную дату = ближайшая точка ± дневной свод между ними.
+    Точки ставятся только на закрытые дни (раньше сегодняшнего);
+    задним числом внесённые транзакции сдвигают все более поздние точки
+    (см. apply_ledger_changes). Создание: manage.py create_balance_checkpoints.
+    """
+    wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.CASCADE,
+        related_name="balance_checkpoints",
+        verbose_name="Кошелёк"
+    )
+    day = models.DateField("День")
+    balance = models.DecimalField("Остаток на конец дня", max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'day'], name='unique_wallet_balance_checkpoint')
+        ]
+        verbose_name = "Контрольная точка остатка"
+        verbose_name_plural = "Контрольные точки остатков"
+
+    def __str__(self):
+        return f"{self.wallet_id} на {self.day}: {self.balance}"
+
+
+class Transfer(models.Model):
+    """
+    Перевод между кошельками одной компании.
+    Пишется двумя транзакциями-ногами (выбытие из from_wallet и поступление
+    в to_wallet), связанными с переводом через content_type/object_id.
+    Создание — только через services.create_transfer().
+    """
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="transfers",
+        verbose_name="Компания"
+    )
+    from_wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.CASCADE,
+        related_name="outgoing_transfers",
+        verbose_name="Из кошелька"
+    )
+    to_wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.CASCADE,
+        related_name="incoming_transfers",
+        verbose_name="В кошелёк"
+    )
+    amount = models.DecimalField("Сумма", max_digits=10, decimal_places=2)
+    date = models.DateField(default=datetime.date.today)
+    description = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    # Удаление перевода удаляет обе ноги (и откатывает балансы сигналами)
+    legs = GenericRelation(Transaction)
+
+    class Meta:
+        verbose_name = "Перевод между кошельками"
+        verbose_name_plural = "Переводы между кошельками"
+
+    def __str__(self):
+        return f"{self.from_wallet_id} → {self.to_wallet_id}: {self.amount}"
+
+
+class CompanyDataVersion(models.Model):
+    """
+    Версия денежных данных компании: счётчик, который увеличивается после
+    коммита любой записи её транзакций, кошельков и статей
+    (cashflow/data_version.py). Ключи кэша аналитики и сохранённые отчёты
+    сравнивают версию отсюда — одна строка в БД видна всем процессам.
+    """
+    company = models.OneToOneField(
+        Company,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="data_version",
+        verbose_name="Компания"
+    )
+    version = models.BigIntegerField("Версия", default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Версия данных компании"
+        verbose_name_plural = "Версии данных компаний"
+
+    def __str__(self):
+        return f"{self.company_id}: {self.version}"
+
+
+class ClosedPeriod(models.Model):
+    """
+    Закрытый учётный месяц компании: транзакции с датой в этом месяце
+    нельзя создать, изменить или удалить (проверка в apply_ledger_changes).
+    При закрытии итоги месяца замораживаются в PeriodClosingBalance,
+    а остатки кошельков на конец месяца — в WalletBalanceCheckpoint.
+    Закрыть можно только прошедший месяц (services.close_period).
+    """
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="closed_periods",
+        verbose_name="Компания"
+    )
+    month = models.DateField("Месяц (первое число)")
+    closed_at = models.DateTimeField(auto_now_add=True)
+    closed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Кто закрыл"
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'month'], name='unique_closed_period')
+        ]
+        verbose_name = "Закрытый период"
+        verbose_name_plural = "Закрытые периоды"
+
+    def __str__(self):
+        return f"{self.company_id}: {self.month:%m.%Y}"
+
+
+class PeriodClosingBalance(models.Model):
+    """
+    Замороженные итоги закрытого месяца по (кошелёк, категория).
+    Аналитика берёт закрытые месяцы отсюда и сканирует дневной свод
+    только за открытые периоды.
+    """
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="period_closing_balances",
+        verbose_name="Компания"
+    )
+    month = models.DateField("Месяц (первое число)")
+    wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.CASCADE,
+        related_name="period_closing_balances",
+        verbose_name="Кошелёк"
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name="period_closing_balances",
+        verbose_name="Категория"
+    )
+    net_flow = models.DecimalField("Чистый поток", max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    income = models.DecimalField("Поступления", max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    expense = models.DecimalField("Выбытия", max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    income_count = models.IntegerField("Кол-во поступлений", default=0)
+    expense_count = models.IntegerField("Кол-во выбытий", default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['company', 'month', 'wallet', 'category'],
+                name='unique_period_closing_balance'
+            )
+        ]
+        verbose_name = "Итоги закрытого периода"
+        verbose_name_plural = "Итоги закрытых периодов"
+
+    def __str__(self):
+        return f"{self.month:%m.%Y} {self.wallet_id}/{self.category_id}: {self.net_flow}"
+
+
+class RecurringTransaction(models.Model):
+    """
+    Регулярная операция (аренда, зарплата, подписки): шаблон транзакции
+    и расписание. Транзакции по расписанию создаёт пакетный генератор
+    services.generate_recurring_transactions (команда generate_recurring_transactions).
+    """
+    FREQUENCY_DAILY = 'daily'
+    FREQUENCY_WEEKLY = 'weekly'
+    FREQUENCY_MONTHLY = 'monthly'
+    FREQUENCY_YEARLY = 'yearly'
+    FREQUENCIES = [
+        (FREQUENCY_DAILY, 'Ежедневно'),
+        (FREQUENCY_WEEKLY, 'Еженедельно'),
+        (FREQUENCY_MONTHLY, 'Ежемесячно'),
+        (FREQUENCY_YEARLY, 'Ежегодно'),
+    ]
+
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="recurring_transactions",
+        verbose_name="Компания"
+    )
+    wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.CASCADE,
+        related_name="recurring_transactions",
+        verbose_name="Кошелёк"
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name="recurring_transactions",
+        verbose_name="Категория"
+    )
+    amount = models.DecimalField("Сумма", max_digits=10, decimal_places=2)
+    description = models.TextField(blank=True, default='')
+    tags = ArrayField(
+        models.CharField(max_length=TAG_MAX_LENGTH),
+        default=list,
+        blank=True,
+        verbose_name="Метки",
+    )
+
+    frequency = models.CharField("Периодичность", max_length=10, choices=FREQUENCIES)
+    interval = models.PositiveSmallIntegerField(
+        "Интервал",
+        default=1,
+        validators=[MinValueValidator(1)],
+        help_text="Каждые N дней/недель/месяцев/лет"
+    )
+    # Для ежемесячных и ежегодных: число месяца (31 — последний день короткого месяца).
+    # Пусто — число start_date. Недельные повторяются в день недели start_date.
+    day_of_month = models.PositiveSmallIntegerField(
+        "Число месяца",
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(1), MaxValueValidator(31)]
+    )
+    start_date = models.DateField("Дата начала", default=datetime.date.today)
+    end_date = models.DateField("Дата окончания", null=True, blank=True)
+    is_active = models.BooleanField("Активна", default=True)
+    # По какой день включительно вхождения уже созданы
+    generated_until = models.DateField("Создано по", null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Выборка генератора: активные расписания, отстающие от даты прогона
+            models.Index(
+                fields=['generated_until', 'id'],
+                condition=models.Q(is_active=True),
+                name='cashflow_recurring_due',
+            ),
+        ]
+        verbose_name = "Регулярная операция"
+        verbose_name_plural = "Регулярные операции"
+
+    def __str__(self):
+        return f"{self.get_frequency_display()}: {self.amount} ({self.category_id})"
+
+    def save(self, *args, **kwargs):
+        # Те же инварианты, что у Transaction.save(): генератор вставляет строки в обход save()
+        if self.wallet.company_id != self.company_id:
+            raise ValueError("Кошелёк и регулярная операция должны принадлежать одной компании.")
+        if self.category.company_id not in (None, self.company_id):
+            raise ValueError("Категория принадлежит другой компании.")
+        self.tags = normalize_tags(self.tags)
+        super().save(*args, **kwargs)
+
+    def occurrences(self, start: datetime.date, end: datetime.date):
+        """
+        Даты вхождений расписания в интервале [start, end] (с учётом
+        start_date/end_date). Считаются арифметикой от start_date, без
+        перебора пропущенных периодов.
+        """
+        start = max(start, self.start_date)
+        if self.end_date is not None:
+            end = min(end, self.end_date)
+        if start > end:
+            return []
+        step = max(self.interval, 1)
+
+        if self.frequency in (self.FREQUENCY_DAILY, self.FREQUENCY_WEEKLY):
+            step_days = step * (7 if self.frequency == self.FREQUENCY_WEEKLY else 1)
+            skipped = -(-(start - self.start_date).days // step_days)  # округление вверх
+            current = self.start_date + datetime.timedelta(days=skipped * step_days)
+            days = []
+            while current <= end:
+                days.append(current)
+                current += datetime.timedelta(days=step_days)
+            return days
+
+        step_months = step * (12 if self.frequency == self.FREQUENCY_YEARLY else 1)
+        day_of_month = self.day_of_month or self.start_date.day
+        first = self.start_date.year * 12 + self.start_date.month - 1
+        # Начинаем с периода, в который попадает start (или предыдущего)
+        month = first + (start.year * 12 + start.month - 1 - first) // step_months * step_months
+        days = []
+        while True:
+            year, month_index = divmod(month, 12)
+            last_day = calendar.monthrange(year, month_index + 1)[1]
+            current = datetime.date(year, month_index + 1, min(day_of_month, last_day))
+            if current > end:
+                return days
+            if current >= start:
+                days.append(current)
+            month += step_months
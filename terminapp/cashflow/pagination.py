@@ -0,0 +1,183 @@
+# cashflow/pagination.py
+import base64
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import BooleanField, F, Func, Q, Value
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class RowComparison(Func):
+    """
+    Сравнение строк ROW(...) < ROW(...) как условие filter().
+    """
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+    def __init__(self, lhs, rhs, operator):
+        super().__init__(lhs, rhs, arg_joiner=f' {operator} ')
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная (keyset) пагинация по составному ключу сортировки.
+
+    Позиция кодируется значениями полей ordering последней строки страницы,
+    следующая страница выбирается условием WHERE (date, id) < (:date, :id),
+    поэтому любая страница стоит столько же, сколько первая:
+    без OFFSET и без COUNT(*).
+    Последнее поле ordering должно быть уникальным (обычно id).
+    """
+    ordering = ('-date', '-id')
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = "Неверный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        ordering = self.get_ordering(view)
+        self.fields = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+        position, reverse = self.decode_cursor(request)
+        self.cursor = position
+
+        order_by = [self._order_expr(name, desc != reverse) for name, desc in self.fields]
+        queryset = queryset.order_by(*order_by)
+        if position is not None:
+            queryset = queryset.filter(self._after(queryset, position, reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # При движении назад «ещё есть» означает наличие предыдущей страницы
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = position is not None if not reverse else has_more
+        self.first_position = self._position(rows[0]) if rows else None
+        self.last_position = self._position(rows[-1]) if rows else None
+        return rows
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+        if isinstance(data, dict):
+            payload.update(data)
+        else:
+            payload['results'] = data
+        return Response(payload)
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value and value.isdigit() and int(value) > 0:
+            return min(int(value), self.max_page_size)
+        return self.page_size
+
+    def get_ordering(self, view):
+        return getattr(view, 'keyset_ordering', None) or self.ordering
+
+    def get_next_link(self):
+        if not self.has_next or self.last_position is None:
+            return None
+        return self._link(self.last_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first_position is None:
+            return None
+        return self._link(self.first_position, reverse=True)
+
+    # --- курсор -------------------------------------------------------------
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            position = payload['p']
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def _link(self, position, reverse):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+
+    def _position(self, row):
+        position = []
+        for name, _desc in self.fields:
+            value = row[name] if isinstance(row, dict) else getattr(row, name)
+            if isinstance(value, date):
+                value = value.isoformat()
+            elif isinstance(value, Decimal):
+                value = str(value)
+            position.append(value)
+        return position
+
+    # --- условия ------------------------------------------------------------
+
+    @staticmethod
+    def _order_expr(name, desc):
+        return f'-{name}' if desc else name
+
+    @staticmethod
+    def _output_field(queryset, name):
+        """
+        Поле значения курсора: аннотация запроса (например, rank поиска) или поле модели.
+        """
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return queryset.model._meta.get_field(name)
+
+    def _after(self, queryset, position, reverse):
+        """
+        Условие «после позиции» для текущего направления. Если все поля
+        сортируются в одну сторону — сравнение строк (a, b) < (:a, :b):
+        PostgreSQL использует его как границу диапазона индекса (company, a, b).
+        Иначе (a < :a) OR (a = :a AND b > :b) ... с ведущим a <= :a,
+        который ограничивает диапазон хотя бы по первому полю.
+        """
+        lookups = ['lt' if desc != reverse else 'gt' for _name, desc in self.fields]
+        if len(set(lookups)) == 1:
+            return RowComparison(
+                Func(*[F(name) for name, _desc in self.fields], function='ROW'),
+                Func(*[
+                    Value(value, output_field=self._output_field(queryset, name))
+                    for (name, _desc), value in zip(self.fields, position)
+                ], function='ROW'),
+                operator='<' if lookups[0] == 'lt' else '>',
+            )
+
+        condition = Q()
+        equal = Q()
+        for (name, _desc), lookup, value in zip(self.fields, lookups, position):
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        first_name, first_lookup, first_value = self.fields[0][0], lookups[0], position[0]
+        return Q(**{f'{first_name}__{first_lookup}e': first_value}) & condition
+
+
+class TransactionKeysetPagination(KeysetPagination):
+    """
+    Пагинация списка транзакций по (date, id), см. индекс (company, date, id).
+    """
+    ordering = ('-date', '-id')
@@ -0,0 +1,228 @@
+# cashflow/partitioning.py
+"""
+Помесячное секционирование cashflow_transaction (PostgreSQL, PARTITION BY RANGE (date)).
+
+Таблица создаётся миграциями как обычная; перевод на секции выполняется
+один раз командой `manage.py partition_transactions --convert`, дальше та же
+команда (без --convert) заранее создаёт секции на будущие месяцы.
+
+Ограничения секционированной таблицы:
+  * первичный ключ — (id, date); уникальные индексы обязаны включать date;
+  * внешние ключи из других таблиц на cashflow_transaction невозможны —
+    ссылки на транзакции объявляются с db_constraint=False;
+  * id выдаёт обычная последовательность cashflow_transaction_id_seq
+    (identity-колонки у секционированных таблиц до PostgreSQL 17 не поддерживаются).
+"""
+from datetime import date
+from typing import List, Tuple
+
+from django.db import connection, transaction
+
+TABLE = 'cashflow_transaction'
+DEFAULT_PARTITION = f'{TABLE}_default'
+SEQUENCE = f'{TABLE}_id_seq'
+# Временная схема, куда на время переноса уезжает старая таблица со своими индексами
+OLD_SCHEMA = 'cashflow_partitioning_old'
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f'{TABLE}_y{month.year}m{month.month:02d}'
+
+
+def month_range(first: date, last: date) -> List[date]:
+    """
+    Первые числа месяцев от first до last включительно.
+    """
+    months = []
+    current = month_start(first)
+    while current <= last:
+        months.append(current)
+        current = add_months(current, 1)
+    return months
+
+
+def is_partitioned(cursor) -> bool:
+    cursor.execute(
+        "SELECT c.relkind FROM pg_class c "
+        "WHERE c.oid = to_regclass(%s)",
+        [TABLE],
+    )
+    row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def existing_partitions(cursor) -> List[str]:
+    cursor.execute(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(%s) "
+        "ORDER BY child.relname",
+        [TABLE],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _create_month_partition(cursor, month: date) -> None:
+    """
+    Создаёт секцию месяца. Строки этого месяца, успевшие попасть в секцию
+    по умолчанию, переносятся в новую секцию до ATTACH PARTITION
+    (иначе PostgreSQL откажет в присоединении).
+    """
+    name = partition_name(month)
+    start, end = month, add_months(month, 1)
+    cursor.execute(
+        f'CREATE TABLE "{name}" (LIKE "{TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+    )
+    cursor.execute(
+        f'WITH moved AS ('
+        f'  DELETE FROM "{DEFAULT_PARTITION}" WHERE date >= %s AND date < %s RETURNING *'
+        f') INSERT INTO "{name}" SELECT * FROM moved',
+        [start, end],
+    )
+    cursor.execute(
+        f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)',
+        [start, end],
+    )
+
+
+def ensure_partitions(months_ahead: int = 3, today: date = None) -> List[str]:
+    """
+    Создаёт недостающие секции с текущего месяца на months_ahead вперёд.
+    Возвращает имена созданных секций.
+    """
+    today = today or date.today()
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        if not is_partitioned(cursor):
+            raise RuntimeError(
+                f"{TABLE} ещё не секционирована — выполните partition_transactions --convert"
+            )
+        existing = set(existing_partitions(cursor))
+        for month in month_range(today, add_months(today, months_ahead)):
+            if partition_name(month) in existing:
+                continue
+            _create_month_partition(cursor, month)
+            created.append(partition_name(month))
+    return created
+
+
+def _index_definitions(cursor, schema: str) -> List[Tuple[str, str, bool]]:
+    """
+    (имя, определение, уникальный без date) для индексов таблицы.
+    """
+    cursor.execute(
+        "SELECT i.relname, pg_get_indexdef(i.oid), "
+        "       ix.indisunique AND NOT EXISTS ("
+        "           SELECT 1 FROM pg_attribute a "
+        "           WHERE a.attrelid = t.oid AND a.attname = 'date' AND a.attnum = ANY(ix.indkey)"
+        "       ) "
+        "FROM pg_index ix "
+        "JOIN pg_class i ON i.oid = ix.indexrelid "
+        "JOIN pg_class t ON t.oid = ix.indrelid "
+        "JOIN pg_namespace n ON n.oid = t.relnamespace "
+        "WHERE n.nspname = %s AND t.relname = %s AND NOT ix.indisprimary",
+        [schema, TABLE],
+    )
+    return cursor.fetchall()
+
+
+def _foreign_keys(cursor, schema: str) -> List[Tuple[str, str]]:
+    cursor.execute(
+        "SELECT con.conname, pg_get_constraintdef(con.oid) "
+        "FROM pg_constraint con "
+        "JOIN pg_class t ON t.oid = con.conrelid "
+        "JOIN pg_namespace n ON n.oid = t.relnamespace "
+        "WHERE n.nspname = %s AND t.relname = %s AND con.contype = 'f'",
+        [schema, TABLE],
+    )
+    return cursor.fetchall()
+
+
+def _referencing_constraints(cursor) -> List[str]:
+    cursor.execute(
+        "SELECT con.conrelid::regclass::text || '.' || con.conname "
+        "FROM pg_constraint con "
+        "WHERE con.contype = 'f' AND con.confrelid = to_regclass(%s)",
+        [TABLE],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def convert_to_partitioned(months_ahead: int = 3, today: date = None) -> List[str]:
+    """
+    Переводит обычную cashflow_transaction в секционированную по месяцам.
+
+    Всё выполняется одной транзакцией БД под ACCESS EXCLUSIVE блокировкой:
+    старая таблица уезжает во временную схему (вместе с индексами, освобождая
+    их имена), создаётся секционированная таблица той же структуры, секции
+    по всем месяцам с данными и на months_ahead вперёд, секция по умолчанию,
+    данные копируются с сохранением id, старая таблица удаляется.
+    Возвращает имена созданных секций.
+    """
+    today = today or date.today()
+    with transaction.atomic(), connection.cursor() as cursor:
+        if is_partitioned(cursor):
+            raise RuntimeError(f"{TABLE} уже секционирована.")
+
+        referencing = _referencing_constraints(cursor)
+        if referencing:
+            raise RuntimeError(
+                "На транзакции ссылаются внешние ключи (нужен db_constraint=False): "
+                + ", ".join(referencing)
+            )
+
+        cursor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f'CREATE SCHEMA "{OLD_SCHEMA}"')
+        cursor.execute(f'ALTER TABLE "{TABLE}" SET SCHEMA "{OLD_SCHEMA}"')
+        old_table = f'"{OLD_SCHEMA}"."{TABLE}"'
+
+        indexes = _index_definitions(cursor, OLD_SCHEMA)
+        unique = [name for name, _, unique_without_date in indexes if unique_without_date]
+        if unique:
+            raise RuntimeError(
+                "Уникальные индексы без date несовместимы с секционированием: " + ", ".join(unique)
+            )
+
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE {old_table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE (date)'
+        )
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (id, date)')
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) + 1, MIN(date), MAX(date) FROM {old_table}')
+        next_id, first_day, last_day = cursor.fetchone()
+        cursor.execute(f'CREATE SEQUENCE "{SEQUENCE}" START WITH %s', [next_id])
+        cursor.execute(f'ALTER TABLE "{TABLE}" ALTER COLUMN id SET DEFAULT nextval(%s)', [SEQUENCE])
+        cursor.execute(f'ALTER SEQUENCE "{SEQUENCE}" OWNED BY "{TABLE}".id')
+
+        for name, definition in _foreign_keys(cursor, OLD_SCHEMA):
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+        for _, definition, _ in indexes:
+            # pg_get_indexdef квалифицирует таблицу схемой — направляем индекс на новую таблицу
+            cursor.execute(definition.replace(f' ON {OLD_SCHEMA}.{TABLE} ', f' ON "{TABLE}" ', 1))
+
+        cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+        months = month_range(first_day or today, max(last_day or today, add_months(today, months_ahead)))
+        for month in months:
+            cursor.execute(
+                f'CREATE TABLE "{partition_name(month)}" PARTITION OF "{TABLE}" '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [month, add_months(month, 1)],
+            )
+
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM {old_table}')
+        cursor.execute(f'SELECT (SELECT COUNT(*) FROM {old_table}), (SELECT COUNT(*) FROM "{TABLE}")')
+        old_count, new_count = cursor.fetchone()
+        if old_count != new_count:
+            raise RuntimeError(f"Скопировано {new_count} строк из {old_count}.")
+
+        cursor.execute(f'DROP SCHEMA "{OLD_SCHEMA}" CASCADE')
+    return [DEFAULT_PARTITION] + [partition_name(month) for month in months]
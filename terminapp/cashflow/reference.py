@@ -0,0 +1,133 @@
+# cashflow/reference.py
+"""
+Общие (без компании) статьи Category и виды деятельности ActivityType
+в памяти процесса.
+
+Общий план статей маленький, почти не меняется и нужен всем компаниям:
+при продаже/возврате (OrderItem) и в аналитике. Каждый воркер загружает
+его один раз; при изменении общей строки в админке/API сигнал меняет
+версию в общем кэше (settings.CACHES), и остальные воркеры перечитывают
+справочник при следующей проверке версии (не чаще RECHECK_INTERVAL секунд).
+Собственные статьи компаний в реестр не попадают: они читаются из БД
+пачкой (category_map) только в запросах своей компании, а их изменение
+не заставляет воркеры перечитывать реестр.
+
+Возвращаемые объекты общие для всех запросов процесса — их нельзя изменять.
+"""
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+from django.core.cache import cache
+
+from .models import Category, ActivityType
+
+VERSION_CACHE_KEY = 'cashflow:reference:version'
+# Как часто (в секундах) воркер сверяет свою версию с общим кэшем
+RECHECK_INTERVAL = 5
+
+
+class ReferenceRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self._categories: Dict[int, Category] = {}
+        self._activity_types: Dict[int, ActivityType] = {}
+
+    def _shared_version(self) -> str:
+        version = cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+            version = cache.get(VERSION_CACHE_KEY)
+        return version
+
+    def _ensure_loaded(self) -> None:
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < RECHECK_INTERVAL:
+            return
+        with self._lock:
+            if self._version is not None and now - self._checked_at < RECHECK_INTERVAL:
+                return
+            version = self._shared_version()
+            if version != self._version:
+                activity_types = {obj.pk: obj for obj in ActivityType.objects.filter(company__isnull=True)}
+                categories = {}
+                for obj in Category.objects.filter(company__isnull=True).select_related('activity_type'):
+                    if obj.activity_type_id in activity_types:
+                        obj.activity_type = activity_types[obj.activity_type_id]
+                    categories[obj.pk] = obj
+                self._activity_types = activity_types
+                self._categories = categories
+                self._version = version
+            self._checked_at = now
+
+    def invalidate(self) -> None:
+        """
+        Новая версия в общем кэше: все воркеры перечитают общий справочник.
+        """
+        cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+        with self._lock:
+            self._version = None
+
+    def category(self, category_id: int) -> Category:
+        """
+        Общая категория по id без запроса к БД. Статья компании (или общая,
+        ещё не попавшая в реестр) читается из БД; отсутствующая категория —
+        Category.DoesNotExist, как у objects.get().
+        """
+        self._ensure_loaded()
+        obj = self._categories.get(category_id)
+        if obj is None:
+            obj = Category.objects.select_related('activity_type').get(pk=category_id)
+        return obj
+
+    def category_map(self, category_ids: Iterable[int]) -> Dict[int, Category]:
+        """
+        {id: категория}: общие — из реестра, остальные — одним запросом.
+        Для отчётов, которым нужны названия многих статей сразу.
+        """
+        self._ensure_loaded()
+        result, missing = {}, set()
+        for category_id in category_ids:
+            obj = self._categories.get(category_id)
+            if obj is None:
+                missing.add(category_id)
+            else:
+                result[category_id] = obj
+        if missing:
+            result.update(
+                (obj.pk, obj) for obj in Category.objects.filter(pk__in=missing).select_related('activity_type')
+            )
+        return result
+
+    def categories(self) -> List[Category]:
+        """
+        Общие категории (без компании).
+        """
+        self._ensure_loaded()
+        return list(self._categories.values())
+
+    def activity_type(self, activity_type_id: int) -> Optional[ActivityType]:
+        self._ensure_loaded()
+        return self._activity_types.get(activity_type_id)
+
+    def category_ids_for_activity(self, activity_type_name: str, company=None) -> List[int]:
+        """
+        Id категорий вида деятельности (замена JOIN по category__activity_type__name):
+        общие — из реестра, статьи компании (без компании — всех компаний) — из БД.
+        """
+        self._ensure_loaded()
+        shared = [
+            obj.pk for obj in self._categories.values()
+            if obj.activity_type is not None and obj.activity_type.name == activity_type_name
+        ]
+        own = Category.objects.filter(company__isnull=False, activity_type__name=activity_type_name)
+        if company is not None:
+            own = own.filter(company=company)
+        return shared + list(own.values_list('pk', flat=True))
+
+
+registry = ReferenceRegistry()
+get_category = registry.category
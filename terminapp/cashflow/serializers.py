@@ -1,31 +1,78 @@
 # cashflow/serializers.py
 from rest_framework import serializers
-from .models import Transaction, Wallet, Category, ActivityType
+from .models import (
+    Transaction, Wallet, Category, ActivityType, Transfer, ClosedPeriod, RecurringTransaction, normalize_tags,
+)
 
 
 class WalletSerializer(serializers.ModelSerializer):
-    balance = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    balance = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    income_total = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    expense_total = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
 
     class Meta:
         model = Wallet
-        fields = ['id', 'name', 'created_at', 'updated_at', 'balance']
+        fields = ['id', 'name', 'created_at', 'updated_at', 'balance', 'income_total', 'expense_total']
         # company не выводим наружу или делаем поле read_only,
         # т.к. оно ставится автоматически
 
 
+def _current_company(serializer):
+    return getattr(serializer.context.get('request'), 'current_company', None)
+
+
+def _check_visible(serializer, value, message="Статья недоступна для текущей компании."):
+    """
+    Справочная строка должна быть общей или принадлежать текущей компании.
+    """
+    company = _current_company(serializer)
+    if value is not None and value.company_id is not None and (
+        company is None or value.company_id != company.id
+    ):
+        raise serializers.ValidationError(message)
+    return value
+
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = '__all__'
-        # при необходимости исключите или сделайте поля read_only,
-        # если не хотите, чтобы Category меняли через API.
+        # компанию ставит API (текущая компания); общие статьи — только через админку
+        read_only_fields = ['company']
+
+    def validate_parent(self, value):
+        return _check_visible(self, value)
+
+    def validate_activity_type(self, value):
+        return _check_visible(self, value, "Вид деятельности недоступен для текущей компании.")
+
+    def validate(self, attrs):
+        parent = attrs.get('parent')
+        if parent is not None:
+            category = self.instance or Category()
+            category.company = _current_company(self) if self.instance is None else self.instance.company
+            try:
+                category.check_parent(parent)
+            except ValueError as exc:
+                raise serializers.ValidationError({'parent': str(exc)})
+        return attrs
 
 
 class ActivityTypeSerializer(serializers.ModelSerializer):
     class Meta:
         model = ActivityType
         fields = '__all__'
-        # аналогично выше
+        # аналогично Category
+        read_only_fields = ['company']
+
+    def validate_name(self, value):
+        company = _current_company(self)
+        duplicates = ActivityType.objects.visible_to(company).filter(name=value)
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError("Вид деятельности с таким названием уже есть.")
+        return value
 
 
 class TransactionSerializer(serializers.ModelSerializer):
@@ -38,6 +85,114 @@ class TransactionSerializer(serializers.ModelSerializer):
         model = Transaction
         fields = [
             'id', 'wallet', 'category', 'amount', 'description', 'date',
-            'transaction_type', 'content_type', 'object_id'
+            'transaction_type', 'content_type', 'object_id',
+            'order_item', 'order_item_refund', 'recurring', 'tags',
         ]
-        # company не выводим / либо делаем read_only
\ No newline at end of file
+        # дату ставит сервисный слой (по умолчанию — сегодня);
+        # источники из заказов и регулярных операций проставляются ими самими
+        read_only_fields = ['date', 'order_item', 'order_item_refund', 'recurring']
+        # company не выводим / либо делаем read_only
+
+    def validate_category(self, value):
+        return _check_visible(self, value)
+
+    def validate_tags(self, value):
+        try:
+            return normalize_tags(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
+
+class TransactionImportSerializer(serializers.Serializer):
+    """
+    Параметры массовой загрузки: файл CSV/JSON либо строки в теле запроса.
+    """
+    file = serializers.FileField(required=False)
+    rows = serializers.ListField(child=serializers.DictField(), required=False)
+    format = serializers.ChoiceField(choices=['csv', 'json'], required=False)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if not attrs.get('file') and attrs.get('rows') is None:
+            raise serializers.ValidationError("Передайте файл (file) или список строк (rows).")
+        if attrs.get('file') and not attrs.get('format'):
+            name = attrs['file'].name.lower()
+            attrs['format'] = 'json' if name.endswith('.json') else 'csv'
+        return attrs
+
+
+class TransferSerializer(serializers.ModelSerializer):
+    """
+    Перевод между кошельками. Ноги перевода создаёт сервис create_transfer().
+    """
+    allow_overdraft = serializers.BooleanField(default=True, write_only=True)
+    from_category = serializers.PrimaryKeyRelatedField(
+        queryset=Category.objects.all(), required=False, write_only=True
+    )
+    to_category = serializers.PrimaryKeyRelatedField(
+        queryset=Category.objects.all(), required=False, write_only=True
+    )
+    legs = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+    class Meta:
+        model = Transfer
+        fields = [
+            'id', 'from_wallet', 'to_wallet', 'amount', 'date', 'description', 'created_at',
+            'legs', 'allow_overdraft', 'from_category', 'to_category',
+        ]
+        read_only_fields = ['created_at']
+
+    def validate_from_category(self, value):
+        return _check_visible(self, value)
+
+    def validate_to_category(self, value):
+        return _check_visible(self, value)
+
+
+class ClosedPeriodSerializer(serializers.ModelSerializer):
+    """
+    Закрытый месяц. month — любая дата месяца, хранится первое число.
+    """
+
+    class Meta:
+        model = ClosedPeriod
+        fields = ['id', 'month', 'closed_at', 'closed_by']
+        read_only_fields = ['closed_at', 'closed_by']
+
+
+class RecurringTransactionSerializer(serializers.ModelSerializer):
+    """
+    Регулярная операция. Транзакции по ней создаёт генератор
+    (generate_recurring_transactions), а не API.
+    """
+
+    class Meta:
+        model = RecurringTransaction
+        fields = [
+            'id', 'wallet', 'category', 'amount', 'description', 'tags',
+            'frequency', 'interval', 'day_of_month', 'start_date', 'end_date',
+            'is_active', 'generated_until', 'created_at',
+        ]
+        read_only_fields = ['generated_until', 'created_at']
+
+    def validate_wallet(self, value):
+        company = _current_company(self)
+        if company is None or value.company_id != company.id:
+            raise serializers.ValidationError("Кошелёк не найден в компании.")
+        return value
+
+    def validate_category(self, value):
+        return _check_visible(self, value)
+
+    def validate_tags(self, value):
+        try:
+            return normalize_tags(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
+    def validate(self, attrs):
+        start_date = attrs.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = attrs.get('end_date', getattr(self.instance, 'end_date', None))
+        if start_date and end_date and end_date < start_date:
+            raise serializers.ValidationError({'end_date': "Дата окончания раньше даты начала."})
+        return attrs
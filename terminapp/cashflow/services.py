@@ -1,14 +1,34 @@
 # cashflow/services.py
 
-from django.db import transaction
-from django.db.models import Sum
+from django.db import transaction, connection
+from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import (
+    Sum, Count, Case, When, F, Q, Value, DecimalField, FloatField, Window, ExpressionWrapper,
+    OuterRef, Subquery, RowRange, Exists,
+)
+from django.db.models.functions import Cast, Coalesce, TruncMonth
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.contrib.contenttypes.models import ContentType
+from collections import defaultdict
 from datetime import date, timedelta, datetime
-from typing import Dict, Optional, Tuple, Any, List
+from typing import Dict, Optional, Tuple, Any, List, Iterable
+import csv
 import decimal
+import io
+import json
 
-from .models import Wallet, Transaction, Category
+from .models import (
+    Wallet, WalletBalance, DailyCashflow, WalletBalanceCheckpoint, Transaction, Category, CategoryClosure,
+    Transfer, ClosedPeriod, PeriodClosingBalance, PeriodClosedError, RecurringTransaction,
+    DIRECTION_INCOME, DIRECTION_EXPENSE, direction_for, normalize_tags, persisted_category_directions,
+)
+from .reference import registry
+from .data_version import bump_data_version
 from hr.models import Company
 
+AMOUNT_FIELD = DecimalField(max_digits=14, decimal_places=2)
+
 
 def create_wallet(company: Company, name: str) -> Wallet:
     """
@@ -23,21 +43,26 @@ def create_transaction(
     category: Category,
     amount,
     description: str = "",
-    reason_object=None
+    reason_object=None,
+    tags=None,
 ) -> Transaction:
     """
     Создаёт транзакцию в рамках заданной компании и кошелька.
     reason_object - произвольный объект (GenericForeignKey), если требуется.
+    tags - метки транзакции (нормализуются при сохранении).
     """
     if wallet.company_id != company.id:
         raise ValueError("Кошелёк принадлежит другой компании.")
+    if category.company_id not in (None, company.id):
+        raise ValueError("Категория принадлежит другой компании.")
 
     new_tx = Transaction(
         company=company,
         wallet=wallet,
         category=category,
         amount=amount,
-        description=description
+        description=description,
+        tags=tags or [],
     )
     if reason_object:
         new_tx.reason_transaction = reason_object
@@ -45,6 +70,945 @@ def create_transaction(
     new_tx.save()
     return new_tx
 
+
+# Вид деятельности, категории которого подходят для ног перевода,
+# если в справочнике нет technical_income / technical_expense
+TRANSFER_ACTIVITY_TYPE = 'Техническая операция'
+
+
+def get_transfer_categories(company: Optional[Company] = None) -> Tuple[Category, Category]:
+    """
+    Категории ног перевода (выбытие, поступление): technical_expense /
+    technical_income, иначе выбытие/поступление вида «Техническая операция».
+    Выбираются из общих статей и статей компании.
+    """
+    own = (
+        list(Category.objects.filter(company=company).select_related('activity_type'))
+        if company is not None else []
+    )
+    categories = sorted([*registry.categories(), *own], key=lambda obj: obj.pk)
+
+    def pick(operation_type, direction):
+        for obj in categories:
+            if obj.operation_type == operation_type:
+                return obj
+        for obj in categories:
+            if (obj.direction == direction and obj.activity_type is not None
+                    and obj.activity_type.name == TRANSFER_ACTIVITY_TYPE):
+                return obj
+        raise ValueError(f"Не найдена категория для перевода ({operation_type}).")
+
+    return pick('technical_expense', DIRECTION_EXPENSE), pick('technical_income', DIRECTION_INCOME)
+
+
+def create_transfer(
+    company: Company,
+    from_wallet: Wallet,
+    to_wallet: Wallet,
+    amount,
+    day: Optional[date] = None,
+    description: str = "",
+    allow_overdraft: bool = True,
+    from_category: Optional[Category] = None,
+    to_category: Optional[Category] = None,
+) -> Transfer:
+    """
+    Перевод между кошельками компании: запись перевода и обе ноги
+    (одним INSERT) в одной транзакции БД вместе с обновлением балансов.
+    При allow_overdraft=False балансы обоих кошельков коротко блокируются
+    в порядке wallet_id (как в _upsert_wallet_balances — без взаимных
+    блокировок при встречных переводах) и перевод сверх остатка отклоняется.
+    """
+    if from_wallet.pk == to_wallet.pk:
+        raise ValueError("Кошельки перевода должны различаться.")
+    if from_wallet.company_id != company.id or to_wallet.company_id != company.id:
+        raise ValueError("Кошелёк принадлежит другой компании.")
+    amount = decimal.Decimal(amount)
+    if amount <= 0:
+        raise ValueError("Сумма перевода должна быть положительной.")
+
+    if from_category is None or to_category is None:
+        default_from, default_to = get_transfer_categories(company)
+        from_category = from_category or default_from
+        to_category = to_category or default_to
+    if from_category.company_id not in (None, company.id) or to_category.company_id not in (None, company.id):
+        raise ValueError("Категория принадлежит другой компании.")
+    # Знаки ног — из БД, а не из реестра: они сохраняются в транзакциях
+    directions = persisted_category_directions([from_category.pk, to_category.pk])
+    if directions.get(from_category.pk) != DIRECTION_EXPENSE or directions.get(to_category.pk) != DIRECTION_INCOME:
+        raise ValueError("Категории перевода должны быть выбытием и поступлением.")
+
+    day = day or date.today()
+    with transaction.atomic():
+        if not allow_overdraft:
+            balances = dict(
+                WalletBalance.objects.filter(wallet_id__in=[from_wallet.pk, to_wallet.pk])
+                .order_by('wallet_id')
+                .select_for_update()
+                .values_list('wallet_id', 'balance')
+            )
+            available = balances.get(from_wallet.pk, decimal.Decimal('0.00'))
+            if available < amount:
+                raise ValueError(f"Недостаточно средств в кошельке: остаток {available}.")
+
+        transfer = Transfer.objects.create(
+            company=company,
+            from_wallet=from_wallet,
+            to_wallet=to_wallet,
+            amount=amount,
+            date=day,
+            description=description,
+        )
+        content_type = ContentType.objects.get_for_model(Transfer)
+        legs = [
+            Transaction(
+                company=company, wallet=wallet, category=category, amount=amount, date=day,
+                description=description or f"Перевод {from_wallet.name} → {to_wallet.name}",
+                direction=directions[category.pk], content_type=content_type, object_id=transfer.pk,
+            )
+            for wallet, category in ((from_wallet, from_category), (to_wallet, to_category))
+        ]
+        # bulk_create не вызывает сигналы — балансы обновляем явно
+        Transaction.objects.bulk_create(legs)
+        apply_ledger_changes(added=[leg.ledger_state() for leg in legs])
+    return transfer
+
+
+# Строк транзакций в одном INSERT генератора регулярных операций (9 параметров на строку)
+RECURRING_INSERT_CHUNK = 2000
+
+
+def generate_recurring_transactions(
+    until: Optional[date] = None,
+    batch_size: int = 500,
+    company: Optional[Company] = None,
+) -> Dict[str, int]:
+    """
+    Создаёт транзакции регулярных операций по день until включительно
+    (по умолчанию — сегодня) сразу для всех компаний.
+    Расписания читаются пачками по batch_size одним запросом
+    (FOR UPDATE SKIP LOCKED — параллельные прогоны делят работу),
+    вхождения пачки вставляются одним INSERT ... ON CONFLICT DO NOTHING
+    по уникальному индексу (recurring, date), балансы и свод обновляются
+    одним apply_ledger_changes, generated_until — одним UPDATE.
+    Повторный прогон ничего не дублирует. Вхождения в закрытых месяцах пропускаются.
+    """
+    until = until or date.today()
+    due = RecurringTransaction.objects.filter(is_active=True, start_date__lte=until).filter(
+        Q(generated_until__isnull=True) | Q(generated_until__lt=until),
+        Q(end_date__isnull=True) | Q(generated_until__isnull=True) | Q(end_date__gt=F('generated_until')),
+    )
+    if company is not None:
+        due = due.filter(company=company)
+
+    stats = {'schedules': 0, 'created': 0}
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                due.filter(id__gt=last_id).order_by('id').select_for_update(skip_locked=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].pk
+            stats['created'] += _materialize_recurring(batch, until)
+            RecurringTransaction.objects.filter(pk__in=[obj.pk for obj in batch]).update(generated_until=until)
+            stats['schedules'] += len(batch)
+    return stats
+
+
+def _materialize_recurring(schedules: List[RecurringTransaction], until: date) -> int:
+    """
+    Вставляет вхождения пачки расписаний с даты после generated_until по until.
+    Возвращает число созданных транзакций (без уже существовавших).
+    """
+    closed = set(
+        ClosedPeriod.objects.filter(company_id__in={obj.company_id for obj in schedules})
+        .values_list('company_id', 'month')
+    )
+    directions = persisted_category_directions(obj.category_id for obj in schedules)
+    rows = []
+    for schedule in schedules:
+        direction = directions[schedule.category_id]
+        since = (
+            schedule.generated_until + timedelta(days=1)
+            if schedule.generated_until else schedule.start_date
+        )
+        for day in schedule.occurrences(since, until):
+            if (schedule.company_id, day.replace(day=1)) not in closed:
+                rows.append((schedule, day, direction))
+    if not rows:
+        return 0
+
+    table = Transaction._meta.db_table
+    tags_field = Transaction._meta.get_field('tags')
+    date_field = Transaction._meta.get_field('date')
+    added = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), RECURRING_INSERT_CHUNK):
+            chunk = rows[start:start + RECURRING_INSERT_CHUNK]
+            placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(chunk))
+            params = []
+            for schedule, day, direction in chunk:
+                params += [
+                    schedule.company_id, schedule.wallet_id, schedule.category_id, schedule.pk, day,
+                    schedule.amount, direction, schedule.description,
+                    tags_field.get_db_prep_value(schedule.tags, connection),
+                ]
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (
+                    company_id, wallet_id, category_id, recurring_id, date,
+                    amount, direction, description, tags
+                )
+                VALUES {placeholders}
+                ON CONFLICT (recurring_id, date) WHERE recurring_id IS NOT NULL DO NOTHING
+                RETURNING recurring_id, date
+                """,
+                params
+            )
+            inserted = {(recurring_id, date_field.to_python(day)) for recurring_id, day in cursor.fetchall()}
+            added += [
+                (schedule.company_id, schedule.wallet_id, schedule.category_id, day, schedule.amount, direction)
+                for schedule, day, direction in chunk
+                if (schedule.pk, day) in inserted
+            ]
+    # INSERT в обход ORM не вызывает сигналы — балансы обновляем явно
+    apply_ledger_changes(added=added)
+    return len(added)
+
+
+IMPORT_COLUMNS = ('wallet_id', 'category_id', 'amount', 'date', 'description', 'tags')
+AMOUNT_LIMIT = decimal.Decimal('99999999.99')  # max_digits=10, decimal_places=2
+
+
+def parse_transaction_import(content, file_format: str) -> List[Dict[str, Any]]:
+    """
+    Разбирает пакет транзакций из CSV (с заголовком) или JSON
+    (список объектов либо {"rows": [...]}). Значения не валидирует —
+    это делает bulk_create_transactions, чтобы вернуть ошибки по строкам.
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+
+    if file_format == 'csv':
+        reader = csv.DictReader(io.StringIO(content))
+        return [dict(row) for row in reader]
+    if file_format == 'json':
+        data = json.loads(content) if isinstance(content, str) else content
+        if isinstance(data, dict):
+            data = data.get('rows', [])
+        if not isinstance(data, list):
+            raise ValueError("Ожидается список транзакций.")
+        return data
+    raise ValueError(f"Неподдерживаемый формат: {file_format}")
+
+
+def _validate_import_row(row, wallet_ids, category_directions, today, closed_months=frozenset()):
+    """
+    Проверяет одну строку пакета по заранее загруженным id кошельков,
+    направлениям категорий ({id: direction}) и закрытым месяцам компании.
+    Возвращает (значения, ошибки).
+    """
+    if not isinstance(row, dict):
+        return None, {'row': "Ожидается объект с полями транзакции."}
+
+    errors = {}
+    wallet_id = str(row.get('wallet_id') or row.get('wallet') or '').strip()
+    category_id = str(row.get('category_id') or row.get('category') or '').strip()
+
+    if not wallet_id.isdigit() or int(wallet_id) not in wallet_ids:
+        errors['wallet_id'] = "Кошелёк не найден в компании."
+    if not category_id.isdigit() or int(category_id) not in category_directions:
+        errors['category_id'] = "Категория не найдена."
+
+    amount = None
+    try:
+        amount = decimal.Decimal(str(row.get('amount', '')).strip().replace(',', '.'))
+        if not amount.is_finite() or amount <= 0 or amount > AMOUNT_LIMIT:
+            raise decimal.InvalidOperation
+        amount = amount.quantize(decimal.Decimal('0.01'))
+    except (decimal.InvalidOperation, ValueError):
+        errors['amount'] = "Сумма должна быть положительным числом (не более 99 999 999.99)."
+
+    tx_date = today
+    date_str = str(row.get('date') or '').strip()
+    if date_str:
+        try:
+            tx_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        except ValueError:
+            errors['date'] = "Дата должна быть в формате ГГГГ-ММ-ДД."
+        else:
+            if tx_date.replace(day=1) in closed_months:
+                errors['date'] = f"Период {tx_date:%m.%Y} закрыт для изменений."
+
+    # Метки: список (JSON) или строка через запятую (CSV)
+    tags = []
+    try:
+        tags = normalize_tags(row.get('tags'))
+    except ValueError as exc:
+        errors['tags'] = str(exc)
+
+    if errors:
+        return None, errors
+    return {
+        'wallet_id': int(wallet_id),
+        'category_id': int(category_id),
+        'amount': amount,
+        'date': tx_date,
+        'description': str(row.get('description') or ''),
+        'direction': category_directions[int(category_id)],
+        'tags': tags,
+    }, None
+
+
+def bulk_create_transactions(
+    company: Company,
+    rows: List[Dict[str, Any]],
+    chunk_size: int = 2000,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Массовая загрузка транзакций.
+    Принадлежность кошельков и существование категорий проверяются
+    одним запросом на весь пакет, вставка — bulk_create по chunk_size строк,
+    балансы и дневной свод обновляются одним upsert на каждый chunk.
+    Строки с ошибками пропускаются и возвращаются в errors с номером строки.
+    """
+    def raw_ids(*keys):
+        ids = set()
+        for row in rows:
+            if isinstance(row, dict):
+                value = str(next((row.get(k) for k in keys if row.get(k)), '')).strip()
+                if value.isdigit():
+                    ids.add(int(value))
+        return ids
+
+    wallet_ids = set(
+        Wallet.objects.filter(company=company, id__in=raw_ids('wallet_id', 'wallet'))
+        .values_list('id', flat=True)
+    )
+    category_directions = {
+        category_id: direction_for(operation_type)
+        for category_id, operation_type in Category.objects.visible_to(company).filter(
+            id__in=raw_ids('category_id', 'category')
+        ).values_list('id', 'operation_type')
+    }
+
+    closed_months = set(ClosedPeriod.objects.filter(company=company).values_list('month', flat=True))
+
+    today = date.today()
+    valid, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        values, row_errors = _validate_import_row(row, wallet_ids, category_directions, today, closed_months)
+        if row_errors:
+            errors.append({'row': number, 'errors': row_errors})
+        else:
+            valid.append(Transaction(company=company, **values))
+
+    created = 0
+    if not dry_run:
+        for start in range(0, len(valid), chunk_size):
+            chunk = valid[start:start + chunk_size]
+            with transaction.atomic():
+                Transaction.objects.bulk_create(chunk)
+                apply_ledger_changes(added=[tx.ledger_state() for tx in chunk])
+            created += len(chunk)
+
+    return {
+        'total': len(rows),
+        'valid': len(valid),
+        'created': created,
+        'errors': errors,
+    }
+
+
+def apply_ledger_changes(
+    added: Iterable[tuple] = (),
+    removed: Iterable[tuple] = (),
+    update_rollup: bool = True,
+) -> None:
+    """
+    Инкрементально обновляет WalletBalance и дневной свод DailyCashflow.
+    added / removed — кортежи Transaction.ledger_state():
+    (company_id, wallet_id, category_id, date, amount, direction).
+    Вызывается внутри транзакции БД, в которой пишутся сами транзакции.
+    """
+    changes = [(row, 1) for row in added] + [(row, -1) for row in removed]
+    if not changes:
+        return
+
+    zero = decimal.Decimal('0.00')
+    # wallet_id -> [balance, income_total, expense_total]
+    deltas = defaultdict(lambda: [zero] * 3)
+    # (company_id, wallet_id, category_id, day) -> [net_flow, income, expense, income_count, expense_count]
+    rollup = defaultdict(lambda: [zero, zero, zero, 0, 0])
+    # (wallet_id, day) -> чистая дельта (для контрольных точек остатков)
+    day_deltas = defaultdict(lambda: zero)
+    for (company_id, wallet_id, category_id, day, amount, direction), sign in changes:
+        amount = decimal.Decimal(amount) * sign
+        key = (company_id, wallet_id, category_id, day)
+        if direction == DIRECTION_INCOME:
+            deltas[wallet_id][0] += amount
+            deltas[wallet_id][1] += amount
+            rollup[key][0] += amount
+            rollup[key][1] += amount
+            rollup[key][3] += sign
+            day_deltas[(wallet_id, day)] += amount
+        elif direction == DIRECTION_EXPENSE:
+            deltas[wallet_id][0] -= amount
+            deltas[wallet_id][2] += amount
+            rollup[key][0] -= amount
+            rollup[key][2] += amount
+            rollup[key][4] += sign
+            day_deltas[(wallet_id, day)] -= amount
+
+    _upsert_wallet_balances(deltas)
+    bump_data_version(row[0] for row, _ in changes)
+    # Проверка после upsert: строки балансов уже заблокированы, и close_period
+    # не может закоммитить закрытие месяца между проверкой и нашей записью
+    _ensure_periods_open(changes)
+    _shift_balance_checkpoints(day_deltas)
+    if update_rollup:
+        _upsert_daily_cashflow(rollup)
+
+
+def _upsert_wallet_balances(deltas: Dict[int, List[decimal.Decimal]]) -> None:
+    """
+    Добавляет дельты к балансам одним INSERT ... ON CONFLICT.
+    Кошельки сортируются по id, чтобы параллельные записи брали
+    блокировки строк в одном порядке и не попадали в deadlock.
+    """
+    rows = [(wallet_id, *values) for wallet_id, values in sorted(deltas.items()) if any(values)]
+    if not rows:
+        return
+
+    table = WalletBalance._meta.db_table
+    now = timezone.now()
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(rows))
+    sql = f"""
+        INSERT INTO {table} (wallet_id, balance, income_total, expense_total, updated_at)
+        VALUES {placeholders}
+        ON CONFLICT (wallet_id) DO UPDATE SET
+            balance = {table}.balance + EXCLUDED.balance,
+            income_total = {table}.income_total + EXCLUDED.income_total,
+            expense_total = {table}.expense_total + EXCLUDED.expense_total,
+            updated_at = EXCLUDED.updated_at
+    """
+    params = [value for row in rows for value in (*row, now)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _ensure_periods_open(changes) -> None:
+    """
+    PeriodClosedError, если хоть одна строка попадает в закрытый месяц.
+    Закрываются только прошедшие месяцы, поэтому записи текущего месяца
+    проверку не запрашивают.
+    """
+    current_month = date.today().replace(day=1)
+    months = {
+        (company_id, day.replace(day=1))
+        for (company_id, _, _, day, *_), _ in changes
+        if day < current_month
+    }
+    if not months:
+        return
+    query = Q()
+    for company_id, month in months:
+        query |= Q(company_id=company_id, month=month)
+    closed = ClosedPeriod.objects.filter(query).values_list('month', flat=True).first()
+    if closed is not None:
+        raise PeriodClosedError(f"Период {closed:%m.%Y} закрыт для изменений.")
+
+
+def ensure_period_open(company_id: int, wallet_id: int, day: date) -> None:
+    """
+    PeriodClosedError, если день попадает в закрытый месяц компании.
+    Для изменений транзакции, не затрагивающих суммы (описание, метки):
+    строка баланса кошелька блокируется так же, как в apply_ledger_changes,
+    чтобы close_period не закрыл месяц между проверкой и коммитом.
+    """
+    if day >= date.today().replace(day=1):
+        return
+    list(WalletBalance.objects.filter(wallet_id=wallet_id).select_for_update().values_list('wallet_id', flat=True))
+    _ensure_periods_open([((company_id, wallet_id, None, day), 1)])
+
+
+def _shift_balance_checkpoints(deltas: Dict[tuple, decimal.Decimal]) -> None:
+    """
+    Сдвигает контрольные точки остатков на изменения, внесённые задним числом:
+    точка (кошелёк, D) получает сумму дельт этого кошелька за дни <= D.
+    Точки ставятся только на прошедшие дни, поэтому записи текущим днём
+    сюда не доходят и лишнего запроса не делают.
+    """
+    today = date.today()
+    rows = [(wallet_id, day, delta) for (wallet_id, day), delta in sorted(deltas.items()) if delta and day < today]
+    if not rows:
+        return
+
+    table = WalletBalanceCheckpoint._meta.db_table
+    placeholders = ", ".join(["(%s, %s, %s)"] * len(rows))
+    sql = f"""
+        WITH changes (wallet_id, day, delta) AS (VALUES {placeholders})
+        UPDATE {table} SET balance = {table}.balance + shifted.delta
+        FROM (
+            SELECT checkpoint.id, SUM(changes.delta) AS delta
+            FROM {table} AS checkpoint
+            JOIN changes
+              ON checkpoint.wallet_id = changes.wallet_id AND checkpoint.day >= changes.day
+            GROUP BY checkpoint.id
+        ) AS shifted
+        WHERE {table}.id = shifted.id
+    """
+    params = [value for row in rows for value in row]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _upsert_daily_cashflow(deltas: Dict[tuple, list]) -> None:
+    """
+    Добавляет дельты к строкам дневного свода одним INSERT ... ON CONFLICT.
+    """
+    rows = [(*key, *values) for key, values in sorted(deltas.items()) if any(values)]
+    if not rows:
+        return
+
+    table = DailyCashflow._meta.db_table
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(rows))
+    sql = f"""
+        INSERT INTO {table} (
+            company_id, wallet_id, category_id, day,
+            net_flow, income, expense, income_count, expense_count
+        )
+        VALUES {placeholders}
+        ON CONFLICT (company_id, wallet_id, category_id, day) DO UPDATE SET
+            net_flow = {table}.net_flow + EXCLUDED.net_flow,
+            income = {table}.income + EXCLUDED.income,
+            expense = {table}.expense + EXCLUDED.expense,
+            income_count = {table}.income_count + EXCLUDED.income_count,
+            expense_count = {table}.expense_count + EXCLUDED.expense_count
+    """
+    params = [value for row in rows for value in row]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _daily_cashflow_from_transactions(transactions):
+    """
+    Группирует транзакции в строки дневного свода (как их считает apply_ledger_changes).
+    """
+    return (
+        transactions
+        .values('company_id', 'wallet_id', 'category_id', 'date')
+        .annotate(
+            income=Coalesce(Sum('amount', filter=Q(direction=DIRECTION_INCOME)), Value(0), output_field=AMOUNT_FIELD),
+            expense=Coalesce(Sum('amount', filter=Q(direction=DIRECTION_EXPENSE)), Value(0), output_field=AMOUNT_FIELD),
+            income_count=Count('id', filter=Q(direction=DIRECTION_INCOME)),
+            expense_count=Count('id', filter=Q(direction=DIRECTION_EXPENSE)),
+        )
+        .order_by()
+    )
+
+
+def rebuild_daily_cashflow(
+    company: Optional[Company] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    verify_only: bool = False,
+    category: Optional[Category] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Сверяет дневной свод с транзакциями (backfill/reconcile).
+    Возвращает список расхождений; если verify_only=False — перестраивает
+    свод в заданных границах (компания / период / категория).
+    """
+    transactions = Transaction.objects.all()
+    stored_qs = DailyCashflow.objects.all()
+    if company is not None:
+        transactions = transactions.filter(company=company)
+        stored_qs = stored_qs.filter(company=company)
+    if category is not None:
+        transactions = transactions.filter(category=category)
+        stored_qs = stored_qs.filter(category=category)
+    if start_date:
+        transactions = transactions.filter(date__gte=start_date)
+        stored_qs = stored_qs.filter(day__gte=start_date)
+    if end_date:
+        transactions = transactions.filter(date__lte=end_date)
+        stored_qs = stored_qs.filter(day__lte=end_date)
+
+    expected = {}
+    for row in _daily_cashflow_from_transactions(transactions).iterator():
+        if not (row['income_count'] or row['expense_count']):
+            continue
+        key = (row['company_id'], row['wallet_id'], row['category_id'], row['date'])
+        expected[key] = (
+            row['income'] - row['expense'], row['income'], row['expense'],
+            row['income_count'], row['expense_count'],
+        )
+
+    empty = (0, 0, 0, 0, 0)
+    stored = {
+        (row[0], row[1], row[2], row[3]): tuple(row[4:])
+        for row in stored_qs.values_list(
+            'company_id', 'wallet_id', 'category_id', 'day',
+            'net_flow', 'income', 'expense', 'income_count', 'expense_count',
+        ).iterator()
+    }
+    mismatches = [
+        {'key': key, 'stored': stored.get(key, empty), 'expected': expected.get(key, empty)}
+        for key in sorted(expected.keys() | stored.keys())
+        if stored.get(key, empty) != expected.get(key, empty)
+    ]
+
+    if mismatches and not verify_only:
+        with transaction.atomic():
+            stored_qs.delete()
+            DailyCashflow.objects.bulk_create(
+                [
+                    DailyCashflow(
+                        company_id=company_id, wallet_id=wallet_id, category_id=category_id, day=day,
+                        net_flow=values[0], income=values[1], expense=values[2],
+                        income_count=values[3], expense_count=values[4],
+                    )
+                    for (company_id, wallet_id, category_id, day), values in expected.items()
+                ],
+                batch_size=1000,
+            )
+            bump_data_version(mismatch['key'][0] for mismatch in mismatches)
+    return mismatches
+
+
+def rebuild_wallet_balances(
+    company: Optional[Company] = None,
+    verify_only: bool = False,
+    wallet_ids: Optional[Iterable[int]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Пересчитывает балансы кошельков по транзакциям и сверяет их с WalletBalance.
+    Возвращает список расхождений. Если verify_only=False — исправляет их.
+    """
+    zero = decimal.Decimal('0.00')
+    wallets = Wallet.objects.all()
+    transactions = Transaction.objects.all()
+    if company is not None:
+        wallets = wallets.filter(company=company)
+        transactions = transactions.filter(company=company)
+    if wallet_ids is not None:
+        wallets = wallets.filter(id__in=list(wallet_ids))
+        transactions = transactions.filter(wallet__in=wallets)
+
+    expected = {
+        row['wallet_id']: row
+        for row in transactions.values('wallet_id').annotate(
+            income_total=Sum('amount', filter=Q(direction=DIRECTION_INCOME)),
+            expense_total=Sum('amount', filter=Q(direction=DIRECTION_EXPENSE)),
+        ).order_by()
+    }
+    stored = {
+        state.wallet_id: state
+        for state in WalletBalance.objects.filter(wallet__in=wallets)
+    }
+
+    mismatches = []
+    fixed = []
+    for wallet_id in wallets.order_by('id').values_list('id', flat=True):
+        row = expected.get(wallet_id, {})
+        income_total = row.get('income_total') or zero
+        expense_total = row.get('expense_total') or zero
+        balance = income_total - expense_total
+
+        state = stored.get(wallet_id)
+        current = (state.balance, state.income_total, state.expense_total) if state else (zero, zero, zero)
+        if current == (balance, income_total, expense_total) and state is not None:
+            continue
+        if state is not None or balance or income_total or expense_total:
+            mismatches.append({
+                'wallet_id': wallet_id,
+                'stored_balance': current[0],
+                'expected_balance': balance,
+            })
+        fixed.append(WalletBalance(
+            wallet_id=wallet_id,
+            balance=balance,
+            income_total=income_total,
+            expense_total=expense_total,
+        ))
+
+    if fixed and not verify_only:
+        with transaction.atomic():
+            WalletBalance.objects.bulk_create(
+                fixed,
+                update_conflicts=True,
+                unique_fields=['wallet'],
+                update_fields=['balance', 'income_total', 'expense_total', 'updated_at'],
+            )
+    return mismatches
+
+
+def resign_category_transactions(category: Category) -> int:
+    """
+    Переписывает direction у транзакций категории после смены её operation_type
+    и перестраивает балансы затронутых кошельков, их контрольные точки остатков
+    и дневной свод категории. Если хоть одна такая транзакция лежит в закрытом месяце — PeriodClosedError
+    (итоги закрытого месяца в PeriodClosingBalance менять нельзя).
+    Возвращает число перезаписанных транзакций.
+    """
+    direction = category.direction
+    with transaction.atomic():
+        stale = Transaction.objects.filter(category=category).exclude(direction=direction)
+        wallet_ids = set(stale.values_list('wallet_id', flat=True).distinct())
+        # Те же блокировки, что у apply_ledger_changes и close_period: параллельные
+        # записи в эти кошельки и закрытие месяца ждут конца перезаписи
+        list(
+            WalletBalance.objects.filter(wallet_id__in=wallet_ids)
+            .order_by('wallet_id')
+            .select_for_update()
+            .values_list('wallet_id', flat=True)
+        )
+        closed = (
+            stale.annotate(month=TruncMonth('date'))
+            .filter(Exists(ClosedPeriod.objects.filter(company_id=OuterRef('company_id'), month=OuterRef('month'))))
+            .order_by('date')
+            .values_list('date', flat=True)
+            .first()
+        )
+        if closed is not None:
+            raise PeriodClosedError(
+                f"Период {closed:%m.%Y} закрыт для изменений: "
+                f"тип операции статьи «{category.name}» сменить нельзя."
+            )
+        # Контрольные точки остатков сдвигаем на разницу знаков до перезаписи:
+        # (новый direction - старый) * сумма по (кошелёк, день)
+        day_deltas = {
+            (row['wallet_id'], row['date']): row['delta']
+            for row in stale.values('wallet_id', 'date').annotate(
+                delta=Sum((Value(direction) - F('direction')) * F('amount'), output_field=AMOUNT_FIELD)
+            ).order_by()
+        }
+        _shift_balance_checkpoints(day_deltas)
+        updated = stale.update(direction=direction)
+        if updated:
+            rebuild_wallet_balances(wallet_ids=wallet_ids)
+            rebuild_daily_cashflow(category=category)
+    return updated
+
+
+def update_category_closure(category: Category) -> None:
+    """
+    Строки CategoryClosure для новой статьи или после смены её родителя:
+    связи поддерева статьи с прежними предками удаляются, с предками нового
+    родителя — добавляются. Связи внутри поддерева не меняются.
+    """
+    with transaction.atomic():
+        subtree = dict(
+            CategoryClosure.objects.filter(ancestor=category).values_list('descendant_id', 'depth')
+        )
+        if not subtree:
+            CategoryClosure.objects.create(ancestor=category, descendant=category, depth=0)
+            subtree = {category.pk: 0}
+        CategoryClosure.objects.filter(descendant_id__in=subtree).exclude(ancestor_id__in=subtree).delete()
+        if category.parent_id is None:
+            return
+        ancestors = CategoryClosure.objects.filter(
+            descendant_id=category.parent_id
+        ).values_list('ancestor_id', 'depth')
+        CategoryClosure.objects.bulk_create([
+            CategoryClosure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=up + down + 1)
+            for ancestor_id, up in ancestors
+            for descendant_id, down in subtree.items()
+        ])
+
+
+def rebuild_category_closure() -> int:
+    """
+    Полностью пересобирает CategoryClosure по полям parent
+    (после загрузки справочника из фикстур в произвольном порядке и т.п.).
+    Возвращает число записанных строк.
+    """
+    parents = dict(Category.objects.values_list('id', 'parent_id'))
+    rows = []
+    for category_id in parents:
+        node, depth, seen = category_id, 0, set()
+        while node is not None and node not in seen:
+            seen.add(node)
+            rows.append(CategoryClosure(ancestor_id=node, descendant_id=category_id, depth=depth))
+            node, depth = parents.get(node), depth + 1
+    with transaction.atomic():
+        CategoryClosure.objects.all().delete()
+        CategoryClosure.objects.bulk_create(rows, batch_size=2000)
+    return len(rows)
+
+
+def create_balance_checkpoints(day: date, company: Optional[Company] = None) -> int:
+    """
+    Ставит (или пересчитывает) контрольные точки остатков кошельков на конец дня day:
+    текущий баланс минус дневной свод после day. Балансы блокируются
+    в порядке wallet_id (как в _upsert_wallet_balances), чтобы параллельные
+    записи транзакций дождались точек и сдвинули их сами.
+    Возвращает число записанных точек.
+    """
+    if day >= date.today():
+        raise ValueError("Контрольная точка ставится только на прошедший день.")
+
+    wallets = Wallet.objects.all()
+    if company is not None:
+        wallets = wallets.filter(company=company)
+
+    with transaction.atomic():
+        balances = dict(
+            WalletBalance.objects.filter(wallet__in=wallets)
+            .order_by('wallet_id')
+            .select_for_update()
+            .values_list('wallet_id', 'balance')
+        )
+        later = dict(
+            DailyCashflow.objects.filter(wallet__in=wallets, day__gt=day)
+            .values('wallet_id')
+            .annotate(total=Sum('net_flow'))
+            .order_by()
+            .values_list('wallet_id', 'total')
+        )
+        zero = decimal.Decimal('0.00')
+        checkpoints = [
+            WalletBalanceCheckpoint(
+                wallet_id=wallet_id,
+                day=day,
+                balance=balances.get(wallet_id, zero) - later.get(wallet_id, zero),
+            )
+            for wallet_id in wallets.order_by('id').values_list('id', flat=True)
+        ]
+        WalletBalanceCheckpoint.objects.bulk_create(
+            checkpoints,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['wallet', 'day'],
+            update_fields=['balance'],
+        )
+    return len(checkpoints)
+
+
+def close_period(company: Company, month: date, user=None) -> ClosedPeriod:
+    """
+    Закрывает прошедший месяц компании: запрещает изменения транзакций
+    с датой в этом месяце, замораживает итоги месяца по (кошелёк, категория)
+    в PeriodClosingBalance и ставит контрольные точки остатков на конец месяца.
+    """
+    month = month.replace(day=1)
+    if month >= date.today().replace(day=1):
+        raise ValueError("Закрыть можно только прошедший месяц.")
+    next_month = (month + timedelta(days=32)).replace(day=1)
+
+    with transaction.atomic():
+        # Блокировки балансов — те же, что берёт apply_ledger_changes:
+        # параллельная запись в этот месяц либо попадёт в итоги, либо
+        # после нашего коммита получит PeriodClosedError
+        list(
+            WalletBalance.objects.filter(wallet__company=company)
+            .order_by('wallet_id')
+            .select_for_update()
+            .values_list('wallet_id', flat=True)
+        )
+        period, created = ClosedPeriod.objects.get_or_create(
+            company=company, month=month, defaults={'closed_by': user}
+        )
+        if not created:
+            raise ValueError(f"Период {month:%m.%Y} уже закрыт.")
+
+        rows = (
+            DailyCashflow.objects
+            .filter(company=company, day__gte=month, day__lt=next_month)
+            .values('wallet_id', 'category_id')
+            .annotate(
+                net_flow_total=Sum('net_flow'),
+                income_total=Sum('income'),
+                expense_total=Sum('expense'),
+                income_count_total=Sum('income_count'),
+                expense_count_total=Sum('expense_count'),
+            )
+            .order_by()
+        )
+        PeriodClosingBalance.objects.bulk_create([
+            PeriodClosingBalance(
+                company=company, month=month,
+                wallet_id=row['wallet_id'], category_id=row['category_id'],
+                net_flow=row['net_flow_total'], income=row['income_total'], expense=row['expense_total'],
+                income_count=row['income_count_total'], expense_count=row['expense_count_total'],
+            )
+            for row in rows
+        ], batch_size=1000)
+        create_balance_checkpoints(next_month - timedelta(days=1), company=company)
+    return period
+
+
+def reopen_period(company: Company, month: date) -> None:
+    """
+    Открывает месяц обратно: снимает запрет и удаляет замороженные итоги
+    (контрольные точки остатков остаются — их поддерживает apply_ledger_changes).
+    """
+    month = month.replace(day=1)
+    with transaction.atomic():
+        deleted, _ = ClosedPeriod.objects.filter(company=company, month=month).delete()
+        if not deleted:
+            raise ValueError(f"Период {month:%m.%Y} не закрыт.")
+        PeriodClosingBalance.objects.filter(company=company, month=month).delete()
+
+
+def get_wallet_balance_as_of(wallet: Wallet, as_of: date) -> Dict[str, Any]:
+    """
+    Остаток кошелька на конец дня as_of.
+    Берётся ближайшая опорная точка — контрольная точка до/после as_of
+    или текущий баланс — и к ней прибавляется (вычитается) дневной свод
+    между опорной точкой и as_of. Каждый вариант — один SQL-запрос,
+    объём сканирования пропорционален числу дней от опорной точки.
+    """
+    zero = decimal.Decimal('0.00')
+    today = date.today()
+    checkpoints = WalletBalanceCheckpoint.objects.filter(wallet=wallet)
+    before = checkpoints.filter(day__lte=as_of).order_by('-day').first()
+    after = checkpoints.filter(day__gt=as_of).order_by('day').first()
+
+    # (расстояние в днях, опорная точка); без точек — только текущий баланс
+    anchors = [(max((today - as_of).days, 0), None)]
+    if before is not None:
+        anchors.append(((as_of - before.day).days, before))
+    if after is not None:
+        anchors.append(((after.day - as_of).days, after))
+    _, anchor = min(anchors, key=lambda item: (item[0], item[1] is None))
+
+    flows = DailyCashflow.objects.filter(wallet=OuterRef('wallet')).values('wallet')
+    if anchor is None:
+        flows = flows.filter(day__gt=as_of)
+        base_qs = WalletBalance.objects.filter(wallet=wallet)
+        sign = -1
+    elif anchor.day <= as_of:
+        flows = flows.filter(day__gt=anchor.day, day__lte=as_of)
+        base_qs = WalletBalanceCheckpoint.objects.filter(pk=anchor.pk)
+        sign = 1
+    else:
+        flows = flows.filter(day__gt=as_of, day__lte=anchor.day)
+        base_qs = WalletBalanceCheckpoint.objects.filter(pk=anchor.pk)
+        sign = -1
+
+    # Опорный остаток и дельта читаются одним запросом — согласованный снимок
+    row = base_qs.annotate(
+        delta=Coalesce(
+            Subquery(flows.annotate(total=Sum('net_flow')).values('total')),
+            Value(zero),
+            output_field=AMOUNT_FIELD,
+        )
+    ).values_list('balance', 'delta').first()
+    base, delta = row if row else (zero, zero)
+
+    return {
+        'wallet': wallet.pk,
+        'as_of': as_of,
+        'balance': base + sign * delta,
+        'checkpoint': anchor.day if anchor is not None else None,
+    }
+
+
 def get_wallets_for_company(company: Company):
     """
     Возвращает QuerySet кошельков, принадлежащих конкретной компании,
@@ -74,6 +1038,9 @@ def parse_transaction_filters(request) -> Dict[str, Optional[Any]]:
     amount_min_str = request.GET.get('amount_min')
     amount_max_str = request.GET.get('amount_max')
     desc_substr = request.GET.get('desc')
+    search_query = request.GET.get('search')
+    tags_all_str = request.GET.get('tags_all')
+    tags_any_str = request.GET.get('tags_any')
 
     try:
         exact_date = datetime.strptime(exact_date_str, "%Y-%m-%d").date() if exact_date_str else None
@@ -97,8 +1064,21 @@ def parse_transaction_filters(request) -> Dict[str, Optional[Any]]:
         'amount_min': float(amount_min_str) if amount_min_str else None,
         'amount_max': float(amount_max_str) if amount_max_str else None,
         'description_substring': desc_substr,
+        'search': search_query.strip() if search_query and search_query.strip() else None,
+        'tags_all': _parse_tags_param(tags_all_str),
+        'tags_any': _parse_tags_param(tags_any_str),
     }
 
+
+def _parse_tags_param(value: Optional[str]) -> Optional[List[str]]:
+    """
+    Метки из GET-параметра через запятую; пустое или некорректное значение — без фильтра.
+    """
+    try:
+        return normalize_tags(value) or None
+    except ValueError:
+        return None
+
 def get_filtered_transactions(
     company: Company,
     period=None,
@@ -111,21 +1091,33 @@ def get_filtered_transactions(
     amount_min=None,
     amount_max=None,
     description_substring=None,
-) -> Tuple[Any, decimal.Decimal]:
+    search=None,
+    tags_all=None,
+    tags_any=None,
+    with_total: bool = True,
+) -> Tuple[Any, Optional[decimal.Decimal]]:
     """
     Фильтрует QuerySet Transaction в рамках компании на основании параметров.
-    Возвращает (queryset, total_sum).
+    search — поиск по описанию: все слова запроса должны входить в описание,
+    строки получают аннотацию rank (сходство по триграммам) для сортировки.
+    Возвращает (queryset, total_sum), где total_sum — чистая сумма
+    (поступления минус выбытия). При with_total=False сумма не считается
+    (total_sum=None) — см. with_window_totals() для подсчёта итогов тем же
+    запросом, что и страница.
+    tags_all / tags_any — списки меток: транзакция содержит все / хотя бы одну.
     """
-    qs = Transaction.objects.select_related('category', 'wallet')
+    # Без JOIN на category/wallet: сериализатор отдаёт их id, а тип операции
+    # берётся из direction (справочник категорий — cashflow.reference)
+    qs = Transaction.objects.all()
     # Сначала фильтруем по company
     qs = qs.filter(company=company)
 
-    # transaction_type => фильтр по category__operation_type
+    # transaction_type => фильтр по direction (income/expense) или category__operation_type
     if transaction_type:
         if transaction_type == 'income':
-            qs = qs.filter(category__operation_type__in=['income', 'technical_income'])
+            qs = qs.filter(direction=DIRECTION_INCOME)
         elif transaction_type == 'expense':
-            qs = qs.filter(category__operation_type__in=['expense', 'technical_expense'])
+            qs = qs.filter(direction=DIRECTION_EXPENSE)
         else:
             qs = qs.filter(category__operation_type=transaction_type)
 
@@ -146,9 +1138,19 @@ def get_filtered_transactions(
         qs = qs.filter(amount__lte=amount_max)
 
     # Фильтр по описанию (substring)
+    # (UPPER(description) LIKE UPPER(...) — покрывается триграммным GIN-индексом)
     if description_substring:
         qs = qs.filter(description__icontains=description_substring)
 
+    if search:
+        qs = search_transactions(qs, search)
+
+    # Фильтр по меткам: tags @> ARRAY[...] / tags && ARRAY[...] — GIN-индекс cashflow_tx_tags
+    if tags_all:
+        qs = qs.filter(tags__contains=normalize_tags(tags_all))
+    if tags_any:
+        qs = qs.filter(tags__overlap=normalize_tags(tags_any))
+
     # Фильтрация по периоду
     if period:
         d_start, d_end = get_date_range_for_period(period, start_date, end_date)
@@ -160,7 +1162,9 @@ def get_filtered_transactions(
             qs = qs.filter(date__lte=d_end)
 
     # Сумма
-    total_sum = qs.aggregate(total=Sum('amount'))['total'] or decimal.Decimal('0.00')
+    total_sum = None
+    if with_total:
+        total_sum = qs.aggregate(total=Sum(_signed_amount()))['total'] or decimal.Decimal('0.00')
 
     # Сортируем по убыванию даты
     qs = qs.order_by('-date', '-id')
@@ -168,6 +1172,185 @@ def get_filtered_transactions(
     return qs, total_sum
 
 
+def search_transactions(qs, query: str):
+    """
+    Индексный поиск по описанию.
+    Каждое слово запроса — icontains, который PostgreSQL выполняет по
+    GIN-индексу gin_trgm_ops на UPPER(description) (без seq scan).
+    rank — word_similarity запроса и описания; приводится к double precision,
+    чтобы значение из курсора пагинации сравнивалось в SQL без потери точности.
+    """
+    for term in query.split():
+        qs = qs.filter(description__icontains=term)
+    return qs.annotate(
+        rank=Cast(TrigramWordSimilarity(query, 'description'), FloatField())
+    )
+
+
+def _signed_amount(direction=None):
+    """
+    Без аргумента — сумма со знаком (amount * direction).
+    С direction — только поступления или только выбытия, положительными числами.
+    """
+    if direction is None:
+        return ExpressionWrapper(F('amount') * F('direction'), output_field=AMOUNT_FIELD)
+    return Case(When(direction=direction, then=F('amount')), default=Value(0), output_field=AMOUNT_FIELD)
+
+
+def with_window_totals(qs):
+    """
+    Добавляет к каждой строке итоги по всему отфильтрованному набору
+    (SUM(...) OVER ()). Окно считается до LIMIT, поэтому страница строк
+    и итоги по фильтру приходят одним SQL-запросом.
+    """
+    return qs.annotate(
+        filter_income=Window(Sum(_signed_amount(DIRECTION_INCOME))),
+        filter_expense=Window(Sum(_signed_amount(DIRECTION_EXPENSE))),
+    )
+
+
+def read_window_totals(rows) -> Dict[str, decimal.Decimal]:
+    """
+    Достаёт итоги with_window_totals() из первой строки страницы.
+    Пустая страница первой выборки означает пустой фильтр — итоги нулевые.
+    """
+    zero = decimal.Decimal('0.00')
+    if not rows:
+        return {'income': zero, 'expense': zero, 'net': zero}
+    income = rows[0].filter_income or zero
+    expense = rows[0].filter_expense or zero
+    return {'income': income, 'expense': expense, 'net': income - expense}
+
+
+def filter_totals(qs) -> Dict[str, decimal.Decimal]:
+    """
+    Итоги по отфильтрованному набору отдельным агрегатом — для первой
+    страницы, до которой дошли по ссылке previous (окно with_window_totals
+    там считалось бы только по строкам до курсора).
+    """
+    zero = decimal.Decimal('0.00')
+    sums = qs.aggregate(
+        income=Sum(_signed_amount(DIRECTION_INCOME)),
+        expense=Sum(_signed_amount(DIRECTION_EXPENSE)),
+    )
+    income, expense = sums['income'] or zero, sums['expense'] or zero
+    return {'income': income, 'expense': expense, 'net': income - expense}
+
+
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('date', 'date'),
+    ('wallet', 'wallet__name'),
+    ('category', 'category__name'),
+    ('operation_type', 'category__operation_type'),
+    ('amount', 'amount'),
+    ('description', 'description'),
+)
+
+
+class _Echo:
+    """Псевдо-буфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def _iter_rows(headers, rows, file_format: str):
+    """
+    Кодирует поток кортежей в строки CSV (с заголовком) или NDJSON.
+    """
+    if file_format == 'ndjson':
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        for row in rows:
+            yield encoder.encode(dict(zip(headers, row))) + "\n"
+        return
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_transactions_export(qs, file_format: str = 'csv', chunk_size: int = 2000):
+    """
+    Генератор строк выгрузки транзакций (CSV или NDJSON).
+    Строки читаются через values_list().iterator(), что на PostgreSQL
+    означает серверный курсор: в памяти держится не больше chunk_size строк,
+    а первые байты уходят клиенту сразу.
+    """
+    headers = [name for name, _ in EXPORT_COLUMNS]
+    rows = qs.values_list(*(field for _, field in EXPORT_COLUMNS)).iterator(chunk_size=chunk_size)
+    yield from _iter_rows(headers, rows, file_format)
+
+
+STATEMENT_HEADERS = ('id', 'date', 'category', 'description', 'income', 'expense', 'balance')
+
+
+def get_wallet_statement(wallet: Wallet, start_date: date, end_date: date):
+    """
+    Выписка по кошельку за период: (входящий остаток, QuerySet строк).
+    Входящий остаток считается один раз (get_wallet_balance_as_of на день
+    до начала периода), остаток после каждой операции — оконной функцией
+    SUM(amount * direction) OVER (ORDER BY date, id) в том же запросе.
+    """
+    opening = get_wallet_balance_as_of(wallet, start_date - timedelta(days=1))['balance']
+    qs = (
+        Transaction.objects
+        .filter(wallet=wallet, date__gte=start_date, date__lte=end_date)
+        .annotate(
+            running_balance=ExpressionWrapper(
+                Value(opening, output_field=AMOUNT_FIELD) + Window(
+                    Sum(_signed_amount()),
+                    order_by=[F('date').asc(), F('id').asc()],
+                    frame=RowRange(start=None, end=0),
+                ),
+                output_field=AMOUNT_FIELD,
+            )
+        )
+        .order_by('date', 'id')
+    )
+    return opening, qs
+
+
+def iter_wallet_statement(wallet: Wallet, start_date: date, end_date: date,
+                          file_format: str = 'csv', chunk_size: int = 2000):
+    """
+    Потоковая выписка (CSV или NDJSON): строка входящего остатка, операции
+    с остатком после каждой и строка исходящего остатка. Строки читаются
+    серверным курсором, поэтому память не зависит от длины периода.
+    Названия общих статей — из справочника в памяти, статей компании —
+    из БД по одному запросу на статью.
+    """
+    zero = decimal.Decimal('0.00')
+    opening, qs = get_wallet_statement(wallet, start_date, end_date)
+    rows = qs.values_list(
+        'id', 'date', 'category_id', 'description', 'amount', 'direction', 'running_balance'
+    ).iterator(chunk_size=chunk_size)
+
+    # Общие статьи — из реестра, статьи компании — по одному запросу на статью
+    names = {}
+
+    def category_name(category_id):
+        if category_id not in names:
+            names[category_id] = registry.category(category_id).name
+        return names[category_id]
+
+    def statement_rows():
+        closing = opening
+        yield (None, start_date, None, "Входящий остаток", None, None, opening)
+        for tx_id, day, category_id, description, amount, direction, balance in rows:
+            closing = balance
+            yield (
+                tx_id, day, category_name(category_id), description,
+                amount if direction == DIRECTION_INCOME else zero,
+                amount if direction == DIRECTION_EXPENSE else zero,
+                balance,
+            )
+        yield (None, end_date, None, "Исходящий остаток", None, None, closing)
+
+    yield from _iter_rows(STATEMENT_HEADERS, statement_rows(), file_format)
+
+
 def get_date_range_for_period(period: str, custom_start=None, custom_end=None):
     """
     Возвращает (start, end) на основании period.
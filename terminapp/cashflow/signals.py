@@ -0,0 +1,130 @@
+# cashflow/signals.py
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from hr.models import Company
+from .models import Transaction, Wallet, Category, ActivityType
+from .reference import registry
+from .data_version import bump_data_version, bump_all_data_versions
+from .services import (
+    apply_ledger_changes, ensure_period_open, resign_category_transactions, update_category_closure,
+)
+
+
+def _deleted_with(origin, *models) -> bool:
+    """
+    True, если удаление каскадно пришло от объекта (или QuerySet) одной из моделей.
+    """
+    origin_model = origin.model if hasattr(origin, 'query') else type(origin)
+    return origin_model in models
+
+
+@receiver(pre_save, sender=Transaction)
+def transaction_pre_save(sender, instance, raw=False, **kwargs):
+    """
+    Если транзакция загружена без полей баланса (only/defer),
+    дочитываем их до сохранения, чтобы корректно снять старую сумму.
+    """
+    if raw or instance._state.adding or getattr(instance, '_ledger_state', None) is not None:
+        return
+    instance._ledger_state = (
+        Transaction.objects
+        .filter(pk=instance.pk)
+        .values_list(*Transaction.LEDGER_FIELDS)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Transaction)
+def transaction_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    Переносит изменение транзакции в балансы кошельков и дневной свод.
+    При loaddata (raw=True) балансы не трогаем — их пересобирает
+    manage.py rebuild_wallet_balances.
+    """
+    if raw:
+        return
+    previous = getattr(instance, '_ledger_state', None)
+    current = instance.ledger_state()
+    if not created and previous == current:
+        # Суммы не изменились, но описание/метки закрытого месяца менять тоже нельзя
+        ensure_period_open(instance.company_id, instance.wallet_id, instance.date)
+        # Описание/метки видны в отчётах — версию всё равно меняем
+        bump_data_version([instance.company_id])
+        return
+
+    apply_ledger_changes(
+        added=[current],
+        removed=[previous] if previous and not created else [],
+    )
+    instance.remember_ledger_state()
+
+
+@receiver(post_delete, sender=Transaction)
+def transaction_deleted(sender, instance, origin=None, **kwargs):
+    # Кошелёк/компания удаляются вместе с балансами и сводом — обновлять нечего
+    if origin is not None and _deleted_with(origin, Wallet, Company):
+        return
+    state = getattr(instance, '_ledger_state', None) or instance.ledger_state()
+    # Строки свода удаляемой категории уходят каскадом вместе с ней
+    apply_ledger_changes(
+        removed=[state],
+        update_rollup=not (origin is not None and _deleted_with(origin, Category)),
+    )
+
+
+@receiver([post_save, post_delete], sender=Wallet)
+def wallet_changed(sender, instance, **kwargs):
+    """
+    Название и состав кошельков видны в отчётах (балансы), в том числе
+    удаление кошелька вместе с его транзакциями — меняем версию данных компании.
+    """
+    bump_data_version([instance.company_id])
+
+
+@receiver(pre_save, sender=Category)
+def category_pre_save(sender, instance, raw=False, **kwargs):
+    """
+    Запоминаем прежние operation_type и parent, чтобы после сохранения понять,
+    поменялся ли знак у уже записанных транзакций и место статьи в дереве.
+    """
+    if raw or instance._state.adding:
+        instance._previous_operation_type = None
+        instance._previous_parent_id = None
+        return
+    previous = (
+        Category.objects.filter(pk=instance.pk).values_list('operation_type', 'parent_id').first()
+    )
+    instance._previous_operation_type, instance._previous_parent_id = previous or (None, None)
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, raw=False, **kwargs):
+    # Фикстуры (raw) тоже получают замыкание: родитель в них обычно идёт раньше,
+    # иначе — services.rebuild_category_closure()
+    if raw or created or instance.parent_id != getattr(instance, '_previous_parent_id', None):
+        update_category_closure(instance)
+
+    previous = getattr(instance, '_previous_operation_type', None)
+    if raw or created or previous is None or previous == instance.operation_type:
+        return
+    resign_category_transactions(instance)
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=ActivityType)
+def reference_changed(sender, instance, raw=False, **kwargs):
+    """
+    Общая строка справочника изменилась — сбрасываем версию реестра после
+    коммита (чтобы воркеры не успели перечитать незакоммиченное состояние)
+    и версию данных всех компаний: названия видны в их отчётах.
+    Строка компании в реестре не хранится — меняется только версия данных
+    этой компании.
+    """
+    if instance.company_id is None:
+        transaction.on_commit(registry.invalidate)
+        if not raw:
+            bump_all_data_versions()
+    elif not raw:
+        bump_data_version([instance.company_id])
@@ -0,0 +1,41 @@
+# cashflow/tasks.py
+from datetime import date, timedelta
+
+from django.db import connection
+
+from hr.models import Company
+from jobs.registry import task
+from .partitioning import ensure_partitions, is_partitioned
+from .services import generate_recurring_transactions, create_balance_checkpoints
+
+
+def _company(company_id):
+    return Company.objects.get(pk=company_id) if company_id else None
+
+
+@task('cashflow.generate_recurring_transactions')
+def generate_recurring(company_id=None, batch_size=500):
+    return generate_recurring_transactions(batch_size=batch_size, company=_company(company_id))
+
+
+@task('cashflow.create_balance_checkpoints')
+def balance_checkpoints(day=None, company_id=None):
+    """
+    По умолчанию — точка на вчерашний день (ежедневный запуск).
+    """
+    day = date.fromisoformat(day) if day else date.today() - timedelta(days=1)
+    return {'day': day, 'checkpoints': create_balance_checkpoints(day, company=_company(company_id))}
+
+
+@task('cashflow.ensure_partitions')
+def transaction_partitions(months_ahead=3):
+    """
+    Секции на будущие месяцы; пока таблица не переведена на секции
+    (partition_transactions --convert), задача ничего не делает.
+    """
+    if connection.vendor != 'postgresql':
+        return {'skipped': True}
+    with connection.cursor() as cursor:
+        if not is_partitioned(cursor):
+            return {'skipped': True}
+    return {'created': ensure_partitions(months_ahead=months_ahead)}
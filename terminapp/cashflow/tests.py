@@ -1 +1,350 @@
-# Create your tests here.
+# cashflow/tests.py
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from account.models import User
+from hr.models import Company
+from .models import (
+    Category, RecurringTransaction, Transaction, Transfer, WalletBalance, WalletBalanceCheckpoint, DailyCashflow,
+    PeriodClosedError, DIRECTION_INCOME, DIRECTION_EXPENSE,
+)
+from .reference import registry, VERSION_CACHE_KEY
+from .services import (
+    create_wallet, create_transfer, close_period, create_balance_checkpoints, rebuild_daily_cashflow,
+    rebuild_wallet_balances, get_wallet_statement, iter_wallet_statement, generate_recurring_transactions,
+)
+
+
+def previous_month() -> date:
+    return (date.today().replace(day=1) - timedelta(days=1)).replace(day=1)
+
+
+class CashflowTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'pw12345678')
+        self.company = Company.objects.create(name='Компания', subdomain='acme', owner=self.user)
+        self.wallet = create_wallet(self.company, 'Касса')
+        self.income = Category.objects.create(company=self.company, name='Продажи', operation_type='income')
+        self.expense = Category.objects.create(company=self.company, name='Закупки', operation_type='expense')
+
+    def add(self, amount, day, category=None, **kwargs):
+        return Transaction.objects.create(
+            company=self.company, wallet=self.wallet, category=category or self.income,
+            amount=Decimal(amount), date=day, **kwargs
+        )
+
+
+class LedgerTests(CashflowTestCase):
+    def edit_and_delete(self, check):
+        """Создание, изменение суммы/дня/статьи и удаление — после каждого шага check()."""
+        today = date.today()
+        sale = self.add('10', today)
+        self.add('3', today, category=self.expense)
+        check('7.00')
+
+        # Прежнее состояние вычитается, новое добавляется
+        sale.amount = Decimal('20')
+        sale.date = today - timedelta(days=1)
+        sale.category = self.expense
+        sale.save()
+        check('-23.00')
+
+        sale.delete()
+        check('-3.00')
+
+    def test_wallet_balance_follows_transactions(self):
+        def check(balance):
+            self.assertEqual(WalletBalance.objects.get(wallet=self.wallet).balance, Decimal(balance))
+            self.assertEqual(rebuild_wallet_balances(company=self.company, verify_only=True), [])
+
+        self.edit_and_delete(check)
+
+    def test_daily_cashflow_follows_transactions(self):
+        def check(balance):
+            # Свод по дням в сумме даёт остаток кошелька и совпадает с пересчётом
+            net_flow = DailyCashflow.objects.filter(wallet=self.wallet).aggregate(total=Sum('net_flow'))['total']
+            self.assertEqual(net_flow, Decimal(balance))
+            self.assertEqual(rebuild_daily_cashflow(company=self.company, verify_only=True), [])
+
+        self.edit_and_delete(check)
+        self.assertEqual(
+            list(DailyCashflow.objects.filter(expense_count__gt=0).values_list('day', 'expense')),
+            [(date.today(), Decimal('3.00'))],
+        )
+
+
+class TransferTests(CashflowTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bank = create_wallet(self.company, 'Банк')
+        Category.objects.create(company=self.company, name='Перевод (списание)', operation_type='technical_expense')
+        Category.objects.create(company=self.company, name='Перевод (зачисление)', operation_type='technical_income')
+
+    def balance(self, wallet):
+        return WalletBalance.objects.get(wallet=wallet).balance
+
+    def test_transfer_creates_paired_legs(self):
+        self.add('100', date.today())
+
+        transfer = create_transfer(self.company, self.wallet, self.bank, '40')
+
+        legs = {leg.wallet_id: leg for leg in transfer.legs.all()}
+        self.assertEqual(set(legs), {self.wallet.pk, self.bank.pk})
+        self.assertEqual(legs[self.wallet.pk].direction, DIRECTION_EXPENSE)
+        self.assertEqual(legs[self.bank.pk].direction, DIRECTION_INCOME)
+        self.assertEqual({leg.amount for leg in legs.values()}, {Decimal('40.00')})
+        self.assertEqual(self.balance(self.wallet), Decimal('60.00'))
+        self.assertEqual(self.balance(self.bank), Decimal('40.00'))
+
+    def test_overdraft_is_rejected_without_legs(self):
+        with self.assertRaises(ValueError):
+            create_transfer(self.company, self.wallet, self.bank, '40', allow_overdraft=False)
+
+        self.assertFalse(Transfer.objects.exists())
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_deleting_transfer_removes_both_legs(self):
+        transfer = create_transfer(self.company, self.wallet, self.bank, '40')
+
+        with transaction.atomic():
+            transfer.delete()
+
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(self.balance(self.wallet), Decimal('0.00'))
+        self.assertEqual(self.balance(self.bank), Decimal('0.00'))
+
+
+class WalletStatementTests(CashflowTestCase):
+    def test_running_balance_starts_from_opening_balance(self):
+        start = date.today() - timedelta(days=10)
+        end = start + timedelta(days=2)
+        self.add('10', start - timedelta(days=2))
+        first = self.add('5', start)
+        self.add('3', start + timedelta(days=1), category=self.expense)
+        self.add('2', start + timedelta(days=1))
+        self.add('100', end + timedelta(days=1))
+
+        opening, rows = get_wallet_statement(self.wallet, start, end)
+
+        self.assertEqual(opening, Decimal('10.00'))
+        self.assertEqual(rows[0].pk, first.pk)
+        self.assertEqual(
+            [row.running_balance for row in rows], [Decimal('15.00'), Decimal('12.00'), Decimal('14.00')]
+        )
+
+    def test_streamed_statement_ends_with_closing_balance(self):
+        start = date.today() - timedelta(days=10)
+        self.add('10', start - timedelta(days=1))
+        self.add('4', start, category=self.expense)
+
+        lines = [json.loads(line) for line in iter_wallet_statement(self.wallet, start, start, 'ndjson')]
+
+        self.assertEqual([line['balance'] for line in lines], ['10.00', '6.00', '6.00'])
+        self.assertEqual(lines[1]['category'], 'Закупки')
+
+
+class RecurringGenerationTests(CashflowTestCase):
+    def test_second_run_creates_nothing(self):
+        today = date.today()
+        schedule = RecurringTransaction.objects.create(
+            company=self.company, wallet=self.wallet, category=self.expense, amount=Decimal('2'),
+            frequency=RecurringTransaction.FREQUENCY_DAILY, start_date=today - timedelta(days=4),
+        )
+
+        self.assertEqual(generate_recurring_transactions(until=today)['created'], 5)
+        self.assertEqual(generate_recurring_transactions(until=today)['created'], 0)
+        # Прогон, упавший до отметки generated_until, повторяется без дублей
+        RecurringTransaction.objects.filter(pk=schedule.pk).update(generated_until=None)
+        self.assertEqual(generate_recurring_transactions(until=today)['created'], 0)
+
+        self.assertEqual(Transaction.objects.filter(recurring=schedule).count(), 5)
+        self.assertEqual(WalletBalance.objects.get(wallet=self.wallet).balance, Decimal('-10.00'))
+
+
+class TransactionKeysetPaginationTests(CashflowTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient(HTTP_HOST='acme.lvh.me')
+        self.client.force_authenticate(self.user)
+
+    def pages(self, url):
+        ids, responses = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            responses.append(response.data)
+            ids += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        return ids, responses
+
+    def test_pages_follow_date_then_id_descending(self):
+        today = date.today()
+        # По три транзакции на день: порядок внутри дня решает id
+        for i in range(11):
+            self.add('1', today - timedelta(days=i // 3))
+        expected = list(
+            Transaction.objects.filter(company=self.company).order_by('-date', '-id').values_list('id', flat=True)
+        )
+
+        ids, responses = self.pages('/api/cashflow/transactions/?page_size=4')
+
+        self.assertEqual(ids, expected)
+        self.assertEqual(len(responses), 3)
+        self.assertIsNone(responses[-1]['next'])
+
+    def test_previous_link_returns_preceding_page(self):
+        today = date.today()
+        for i in range(9):
+            self.add('1', today - timedelta(days=i // 2))
+        _, responses = self.pages('/api/cashflow/transactions/?page_size=4')
+
+        previous = self.client.get(responses[1]['previous']).data
+
+        self.assertEqual(
+            [row['id'] for row in previous['results']],
+            [row['id'] for row in responses[0]['results']],
+        )
+
+    def test_first_page_reached_backwards_has_totals(self):
+        today = date.today()
+        for i in range(9):
+            self.add('1', today - timedelta(days=i // 2))
+        self.add('4', today, category=self.expense)
+        _, responses = self.pages('/api/cashflow/transactions/?page_size=4')
+
+        previous = self.client.get(responses[1]['previous']).data
+
+        self.assertEqual(previous['totals'], responses[0]['totals'])
+        self.assertEqual(previous['total_sum'], Decimal('5.00'))
+        self.assertNotIn('totals', responses[1])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/api/cashflow/transactions/?cursor=garbage')
+
+        self.assertEqual(response.status_code, 404)
+
+
+class ClosedPeriodTests(CashflowTestCase):
+    def setUp(self):
+        super().setUp()
+        self.month = previous_month()
+        self.closed = self.add('10', self.month + timedelta(days=2), description='до закрытия')
+        close_period(self.company, self.month)
+
+    def test_new_transaction_in_closed_month_is_rejected(self):
+        with self.assertRaises(PeriodClosedError):
+            self.add('5', self.month + timedelta(days=3))
+
+    def test_amount_change_in_closed_month_is_rejected(self):
+        self.closed.amount = Decimal('20')
+
+        with self.assertRaises(PeriodClosedError):
+            self.closed.save()
+
+    def test_description_change_in_closed_month_is_rejected(self):
+        self.closed.description = 'после закрытия'
+        self.closed.tags = ['правка']
+
+        with self.assertRaises(PeriodClosedError):
+            self.closed.save()
+        self.closed.refresh_from_db()
+        self.assertEqual(self.closed.description, 'до закрытия')
+
+    def test_delete_in_closed_month_is_rejected(self):
+        # Collector.delete не ставит точку сохранения — откатываем сами
+        with self.assertRaises(PeriodClosedError), transaction.atomic():
+            self.closed.delete()
+        self.assertTrue(Transaction.objects.filter(pk=self.closed.pk).exists())
+
+    def test_current_month_stays_editable(self):
+        current = self.add('5', date.today())
+        current.description = 'правка'
+        current.save()
+
+    def test_category_type_change_touching_closed_month_is_rejected(self):
+        with self.assertRaises(PeriodClosedError):
+            self.income.operation_type = 'expense'
+            self.income.save()
+
+        self.income.refresh_from_db()
+        self.closed.refresh_from_db()
+        self.assertEqual(self.income.operation_type, 'income')
+        self.assertEqual(self.closed.direction, DIRECTION_INCOME)
+
+    def test_api_reports_closed_period_as_bad_request(self):
+        client = APIClient(HTTP_HOST='acme.lvh.me')
+        client.force_authenticate(self.user)
+
+        response = client.patch(
+            f'/api/cashflow/categories/{self.income.pk}/', {'operation_type': 'expense'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.income.refresh_from_db()
+        self.assertEqual(self.income.operation_type, 'income')
+
+
+class CategoryResignTests(CashflowTestCase):
+    def test_direction_comes_from_the_database(self):
+        # Реестр справочников мог закэшировать прежний тип статьи
+        Category.objects.filter(pk=self.income.pk).update(operation_type='expense')
+
+        created = self.add('5', date.today())
+
+        self.assertEqual(created.direction, DIRECTION_EXPENSE)
+
+    def test_wallet_of_other_company_is_rejected(self):
+        other_owner = User.objects.create_user('other@example.com', 'pw12345678')
+        other = Company.objects.create(name='Другая', subdomain='other', owner=other_owner)
+
+        with self.assertRaises(ValueError):
+            Transaction.objects.create(
+                company=other, wallet=self.wallet, category=self.income, amount=Decimal('5'), date=date.today()
+            )
+        self.assertFalse(Transaction.objects.filter(company=other).exists())
+
+    def test_type_change_shifts_balance_checkpoints(self):
+        today = date.today()
+        self.add('10', today - timedelta(days=6))
+        self.add('3', today - timedelta(days=4), category=self.expense)
+        self.add('7', today - timedelta(days=2))
+        create_balance_checkpoints(today - timedelta(days=5), company=self.company)
+        create_balance_checkpoints(today - timedelta(days=1), company=self.company)
+
+        self.income.operation_type = 'expense'
+        self.income.save()
+
+        checkpoints = dict(
+            WalletBalanceCheckpoint.objects.filter(wallet=self.wallet).values_list('day', 'balance')
+        )
+        self.assertEqual(checkpoints[today - timedelta(days=5)], Decimal('-10.00'))
+        self.assertEqual(checkpoints[today - timedelta(days=1)], Decimal('-20.00'))
+
+
+class ReferenceRegistryTests(CashflowTestCase):
+    def test_company_categories_are_not_loaded(self):
+        shared = Category.objects.create(name='Общая', operation_type='income')
+        with self.captureOnCommitCallbacks(execute=True):
+            shared.save()
+
+        ids = {obj.pk for obj in registry.categories()}
+
+        self.assertIn(shared.pk, ids)
+        self.assertNotIn(self.income.pk, ids)
+        self.assertEqual(registry.category_map([self.income.pk])[self.income.pk].name, 'Продажи')
+
+    def test_company_category_change_keeps_registry_version(self):
+        version = registry._shared_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.income.name = 'Выручка'
+            self.income.save()
+
+        self.assertEqual(cache.get(VERSION_CACHE_KEY), version)
@@ -4,7 +4,10 @@ from .api import (
     TransactionViewSet,
     WalletViewSet,
     CategoryViewSet,
-    ActivityTypeViewSet
+    ActivityTypeViewSet,
+    TransferViewSet,
+    ClosedPeriodViewSet,
+    RecurringTransactionViewSet,
 )
 
 router = DefaultRouter()
@@ -12,6 +15,9 @@ router.register(r'transactions', TransactionViewSet, basename='transaction')
 router.register(r'wallets', WalletViewSet, basename='wallet')
 router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'activity-types', ActivityTypeViewSet, basename='activity-type')
+router.register(r'transfers', TransferViewSet, basename='transfer')
+router.register(r'closed-periods', ClosedPeriodViewSet, basename='closed-period')
+router.register(r'recurring', RecurringTransactionViewSet, basename='recurring-transaction')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -2,12 +2,14 @@
 from rest_framework import viewsets, status, generics
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.db import transaction
 from django.urls import reverse
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from hr.serializers import CompanySerializer, EmployeeInvitationCreateSerializer, InvitationAcceptSerializer
 from hr.models import EmployeeInvitation
 from hr.services import create_company
+from jobs.services import enqueue
 
 class CompanyViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
@@ -47,8 +49,15 @@ class EmployeeInvitationViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         user = self.request.user
         company = user.employee_profile.company
-        # Сохраняем приглашение, связывая его с текущим пользователем и компанией
-        serializer.save(inviter=user, company=company)
+        # Письмо отправляет фоновый воркер; приглашение и задача пишутся
+        # в одной транзакции БД: без задачи приглашение не сохранится
+        with transaction.atomic():
+            # Сохраняем приглашение, связывая его с текущим пользователем и компанией
+            invitation = serializer.save(inviter=user, company=company)
+            enqueue('hr.send_invitation_email', {
+                'invitation_id': invitation.pk,
+                'link': serializer.get_invitation_link(invitation),
+            })
 
 
 @method_decorator(csrf_exempt, name='dispatch')
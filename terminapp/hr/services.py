@@ -1,7 +1,9 @@
 # hr/services.py
 from django.core.exceptions import ValidationError
+from django.core.mail import send_mail
 from django.contrib.auth.models import Group
-from hr.models import Company, Department, Role, Employee, EmployeeInfo
+from django.utils import timezone
+from hr.models import Company, Department, Role, Employee, EmployeeInfo, EmployeeInvitation
 
 
 def create_company(owner, name, subdomain, billing_plan='BASE'):
@@ -64,3 +66,33 @@ def create_company(owner, name, subdomain, billing_plan='BASE'):
     return company
 
 
+
+
+def send_invitation_email(invitation_id, link):
+    """
+    Письмо с приглашением в компанию (выполняется фоновой задачей hr.send_invitation_email).
+    Приглашение, уже принятое или истёкшее к моменту отправки, не отправляется.
+    """
+    invitation = EmployeeInvitation.objects.select_related('company').filter(pk=invitation_id).first()
+    if invitation is None or invitation.status != 'PENDING':
+        return False
+    send_mail(
+        subject=f"Приглашение в компанию {invitation.company.name}",
+        message=(
+            f"Вас пригласили в компанию {invitation.company.name}.\n"
+            f"Чтобы присоединиться, перейдите по ссылке: {link}\n"
+            f"Ссылка действует до {invitation.expires_at:%d.%m.%Y %H:%M}."
+        ),
+        from_email=None,
+        recipient_list=[invitation.email],
+    )
+    return True
+
+
+def expire_invitations():
+    """
+    Переводит просроченные приглашения в статус EXPIRED. Возвращает их число.
+    """
+    return EmployeeInvitation.objects.filter(
+        status='PENDING', expires_at__lt=timezone.now()
+    ).update(status='EXPIRED')
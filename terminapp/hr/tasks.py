@@ -0,0 +1,13 @@
+# hr/tasks.py
+from jobs.registry import task
+from hr.services import send_invitation_email, expire_invitations
+
+
+@task('hr.send_invitation_email', max_attempts=8)
+def send_invitation(invitation_id, link):
+    return {'sent': send_invitation_email(invitation_id, link)}
+
+
+@task('hr.expire_invitations')
+def expire_pending_invitations():
+    return {'expired': expire_invitations()}
@@ -0,0 +1,50 @@
+# idempotency/api.py
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+from .services import IdempotencyConflict, execute_idempotent, request_fingerprint
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+
+class IdempotentCreateMixin:
+    """
+    Подмешивается к ViewSet перед базовым классом. create() с заголовком
+    Idempotency-Key выполняется один раз: повтор с тем же ключом получает
+    сохранённый ответ (с заголовком Idempotent-Replayed: true).
+    Без заголовка create() работает как обычно.
+    """
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key or not request.user.is_authenticated:
+            return super().create(request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+            return Response(
+                {"detail": f"{IDEMPOTENCY_HEADER} слишком длинный."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        original = {}
+
+        def handler():
+            response = super(IdempotentCreateMixin, self).create(request, *args, **kwargs)
+            original['response'] = response
+            return response.status_code, response.data
+
+        try:
+            status_code, body, replayed = execute_idempotent(
+                request.user,
+                key,
+                request_fingerprint(request.method, request.path, request.data),
+                handler,
+            )
+        except IdempotencyConflict as e:
+            return Response({"detail": str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        if not replayed:
+            return original['response']
+        response = Response(body, status=status_code)
+        response['Idempotent-Replayed'] = 'true'
+        return response
@@ -0,0 +1,15 @@
+# idempotency/management/commands/purge_idempotency_keys.py
+from django.core.management.base import BaseCommand
+
+from idempotency.services import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Удаляет истёкшие ключи идемпотентности."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Размер пачки удаления")
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Удалено ключей: {deleted}"))
@@ -0,0 +1,38 @@
+# idempotency/models.py
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class IdempotencyKey(models.Model):
+    """
+    Результат запроса с заголовком Idempotency-Key.
+    Повтор запроса с тем же ключом (в пределах пользователя) получает
+    сохранённый ответ, не вызывая сервисный слой ещё раз.
+    Строки живут до expires_at; удаляет их manage.py purge_idempotency_keys.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys',
+    )
+    key = models.CharField("Ключ", max_length=100)
+    # sha256 метода, пути и тела запроса: тот же ключ с другим телом — ошибка клиента
+    request_hash = models.CharField("Хеш запроса", max_length=64)
+    response_status = models.PositiveSmallIntegerField("HTTP-статус", null=True)
+    response_body = models.JSONField("Ответ", null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField("Истекает")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_key_expires_at'),
+        ]
+        verbose_name = "Ключ идемпотентности"
+        verbose_name_plural = "Ключи идемпотентности"
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
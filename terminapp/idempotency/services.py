@@ -0,0 +1,104 @@
+# idempotency/services.py
+import hashlib
+import json
+from datetime import timedelta
+from typing import Any, Callable, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+# Сколько хранится ответ по ключу (settings.IDEMPOTENCY_KEY_TTL переопределяет)
+DEFAULT_TTL = timedelta(hours=24)
+
+
+class IdempotencyConflict(Exception):
+    """Ключ уже использован для запроса с другим телом."""
+
+
+def get_ttl() -> timedelta:
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', DEFAULT_TTL)
+
+
+def request_fingerprint(method: str, path: str, data) -> str:
+    """
+    sha256 от метода, пути и тела запроса (ключи тела отсортированы).
+    """
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{method}\n{path}\n{payload}".encode('utf-8')).hexdigest()
+
+
+def _claim_key(user_id: int, key: str, request_hash: str) -> Optional[int]:
+    """
+    Занимает ключ одним INSERT ... ON CONFLICT. Истёкшая строка с тем же
+    ключом переиспользуется. Возвращает id строки либо None, если ключ занят.
+    Параллельный запрос с тем же ключом ждёт на уникальном индексе, пока
+    первый не завершит транзакцию, — дублей не бывает, опроса тоже.
+    """
+    now = timezone.now()
+    table = IdempotencyKey._meta.db_table
+    sql = f"""
+        INSERT INTO {table} (user_id, "key", request_hash, created_at, expires_at)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (user_id, "key") DO UPDATE SET
+            request_hash = EXCLUDED.request_hash,
+            response_status = NULL,
+            response_body = NULL,
+            created_at = EXCLUDED.created_at,
+            expires_at = EXCLUDED.expires_at
+        WHERE {table}.expires_at <= %s
+        RETURNING id
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, key, request_hash, now, now + get_ttl(), now])
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def execute_idempotent(
+    user,
+    key: str,
+    request_hash: str,
+    handler: Callable[[], Tuple[int, Any]],
+) -> Tuple[int, Any, bool]:
+    """
+    Выполняет handler() (возвращает (status, body)) не более одного раза на ключ.
+    Возвращает (status, body, replayed). Сохраняются только успешные (2xx)
+    ответы; исключение или ошибочный ответ откатывают и сам ключ, чтобы
+    клиент мог повторить запрос.
+    """
+    with transaction.atomic():
+        claimed_id = _claim_key(user.pk, key, request_hash)
+        if claimed_id is None:
+            stored = IdempotencyKey.objects.get(user=user, key=key)
+            if stored.request_hash != request_hash:
+                raise IdempotencyConflict("Idempotency-Key уже использован для другого запроса.")
+            return stored.response_status, stored.response_body, True
+
+        status_code, body = handler()
+        if 200 <= status_code < 300:
+            IdempotencyKey.objects.filter(pk=claimed_id).update(
+                response_status=status_code,
+                response_body=body,
+            )
+        else:
+            transaction.set_rollback(True)
+        return status_code, body, False
+
+
+def purge_expired_keys(batch_size: int = 5000) -> int:
+    """
+    Удаляет истёкшие ключи пачками (по индексу expires_at). Возвращает число удалённых строк.
+    """
+    now = timezone.now()
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lte=now)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,8 @@
+# idempotency/tasks.py
+from jobs.registry import task
+from idempotency.services import purge_expired_keys
+
+
+@task('idempotency.purge_expired_keys')
+def purge_keys(batch_size=5000):
+    return {'deleted': purge_expired_keys(batch_size=batch_size)}
@@ -0,0 +1,31 @@
+# jobs/admin.py
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job, PeriodicTask
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'queue', 'status', 'attempts', 'max_attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'queue', 'task')
+    search_fields = ('task', 'dedupe_key')
+    readonly_fields = (
+        'task', 'payload', 'queue', 'priority', 'status', 'run_at', 'attempts', 'max_attempts',
+        'dedupe_key', 'locked_by', 'locked_at', 'finished_at', 'last_error', 'result', 'created_at',
+    )
+    actions = ['requeue']
+
+    @admin.action(description="Поставить в очередь заново")
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status=Job.STATUS_RUNNING).update(
+            status=Job.STATUS_QUEUED, run_at=timezone.now(), attempts=0, finished_at=None, dedupe_key=None
+        )
+        self.message_user(request, f"Поставлено в очередь: {updated}")
+
+
+@admin.register(PeriodicTask)
+class PeriodicTaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'task', 'cron', 'is_active', 'next_run_at', 'last_run_at')
+    list_filter = ('is_active',)
+    readonly_fields = ('last_run_at',)
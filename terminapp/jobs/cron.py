@@ -0,0 +1,96 @@
+# jobs/cron.py
+"""
+Разбор расписаний в формате cron: «минута час день месяц день_недели».
+Поддерживаются *, списки (1,15), диапазоны (1-5), шаг (*/10, 0-30/5)
+и сокращения @hourly, @daily, @weekly, @monthly, @yearly.
+День недели: 0 или 7 — воскресенье. Если ограничены и день месяца,
+и день недели, подходит любой из них (как в cron).
+Время считается в settings.TIME_ZONE.
+"""
+from datetime import datetime, timedelta
+from typing import FrozenSet
+
+from django.utils import timezone
+
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+    '@yearly': '0 0 1 1 *',
+}
+
+# (минимум, максимум) полей расписания
+FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+# Сколько дней вперёд ищется ближайший запуск (31 февраля не наступит никогда)
+SEARCH_DAYS = 366 * 5
+
+
+def _parse_field(value: str, low: int, high: int) -> FrozenSet[int]:
+    result = set()
+    for part in value.split(','):
+        if not part:
+            raise ValueError(f"Пустой элемент в поле «{value}»")
+        base, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if step <= 0:
+            raise ValueError(f"Шаг должен быть положительным: «{part}»")
+        if base == '*':
+            start, end = low, high
+        elif '-' in base:
+            start, end = (int(item) for item in base.split('-', 1))
+        else:
+            start = int(base)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"Значение вне диапазона {low}-{high}: «{part}»")
+        result.update(range(start, end + 1, step))
+    return frozenset(result)
+
+
+class CronSchedule:
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        fields = ALIASES.get(self.expression, self.expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Расписание должно состоять из 5 полей: «{expression}»")
+        try:
+            parsed = [_parse_field(field, low, high) for field, (low, high) in zip(fields, FIELD_RANGES)]
+        except ValueError as exc:
+            raise ValueError(f"Неверное расписание «{expression}»: {exc}") from None
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        # 7 — тоже воскресенье
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        self.days_restricted = fields[2] != '*'
+        self.weekdays_restricted = fields[4] != '*'
+        self.times = tuple((hour, minute) for hour in sorted(self.hours) for minute in sorted(self.minutes))
+
+    def _day_matches(self, day) -> bool:
+        if day.month not in self.months:
+            return False
+        in_days = day.day in self.days
+        # Python: понедельник — 0, cron: воскресенье — 0
+        in_weekdays = (day.weekday() + 1) % 7 in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return in_days or in_weekdays
+        return in_days and in_weekdays
+
+    def next_after(self, moment: datetime) -> datetime:
+        """
+        Ближайший момент по расписанию строго после moment (aware datetime).
+        """
+        tz = timezone.get_current_timezone()
+        start = timezone.localtime(moment, tz).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for offset in range(SEARCH_DAYS):
+            day = start.date() + timedelta(days=offset)
+            if not self._day_matches(day):
+                continue
+            for hour, minute in self.times:
+                if offset == 0 and (hour, minute) < (start.hour, start.minute):
+                    continue
+                return datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz)
+        raise ValueError(f"Расписание «{self.expression}» не наступает никогда.")
+
+    def __str__(self):
+        return self.expression
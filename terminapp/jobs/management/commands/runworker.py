@@ -0,0 +1,61 @@
+# jobs/management/commands/runworker.py
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Воркер фоновых задач: забирает задачи из очереди (FOR UPDATE SKIP LOCKED) "
+        "и ставит периодические из settings.JOBS_PERIODIC. Масштабируется запуском "
+        "нескольких процессов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help="Число потоков, выполняющих задачи (по умолчанию 1)",
+        )
+        parser.add_argument(
+            '--queues',
+            help="Очереди через запятую (по умолчанию — все)",
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help="Пауза при пустой очереди, секунд (по умолчанию 1)",
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help="Выполнить готовые задачи и завершиться",
+        )
+        parser.add_argument(
+            '--no-scheduler',
+            action='store_true',
+            help="Не ставить периодические задачи (только выполнять очередь)",
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] <= 0:
+            raise CommandError("--concurrency должен быть положительным.")
+        if options['poll_interval'] <= 0:
+            raise CommandError("--poll-interval должен быть положительным.")
+        queues = [name.strip() for name in (options['queues'] or '').split(',') if name.strip()]
+
+        worker = Worker(
+            queues=queues,
+            concurrency=options['concurrency'],
+            poll_interval=options['poll_interval'],
+            burst=options['burst'],
+            scheduler=not options['no_scheduler'],
+        )
+        try:
+            processed = worker.run()
+        except ValueError as exc:
+            # Неверное расписание или неизвестная задача в JOBS_PERIODIC
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"Воркер остановлен, выполнено задач: {processed}"))
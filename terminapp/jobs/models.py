@@ -0,0 +1,89 @@
+# jobs/models.py
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    Задача фоновой очереди. Воркеры (manage.py runworker) забирают задачи
+    запросом FOR UPDATE SKIP LOCKED, поэтому несколько процессов делят
+    очередь без дублей. Упавшая задача возвращается в очередь с
+    экспоненциальной задержкой до max_attempts попыток.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "В очереди"),
+        (STATUS_RUNNING, "Выполняется"),
+        (STATUS_DONE, "Выполнена"),
+        (STATUS_FAILED, "Ошибка"),
+    ]
+
+    task = models.CharField("Задача", max_length=100)
+    payload = models.JSONField("Аргументы", default=dict, blank=True, encoder=DjangoJSONEncoder)
+    queue = models.CharField("Очередь", max_length=50, default='default')
+    # Меньше — раньше
+    priority = models.SmallIntegerField("Приоритет", default=0)
+    status = models.CharField("Статус", max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    run_at = models.DateTimeField("Не раньше", default=timezone.now)
+    attempts = models.PositiveSmallIntegerField("Попыток", default=0)
+    max_attempts = models.PositiveSmallIntegerField("Максимум попыток", default=5)
+    # Пока задача в очереди, второй такой же ключ не ставится (периодические задачи, пересчёт отчёта)
+    dedupe_key = models.CharField("Ключ дедупликации", max_length=200, null=True, blank=True)
+    locked_by = models.CharField("Воркер", max_length=100, blank=True)
+    locked_at = models.DateTimeField("Взята", null=True, blank=True)
+    finished_at = models.DateTimeField("Завершена", null=True, blank=True)
+    last_error = models.TextField("Последняя ошибка", blank=True)
+    result = models.JSONField("Результат", null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=Q(status='queued'),
+                name='jobs_job_dedupe_queued'
+            ),
+        ]
+        indexes = [
+            # Выборка следующей задачи воркером
+            models.Index(
+                fields=['queue', 'priority', 'run_at', 'id'],
+                condition=Q(status='queued'),
+                name='jobs_job_claim'
+            ),
+            # Поиск задач, потерянных упавшим воркером
+            models.Index(fields=['locked_at'], condition=Q(status='running'), name='jobs_job_running'),
+            models.Index(fields=['status', 'finished_at'], name='jobs_job_finished'),
+        ]
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+
+    def __str__(self):
+        return f"{self.task}#{self.pk} ({self.status})"
+
+
+class PeriodicTask(models.Model):
+    """
+    Периодическая задача с расписанием в формате cron (минута час день месяц день_недели).
+    Строки синхронизируются из settings.JOBS_PERIODIC при старте воркера;
+    когда наступает next_run_at, один из воркеров ставит задачу в очередь.
+    """
+    name = models.CharField("Название", max_length=100, unique=True)
+    task = models.CharField("Задача", max_length=100)
+    payload = models.JSONField("Аргументы", default=dict, blank=True, encoder=DjangoJSONEncoder)
+    cron = models.CharField("Расписание (cron)", max_length=100)
+    is_active = models.BooleanField("Активна", default=True)
+    next_run_at = models.DateTimeField("Следующий запуск", null=True, blank=True)
+    last_run_at = models.DateTimeField("Последний запуск", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Периодическая задача"
+        verbose_name_plural = "Периодические задачи"
+
+    def __str__(self):
+        return f"{self.name} ({self.cron})"
@@ -0,0 +1,43 @@
+# jobs/registry.py
+"""
+Реестр фоновых задач. Задача — функция, помеченная @task в модуле tasks.py
+приложения; аргументы приходят из Job.payload как именованные параметры
+(только JSON-совместимые значения), возвращаемое значение сохраняется в Job.result.
+"""
+from typing import Callable, Dict
+
+DEFAULT_MAX_ATTEMPTS = 5
+
+
+class Task:
+    def __init__(self, name: str, func: Callable, queue: str, max_attempts: int):
+        self.name = name
+        self.func = func
+        self.queue = queue
+        self.max_attempts = max_attempts
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+
+TASKS: Dict[str, Task] = {}
+
+
+def task(name: str, queue: str = 'default', max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+    """
+    Регистрирует функцию как фоновую задачу под именем name
+    (принято «приложение.действие»). Функция остаётся обычной функцией.
+    """
+    def decorator(func):
+        if name in TASKS and TASKS[name].func is not func:
+            raise ValueError(f"Задача {name} уже зарегистрирована.")
+        TASKS[name] = Task(name, func, queue, max_attempts)
+        return func
+    return decorator
+
+
+def get_task(name: str) -> Task:
+    try:
+        return TASKS[name]
+    except KeyError:
+        raise ValueError(f"Неизвестная задача: {name}") from None
@@ -0,0 +1,250 @@
+# jobs/services.py
+"""
+Очередь фоновых задач в PostgreSQL.
+
+enqueue() пишет строку jobs_job в текущей транзакции БД: задача видна
+воркерам только вместе с данными, которые её породили (и пропадает
+при откате). Воркер забирает задачу одним UPDATE ... WHERE id = (SELECT ...
+FOR UPDATE SKIP LOCKED LIMIT 1): параллельные воркеры не ждут друг друга
+и не получают одну задачу дважды. Масштабирование — больше процессов
+manage.py runworker.
+"""
+import json
+import random
+import traceback
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cron import CronSchedule
+from .models import Job, PeriodicTask
+from .registry import get_task
+
+# Задержка перед повтором: base * 2^(попытка-1), не больше max (секунды)
+DEFAULT_RETRY_BASE_DELAY = 10
+DEFAULT_RETRY_MAX_DELAY = 60 * 60
+# Задача в статусе running без отметки воркера дольше этого считается
+# потерянной (воркер упал); живой воркер продлевает locked_at (heartbeat)
+DEFAULT_LOCK_TIMEOUT = timedelta(minutes=30)
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def _dump(value) -> str:
+    return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def enqueue(
+        task_name: str,
+        payload: Optional[Dict[str, Any]] = None,
+        run_at=None,
+        priority: int = 0,
+        dedupe_key: Optional[str] = None,
+        queue: Optional[str] = None,
+        max_attempts: Optional[int] = None
+) -> Optional[int]:
+    """
+    Ставит задачу в очередь. Возвращает id задачи либо None, если задача
+    с тем же dedupe_key уже ждёт в очереди (INSERT ... ON CONFLICT DO NOTHING
+    по частичному уникальному индексу).
+    """
+    task = get_task(task_name)
+    table = Job._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table}
+                (task, payload, queue, priority, status, run_at, attempts, max_attempts,
+                 dedupe_key, locked_by, last_error, created_at)
+            VALUES (%s, %s::jsonb, %s, %s, %s, %s, 0, %s, %s, '', '', %s)
+            ON CONFLICT (dedupe_key) WHERE status = 'queued' DO NOTHING
+            RETURNING id
+            """,
+            [
+                task.name, _dump(payload or {}), queue or task.queue, priority, Job.STATUS_QUEUED,
+                run_at or timezone.now(), max_attempts or task.max_attempts, dedupe_key, timezone.now(),
+            ]
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def claim_job(worker_id: str, queues: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Забирает следующую готовую задачу (status=queued, run_at наступил):
+    меньший priority, затем более ранний run_at. Блокировка строки
+    снимается сразу — задачу «держит» статус running и locked_by.
+    """
+    table = Job._meta.db_table
+    queue_filter = "AND queue = ANY(%s)" if queues else ""
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {table}
+            SET status = %s, locked_by = %s, locked_at = now(), attempts = attempts + 1, dedupe_key = NULL
+            WHERE id = (
+                SELECT id FROM {table}
+                WHERE status = %s AND run_at <= now() {queue_filter}
+                ORDER BY priority, run_at, id
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING id, task, payload, attempts, max_attempts
+            """,
+            [Job.STATUS_RUNNING, worker_id, Job.STATUS_QUEUED, *([queues] if queues else [])]
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    job_id, task_name, payload, attempts, max_attempts = row
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    return {
+        'id': job_id, 'task': task_name, 'payload': payload,
+        'attempts': attempts, 'max_attempts': max_attempts,
+    }
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """
+    Экспоненциальная задержка со случайной половиной (разводит повторы
+    задач, упавших одновременно, например при недоступности почты).
+    """
+    base = _setting('JOBS_RETRY_BASE_DELAY', DEFAULT_RETRY_BASE_DELAY)
+    delay = min(base * 2 ** max(attempts - 1, 0), _setting('JOBS_RETRY_MAX_DELAY', DEFAULT_RETRY_MAX_DELAY))
+    return timedelta(seconds=delay / 2 + random.uniform(0, delay / 2))
+
+
+def _jsonable(value):
+    try:
+        return json.loads(_dump(value))
+    except (TypeError, ValueError):
+        return repr(value)
+
+
+def run_job(job: Dict[str, Any], worker_id: str) -> str:
+    """
+    Выполняет взятую задачу и записывает итог. Ошибка — повтор через
+    retry_delay(), после max_attempts попыток — статус failed.
+    Итог пишется только если задачу всё ещё держит этот воркер
+    (её могли вернуть в очередь как потерянную). Возвращает новый статус.
+    """
+    try:
+        result = get_task(job['task'])(**job['payload'])
+    except Exception:
+        error = traceback.format_exc()
+        if job['attempts'] < job['max_attempts']:
+            status = Job.STATUS_QUEUED
+            changes = {'run_at': timezone.now() + retry_delay(job['attempts'])}
+        else:
+            status = Job.STATUS_FAILED
+            changes = {'finished_at': timezone.now()}
+        changes.update(last_error=error)
+    else:
+        status = Job.STATUS_DONE
+        changes = {'finished_at': timezone.now(), 'result': _jsonable(result), 'last_error': ''}
+
+    Job.objects.filter(
+        pk=job['id'], status=Job.STATUS_RUNNING, locked_by=worker_id
+    ).update(status=status, locked_by='', locked_at=None, **changes)
+    return status
+
+
+def heartbeat(worker_ids: List[str]) -> int:
+    """
+    Продлевает locked_at задач, которые выполняют потоки живого воркера:
+    долгая задача не считается потерянной, пока воркер жив.
+    """
+    return Job.objects.filter(status=Job.STATUS_RUNNING, locked_by__in=worker_ids).update(locked_at=timezone.now())
+
+
+def requeue_stale_jobs(lock_timeout: Optional[timedelta] = None) -> int:
+    """
+    Возвращает в очередь задачи, locked_at которых не продлевался дольше
+    JOBS_LOCK_TIMEOUT (воркер упал или был убит); исчерпавшие попытки
+    помечаются failed.
+    """
+    cutoff = timezone.now() - (lock_timeout or _setting('JOBS_LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT))
+    stale = Job.objects.filter(status=Job.STATUS_RUNNING, locked_at__lt=cutoff)
+    error = "Воркер не завершил задачу (превышен JOBS_LOCK_TIMEOUT)."
+    with transaction.atomic():
+        failed = stale.filter(attempts__gte=F('max_attempts')).update(
+            status=Job.STATUS_FAILED, locked_by='', locked_at=None, finished_at=timezone.now(), last_error=error
+        )
+        requeued = stale.update(
+            status=Job.STATUS_QUEUED, locked_by='', locked_at=None, run_at=timezone.now(), last_error=error
+        )
+    return failed + requeued
+
+
+def purge_finished_jobs(older_than: timedelta = timedelta(days=7), batch_size: int = 5000) -> int:
+    """
+    Удаляет выполненные задачи старше older_than (упавшие остаются для разбора).
+    """
+    cutoff = timezone.now() - older_than
+    deleted = 0
+    while True:
+        ids = list(
+            Job.objects.filter(status=Job.STATUS_DONE, finished_at__lt=cutoff)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += Job.objects.filter(id__in=ids).delete()[0]
+
+
+def sync_periodic_tasks(entries: Optional[Dict[str, Dict[str, Any]]] = None) -> List[str]:
+    """
+    Приводит таблицу PeriodicTask к settings.JOBS_PERIODIC:
+    {имя: {'task': ..., 'cron': ..., 'payload': {...}}}.
+    При новом или изменённом расписании пересчитывается next_run_at;
+    записи, которых нет в настройках, выключаются. Возвращает имена активных записей.
+    """
+    entries = _setting('JOBS_PERIODIC', {}) if entries is None else entries
+    now = timezone.now()
+    with transaction.atomic():
+        for name, spec in entries.items():
+            get_task(spec['task'])
+            schedule = CronSchedule(spec['cron'])
+            periodic = PeriodicTask.objects.select_for_update().filter(name=name).first()
+            if periodic is None:
+                periodic = PeriodicTask(name=name)
+            if periodic.cron != str(schedule) or not periodic.is_active or periodic.next_run_at is None:
+                periodic.next_run_at = schedule.next_after(now)
+            periodic.task = spec['task']
+            periodic.cron = str(schedule)
+            periodic.payload = spec.get('payload', {})
+            periodic.is_active = True
+            periodic.save()
+        PeriodicTask.objects.exclude(name__in=list(entries)).update(is_active=False)
+    return sorted(entries)
+
+
+def schedule_periodic_tasks() -> int:
+    """
+    Ставит в очередь наступившие периодические задачи. Записи берутся
+    FOR UPDATE SKIP LOCKED — при нескольких воркерах запуск ставит один из них;
+    пропущенные (пока воркеров не было) запуски схлопываются в один.
+    Возвращает число поставленных задач.
+    """
+    now = timezone.now()
+    enqueued = 0
+    with transaction.atomic():
+        due = PeriodicTask.objects.filter(
+            is_active=True, next_run_at__lte=now
+        ).select_for_update(skip_locked=True)
+        for periodic in due:
+            if enqueue(periodic.task, periodic.payload, dedupe_key=f'periodic:{periodic.name}'):
+                enqueued += 1
+            periodic.last_run_at = now
+            periodic.next_run_at = CronSchedule(periodic.cron).next_after(now)
+            periodic.save(update_fields=['last_run_at', 'next_run_at'])
+    return enqueued
+
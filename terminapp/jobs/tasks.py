@@ -0,0 +1,10 @@
+# jobs/tasks.py
+from datetime import timedelta
+
+from .registry import task
+from .services import purge_finished_jobs
+
+
+@task('jobs.purge_finished_jobs')
+def purge_finished(days: int = 7):
+    return {'deleted': purge_finished_jobs(older_than=timedelta(days=days))}
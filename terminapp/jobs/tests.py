@@ -0,0 +1,125 @@
+# jobs/tests.py
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from .models import Job
+from .registry import task
+from .services import claim_job, enqueue, heartbeat, requeue_stale_jobs, run_job
+
+
+@task('jobs.test_echo', queue='test')
+def echo(value=None):
+    return {'value': value}
+
+
+@task('jobs.test_fail', queue='test', max_attempts=2)
+def fail():
+    raise RuntimeError("сбой")
+
+
+# TransactionTestCase: claim_job сравнивает run_at с now() БД, а в TestCase
+# now() — время начала общей транзакции теста, раньше run_at новых задач
+class ClaimJobTests(TransactionTestCase):
+    def test_claims_by_priority_then_run_at(self):
+        low = enqueue('jobs.test_echo', {'value': 'low'}, priority=5)
+        high = enqueue('jobs.test_echo', {'value': 'high'}, priority=0)
+
+        self.assertEqual(claim_job('w1')['id'], high)
+        self.assertEqual(claim_job('w1')['id'], low)
+        self.assertIsNone(claim_job('w1'))
+
+    def test_future_jobs_are_not_claimed(self):
+        enqueue('jobs.test_echo', run_at=timezone.now() + timedelta(hours=1))
+
+        self.assertIsNone(claim_job('w1'))
+
+    def test_queue_filter(self):
+        enqueue('jobs.test_echo', queue='other')
+
+        self.assertIsNone(claim_job('w1', queues=['test']))
+        self.assertIsNotNone(claim_job('w1', queues=['other']))
+
+    def test_locked_job_is_skipped_by_other_worker(self):
+        first = enqueue('jobs.test_echo', {'value': 1})
+        second = enqueue('jobs.test_echo', {'value': 2})
+        other = connections.create_connection('default')
+        try:
+            # Другой процесс держит строку первой задачи заблокированной
+            with other.cursor() as cursor:
+                cursor.execute('BEGIN')
+                cursor.execute('SELECT id FROM jobs_job WHERE id = %s FOR UPDATE', [first])
+                self.assertEqual(claim_job('w1')['id'], second)
+                cursor.execute('ROLLBACK')
+        finally:
+            other.close()
+        self.assertEqual(claim_job('w1')['id'], first)
+
+    def test_dedupe_key_keeps_one_queued_job(self):
+        self.assertIsNotNone(enqueue('jobs.test_echo', dedupe_key='once'))
+        self.assertIsNone(enqueue('jobs.test_echo', dedupe_key='once'))
+
+        claim_job('w1')
+
+        # Взятая задача освобождает ключ — можно поставить следующую
+        self.assertIsNotNone(enqueue('jobs.test_echo', dedupe_key='once'))
+
+    def test_enqueue_is_rolled_back_with_transaction(self):
+        try:
+            with transaction.atomic():
+                enqueue('jobs.test_echo')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        self.assertFalse(Job.objects.exists())
+
+
+class RunJobTests(TransactionTestCase):
+    def test_success_stores_result(self):
+        job_id = enqueue('jobs.test_echo', {'value': 3})
+
+        status = run_job(claim_job('w1'), 'w1')
+
+        job = Job.objects.get(pk=job_id)
+        self.assertEqual(status, Job.STATUS_DONE)
+        self.assertEqual(job.result, {'value': 3})
+        self.assertEqual(job.locked_by, '')
+
+    def test_failure_is_retried_then_failed(self):
+        job_id = enqueue('jobs.test_fail')
+
+        self.assertEqual(run_job(claim_job('w1'), 'w1'), Job.STATUS_QUEUED)
+        Job.objects.filter(pk=job_id).update(run_at=timezone.now())
+        self.assertEqual(run_job(claim_job('w1'), 'w1'), Job.STATUS_FAILED)
+
+        job = Job.objects.get(pk=job_id)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn("сбой", job.last_error)
+
+    def test_result_of_requeued_job_is_not_written(self):
+        job_id = enqueue('jobs.test_echo')
+        job = claim_job('w1')
+        # Задачу посчитали потерянной и отдали другому воркеру
+        Job.objects.filter(pk=job_id).update(locked_by='w2')
+
+        run_job(job, 'w1')
+
+        self.assertEqual(Job.objects.get(pk=job_id).status, Job.STATUS_RUNNING)
+
+
+class StaleJobTests(TransactionTestCase):
+    def test_heartbeat_keeps_long_job_running(self):
+        alive = enqueue('jobs.test_echo', {'value': 'alive'})
+        lost = enqueue('jobs.test_echo', {'value': 'lost'})
+        claim_job('w1')
+        claim_job('w2')
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+
+        heartbeat(['w1'])
+
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=30)), 1)
+        self.assertEqual(Job.objects.get(pk=alive).status, Job.STATUS_RUNNING)
+        self.assertEqual(Job.objects.get(pk=lost).status, Job.STATUS_QUEUED)
@@ -0,0 +1,134 @@
+# jobs/worker.py
+"""
+Процесс воркера: concurrency потоков забирают и выполняют задачи,
+главный поток раз в JOBS_SCHEDULER_INTERVAL секунд ставит наступившие
+периодические задачи и возвращает в очередь потерянные, а раз
+в JOBS_HEARTBEAT_INTERVAL секунд продлевает locked_at выполняемых задач.
+SIGTERM/SIGINT — мягкая остановка: потоки доделывают текущие задачи.
+У каждого потока своё соединение с БД.
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .services import (
+    claim_job, heartbeat, run_job, requeue_stale_jobs, schedule_periodic_tasks, sync_periodic_tasks,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCHEDULER_INTERVAL = 10
+# Заметно меньше JOBS_LOCK_TIMEOUT: пропуск пары отметок не возвращает задачу в очередь
+DEFAULT_HEARTBEAT_INTERVAL = 60
+
+
+class Worker:
+    def __init__(
+            self,
+            queues: Optional[List[str]] = None,
+            concurrency: int = 1,
+            poll_interval: float = 1.0,
+            burst: bool = False,
+            scheduler: bool = True
+    ):
+        self.queues = queues or None
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        # burst — выполнить всё, что готово, и выйти (для cron/разовых прогонов)
+        self.burst = burst
+        self.scheduler = scheduler
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stop_event = threading.Event()
+        self.processed = 0
+        self._lock = threading.Lock()
+
+    def stop(self, *args) -> None:
+        self.stop_event.set()
+
+    def _tick(self) -> None:
+        try:
+            schedule_periodic_tasks()
+            requeue_stale_jobs()
+        except Exception:
+            logger.exception("Ошибка планировщика периодических задач")
+        finally:
+            close_old_connections()
+
+    def _heartbeat(self) -> None:
+        try:
+            heartbeat([self._worker_id(index) for index in range(self.concurrency)])
+        except Exception:
+            logger.exception("Не удалось продлить блокировку задач")
+        finally:
+            close_old_connections()
+
+    def _worker_id(self, index: int) -> str:
+        return f'{self.name}:{index}'
+
+    def _loop(self, index: int) -> None:
+        worker_id = self._worker_id(index)
+        try:
+            while not self.stop_event.is_set():
+                close_old_connections()
+                try:
+                    job = claim_job(worker_id, self.queues)
+                except Exception:
+                    # БД недоступна или соединение оборвалось — ждём и пробуем снова
+                    logger.exception("Не удалось взять задачу из очереди")
+                    connection.close()
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+                if job is None:
+                    if self.burst:
+                        return
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+                status = run_job(job, worker_id)
+                logger.info("Задача %s#%s: %s", job['task'], job['id'], status)
+                with self._lock:
+                    self.processed += 1
+        finally:
+            connection.close()
+
+    def run(self) -> int:
+        """
+        Работает до сигнала остановки (в режиме burst — пока есть готовые задачи).
+        Возвращает число выполненных задач.
+        """
+        if self.scheduler:
+            sync_periodic_tasks()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        if self.scheduler:
+            self._tick()
+        threads = [
+            threading.Thread(target=self._loop, args=(index,), name=f'jobs-worker-{index}', daemon=True)
+            for index in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+
+        interval = getattr(settings, 'JOBS_SCHEDULER_INTERVAL', DEFAULT_SCHEDULER_INTERVAL)
+        heartbeat_interval = getattr(settings, 'JOBS_HEARTBEAT_INTERVAL', DEFAULT_HEARTBEAT_INTERVAL)
+        next_tick = time.monotonic() + interval
+        next_heartbeat = time.monotonic() + heartbeat_interval
+        while any(thread.is_alive() for thread in threads):
+            if self.scheduler and not self.burst and time.monotonic() >= next_tick:
+                self._tick()
+                next_tick = time.monotonic() + interval
+            # Потоки заняты задачами — locked_at продлевает главный поток
+            if time.monotonic() >= next_heartbeat:
+                self._heartbeat()
+                next_heartbeat = time.monotonic() + heartbeat_interval
+            for thread in threads:
+                thread.join(timeout=0.5)
+        return self.processed
@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
 from hr.models import CompanyMixin
+from idempotency.api import IdempotentCreateMixin
 from .models import Order, OrderItem, OrderItemRefund
 from .serializers import OrderSerializer, OrderItemSerializer, OrderItemRefundSerializer
 from .services import OrderService, OrderItemService
@@ -65,7 +66,7 @@ class OrderViewSet(CompanyMixin, viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class OrderItemViewSet(viewsets.ModelViewSet):
+class OrderItemViewSet(IdempotentCreateMixin, viewsets.ModelViewSet):
     """
     CRUD для позиций заказа.
     """
@@ -1,7 +1,8 @@
 from django.db import models
 from django.core.exceptions import ValidationError
 from decimal import Decimal
-from cashflow.models import Transaction, Category
+from cashflow.models import Transaction
+from cashflow.reference import get_category
 from clients.models import Client
 from django.contrib.contenttypes.models import ContentType
 from hr.models import Company
@@ -130,13 +131,14 @@ class OrderItem(models.Model):
     def create_transaction(self):
 
         # Пример: выбирается категория "Продажи" с id=3
-        sales_category = Category.objects.get(id=3)
+        sales_category = get_category(3)
         content_type = ContentType.objects.get_for_model(OrderItem)
 
         Transaction.objects.update_or_create(
-            content_type=content_type,
-            object_id=self.pk,
+            order_item=self,
             defaults={
+                'content_type': content_type,
+                'object_id': self.pk,
                 'company': self.wallet.company,
                 'category': sales_category,
                 'wallet': self.wallet,
@@ -147,11 +149,7 @@ class OrderItem(models.Model):
 
     def delete_transaction(self):
         from cashflow.models import Transaction
-        content_type = ContentType.objects.get_for_model(OrderItem)
-        Transaction.objects.filter(
-            content_type=content_type,
-            object_id=self.pk
-        ).delete()
+        Transaction.objects.filter(order_item=self).delete()
 
     def calculate_amount(self):
         net_price = self.price - self.discount
@@ -202,13 +200,14 @@ class OrderItemRefund(models.Model):
         self.create_refund_transaction()
 
     def create_refund_transaction(self):
-        from cashflow.models import Transaction, Category
+        from cashflow.models import Transaction
         content_type = ContentType.objects.get_for_model(OrderItemRefund)
-        refund_category = Category.objects.get(id=4)  # Пример: категория "Возвраты"
+        refund_category = get_category(4)  # Пример: категория "Возвраты"
         Transaction.objects.update_or_create(
-            content_type=content_type,
-            object_id=self.pk,
+            order_item_refund=self,
             defaults={
+                'content_type': content_type,
+                'object_id': self.pk,
                 'company': self.wallet.company,
                 'category': refund_category,
                 'wallet': self.wallet,
@@ -1,10 +1,11 @@
 # services.py
 from decimal import Decimal
 from django.db import transaction
+from django.db.models import Q
 from django.core.exceptions import ValidationError
-from .models import Order, OrderItem
+from .models import Order, OrderItem, OrderItemRefund
 from products.models import Product
-from cashflow.models import Wallet
+from cashflow.models import Wallet, Transaction
 from hr.models import Company
 
 def calculate_order_total(order: Order) -> Decimal:
@@ -46,6 +47,19 @@ def refresh_order(order: Order):
     order.status = update_order_status(order)
     order.save(update_fields=['total_amount', 'status'])
 
+def get_order_transactions(order: Order):
+    """
+    Все денежные движения заказа: продажи позиций и возвраты по ним.
+    id позиций и возвратов выбираются отдельно, и условие по транзакциям —
+    без JOIN: order_item_id IN (...) OR order_item_refund_id IN (...)
+    PostgreSQL выполняет как BitmapOr двух индексов по этим колонкам.
+    """
+    item_ids = list(OrderItem.objects.filter(order=order).values_list('id', flat=True))
+    refund_ids = list(OrderItemRefund.objects.filter(order_item__order=order).values_list('id', flat=True))
+    return Transaction.objects.filter(
+        Q(order_item_id__in=item_ids) | Q(order_item_refund_id__in=refund_ids)
+    ).order_by('date', 'id')
+
 class OrderService:
     @staticmethod
     @transaction.atomic
@@ -0,0 +1,18 @@
+# statements/admin.py
+from django.contrib import admin
+from .models import BankStatement, StatementLine
+
+
+@admin.register(BankStatement)
+class BankStatementAdmin(admin.ModelAdmin):
+    list_display = ('id', 'company', 'wallet', 'file_name', 'tolerance_days', 'uploaded_by', 'created_at')
+    list_filter = ('company',)
+    readonly_fields = ('company', 'wallet', 'file_name', 'tolerance_days', 'uploaded_by', 'created_at')
+
+
+@admin.register(StatementLine)
+class StatementLineAdmin(admin.ModelAdmin):
+    list_display = ('statement', 'line_number', 'date', 'amount', 'direction', 'status', 'transaction')
+    list_filter = ('status',)
+    search_fields = ('description', 'reference')
+    raw_id_fields = ('statement', 'transaction')
@@ -0,0 +1,103 @@
+# statements/api.py
+from rest_framework import viewsets, mixins, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+
+from cashflow.models import Transaction
+from .models import BankStatement, StatementLine
+from .serializers import (
+    BankStatementSerializer,
+    StatementUploadSerializer,
+    StatementLineSerializer,
+    StatementLineConfirmSerializer,
+)
+from .services import (
+    import_statement,
+    match_statement,
+    confirm_line,
+    ignore_line,
+    get_statements_for_company,
+)
+
+
+class BankStatementViewSet(mixins.ListModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Банковские выписки компании: POST (multipart) загружает CSV и сразу
+    сверяет строки, POST /{id}/match/ повторяет сверку открытых строк.
+    """
+    serializer_class = BankStatementSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    pagination_class = None
+
+    def get_queryset(self):
+        company = getattr(self.request, 'current_company', None)
+        if not company:
+            return BankStatement.objects.none()
+        return get_statements_for_company(company)
+
+    def create(self, request, *args, **kwargs):
+        company = getattr(request, 'current_company', None)
+        if not company:
+            return Response({"detail": "Компания не определена."}, status=400)
+        params = StatementUploadSerializer(data=request.data, context={'request': request})
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        try:
+            result = import_statement(
+                company=company,
+                wallet=data['wallet'],
+                content=data['file'].read(),
+                file_name=data['file'].name,
+                tolerance_days=data['tolerance_days'],
+                user=request.user,
+            )
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({"detail": f"Не удалось загрузить выписку: {e}"}, status=400)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def match(self, request, pk=None):
+        return Response(match_statement(self.get_object()))
+
+
+class StatementLineViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Строки выписок компании (?statement=&status=review — очередь на проверку).
+    """
+    serializer_class = StatementLineSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['statement', 'status']
+
+    def get_queryset(self):
+        company = getattr(self.request, 'current_company', None)
+        if not company:
+            return StatementLine.objects.none()
+        return StatementLine.objects.filter(statement__company=company).select_related('statement')
+
+    @action(detail=True, methods=['post'])
+    def confirm(self, request, pk=None):
+        line = self.get_object()
+        params = StatementLineConfirmSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        tx = Transaction.objects.filter(
+            pk=params.validated_data['transaction'], company=line.statement.company_id
+        ).first()
+        if tx is None:
+            raise ValidationError({"transaction": "Транзакция не найдена."})
+        try:
+            line = confirm_line(line, tx)
+        except ValueError as e:
+            raise ValidationError({"detail": str(e)})
+        return Response(self.get_serializer(line).data)
+
+    @action(detail=True, methods=['post'])
+    def ignore(self, request, pk=None):
+        return Response(self.get_serializer(ignore_line(self.get_object())).data)
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class StatementsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'statements'
+    verbose_name = 'Банковские выписки'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:32
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('cashflow', '0017_transaction_wallet_amount_date_index'),
+        ('hr', '0005_employee_created_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankStatement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(blank=True, default='', max_length=255, verbose_name='Файл')),
+                ('tolerance_days', models.PositiveSmallIntegerField(default=3, verbose_name='Допуск по дате, дней')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bank_statements', to='hr.company', verbose_name='Компания')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bank_statements', to=settings.AUTH_USER_MODEL, verbose_name='Загрузил')),
+                ('wallet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bank_statements', to='cashflow.wallet', verbose_name='Кошелёк')),
+            ],
+            options={
+                'verbose_name': 'Банковская выписка',
+                'verbose_name_plural': 'Банковские выписки',
+            },
+        ),
+        migrations.CreateModel(
+            name='StatementLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('line_number', models.PositiveIntegerField(verbose_name='Номер строки')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('date_from', models.DateField()),
+                ('date_to', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Сумма')),
+                ('direction', models.SmallIntegerField(choices=[(1, 'Поступление'), (-1, 'Выбытие')], verbose_name='Направление')),
+                ('description', models.TextField(blank=True, default='', verbose_name='Назначение платежа')),
+                ('reference', models.CharField(blank=True, default='', max_length=100, verbose_name='Номер документа')),
+                ('status', models.CharField(choices=[('unmatched', 'Не найдено'), ('matched', 'Сопоставлено автоматически'), ('review', 'Требует проверки'), ('confirmed', 'Подтверждено вручную'), ('ignored', 'Пропущено')], default='unmatched', max_length=10, verbose_name='Статус')),
+                ('candidate_ids', django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, size=None, verbose_name='Кандидаты')),
+                ('statement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='statements.bankstatement', verbose_name='Выписка')),
+                ('transaction', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='statement_lines', to='cashflow.transaction', verbose_name='Транзакция')),
+            ],
+            options={
+                'verbose_name': 'Строка выписки',
+                'verbose_name_plural': 'Строки выписок',
+                'ordering': ['statement', 'line_number'],
+                'indexes': [models.Index(fields=['statement', 'status'], name='statements_line_status')],
+                'constraints': [models.UniqueConstraint(fields=('statement', 'line_number'), name='statements_line_number'), models.UniqueConstraint(condition=models.Q(('transaction__isnull', False)), fields=('transaction',), name='statements_line_transaction')],
+            },
+        ),
+    ]
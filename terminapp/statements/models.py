@@ -0,0 +1,120 @@
+# statements/models.py
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+
+from cashflow.models import Wallet, Transaction, DIRECTION_INCOME, DIRECTION_EXPENSE
+from hr.models import Company
+
+
+class BankStatement(models.Model):
+    """
+    Загруженная банковская выписка по кошельку.
+    Строки выписки лежат в StatementLine и сверяются с транзакциями
+    кошелька (services.match_statement).
+    """
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="bank_statements",
+        verbose_name="Компания"
+    )
+    wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.CASCADE,
+        related_name="bank_statements",
+        verbose_name="Кошелёк"
+    )
+    file_name = models.CharField("Файл", max_length=255, blank=True, default='')
+    # Допустимое расхождение дат строки выписки и транзакции (в днях, в обе стороны)
+    tolerance_days = models.PositiveSmallIntegerField("Допуск по дате, дней", default=3)
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="bank_statements",
+        verbose_name="Загрузил"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Банковская выписка"
+        verbose_name_plural = "Банковские выписки"
+
+    def __str__(self):
+        return f"{self.wallet_id}: {self.file_name or self.pk}"
+
+
+class StatementLine(models.Model):
+    """
+    Строка выписки (промежуточная таблица для сверки).
+    date_from / date_to — окно дат с учётом допуска, посчитанное при загрузке:
+    сверка соединяет строки с транзакциями одним запросом
+    (wallet, amount, direction, date BETWEEN date_from AND date_to).
+    """
+    STATUS_UNMATCHED = 'unmatched'
+    STATUS_MATCHED = 'matched'
+    STATUS_REVIEW = 'review'
+    STATUS_CONFIRMED = 'confirmed'
+    STATUS_IGNORED = 'ignored'
+    STATUSES = [
+        (STATUS_UNMATCHED, 'Не найдено'),
+        (STATUS_MATCHED, 'Сопоставлено автоматически'),
+        (STATUS_REVIEW, 'Требует проверки'),
+        (STATUS_CONFIRMED, 'Подтверждено вручную'),
+        (STATUS_IGNORED, 'Пропущено'),
+    ]
+    # Строки, которые сверка ещё может изменить
+    OPEN_STATUSES = (STATUS_UNMATCHED, STATUS_REVIEW)
+
+    statement = models.ForeignKey(
+        BankStatement,
+        on_delete=models.CASCADE,
+        related_name="lines",
+        verbose_name="Выписка"
+    )
+    line_number = models.PositiveIntegerField("Номер строки")
+    date = models.DateField("Дата")
+    date_from = models.DateField()
+    date_to = models.DateField()
+    amount = models.DecimalField("Сумма", max_digits=10, decimal_places=2)
+    direction = models.SmallIntegerField(
+        "Направление",
+        choices=[(DIRECTION_INCOME, 'Поступление'), (DIRECTION_EXPENSE, 'Выбытие')],
+    )
+    description = models.TextField("Назначение платежа", blank=True, default='')
+    reference = models.CharField("Номер документа", max_length=100, blank=True, default='')
+    status = models.CharField("Статус", max_length=10, choices=STATUSES, default=STATUS_UNMATCHED)
+    # Транзакции секционированы по месяцам — внешний ключ без ограничения в БД
+    transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_constraint=False,
+        related_name="statement_lines",
+        verbose_name="Транзакция"
+    )
+    # Кандидаты для ручной проверки (status=review)
+    candidate_ids = ArrayField(models.IntegerField(), default=list, blank=True, verbose_name="Кандидаты")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['statement', 'line_number'], name='statements_line_number'),
+            # Транзакция подтверждает не больше одной строки выписки
+            models.UniqueConstraint(
+                fields=['transaction'],
+                condition=models.Q(transaction__isnull=False),
+                name='statements_line_transaction',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['statement', 'status'], name='statements_line_status'),
+        ]
+        ordering = ['statement', 'line_number']
+        verbose_name = "Строка выписки"
+        verbose_name_plural = "Строки выписок"
+
+    def __str__(self):
+        return f"{self.statement_id}#{self.line_number}: {self.amount * self.direction}"
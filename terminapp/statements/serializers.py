@@ -0,0 +1,52 @@
+# statements/serializers.py
+from rest_framework import serializers
+
+from cashflow.models import Wallet
+from .models import BankStatement, StatementLine
+
+
+class BankStatementSerializer(serializers.ModelSerializer):
+    lines_total = serializers.IntegerField(read_only=True)
+    lines_matched = serializers.IntegerField(read_only=True)
+    lines_confirmed = serializers.IntegerField(read_only=True)
+    lines_review = serializers.IntegerField(read_only=True)
+    lines_unmatched = serializers.IntegerField(read_only=True)
+    lines_ignored = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = BankStatement
+        fields = [
+            'id', 'wallet', 'file_name', 'tolerance_days', 'uploaded_by', 'created_at',
+            'lines_total', 'lines_matched', 'lines_confirmed', 'lines_review',
+            'lines_unmatched', 'lines_ignored',
+        ]
+        read_only_fields = fields
+
+
+class StatementUploadSerializer(serializers.Serializer):
+    """
+    Загрузка выписки: CSV-файл, кошелёк компании и допуск по дате.
+    """
+    file = serializers.FileField()
+    wallet = serializers.PrimaryKeyRelatedField(queryset=Wallet.objects.all())
+    tolerance_days = serializers.IntegerField(min_value=0, max_value=31, default=3)
+
+    def validate_wallet(self, value):
+        company = getattr(self.context.get('request'), 'current_company', None)
+        if company is None or value.company_id != company.id:
+            raise serializers.ValidationError("Кошелёк не найден в компании.")
+        return value
+
+
+class StatementLineSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StatementLine
+        fields = [
+            'id', 'statement', 'line_number', 'date', 'amount', 'direction',
+            'description', 'reference', 'status', 'transaction', 'candidate_ids',
+        ]
+        read_only_fields = fields
+
+
+class StatementLineConfirmSerializer(serializers.Serializer):
+    transaction = serializers.IntegerField()
@@ -0,0 +1,265 @@
+# statements/services.py
+"""
+Загрузка банковских выписок и сверка строк с транзакциями кошелька.
+
+Строки выписки сначала пишутся в StatementLine (bulk_create), затем
+сверяются одним запросом: строки соединяются с транзакциями по
+(wallet, amount, direction) и окну дат [date_from, date_to] —
+индекс cashflow_tx_wallet_amount_date, без перебора пар в Python.
+Строка с единственным кандидатом, на которого не претендуют другие
+строки, подтверждается автоматически; неоднозначные уходят на проверку.
+"""
+import csv
+import decimal
+import io
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.db.models import Count, Q
+
+from cashflow.models import Transaction, Wallet, DIRECTION_INCOME, DIRECTION_EXPENSE
+from cashflow.services import AMOUNT_LIMIT
+from hr.models import Company
+from .models import BankStatement, StatementLine
+
+# Допустимые названия колонок выписки (в нижнем регистре)
+COLUMN_ALIASES = {
+    'date': ('date', 'дата', 'дата операции'),
+    'amount': ('amount', 'сумма'),
+    'credit': ('credit', 'поступление', 'приход'),
+    'debit': ('debit', 'списание', 'расход'),
+    'description': ('description', 'назначение', 'назначение платежа'),
+    'reference': ('reference', 'номер', 'номер документа'),
+}
+DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y')
+STAGING_CHUNK = 2000
+
+
+def _parse_amount(value) -> Optional[decimal.Decimal]:
+    value = str(value or '').strip().replace('\xa0', '').replace(' ', '').replace(',', '.')
+    if not value:
+        return None
+    amount = decimal.Decimal(value)
+    if not amount.is_finite():
+        raise decimal.InvalidOperation
+    return amount.quantize(decimal.Decimal('0.01'))
+
+
+def _parse_date(value):
+    value = str(value or '').strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_statement_csv(content) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Разбирает CSV выписки (с заголовком, разделитель «,» или «;»).
+    Сумма — одной колонкой со знаком (минус — списание) либо
+    колонками поступления и списания. Даты — ГГГГ-ММ-ДД или ДД.ММ.ГГГГ.
+    Возвращает (строки, ошибки по номерам строк).
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    first_line = content.split('\n', 1)[0]
+    delimiter = ';' if first_line.count(';') > first_line.count(',') else ','
+    reader = csv.DictReader(io.StringIO(content), delimiter=delimiter)
+
+    columns = {}
+    for name in reader.fieldnames or []:
+        key = name.strip().lower()
+        for column, aliases in COLUMN_ALIASES.items():
+            if key in aliases:
+                columns.setdefault(column, name)
+    if 'date' not in columns or not ('amount' in columns or {'credit', 'debit'} & set(columns)):
+        raise ValueError("В выписке нужны колонки даты и суммы (или поступления/списания).")
+
+    rows, errors = [], []
+    for number, raw in enumerate(reader, start=1):
+        row_errors = {}
+        day = _parse_date(raw.get(columns['date']))
+        if day is None:
+            row_errors['date'] = "Дата должна быть в формате ГГГГ-ММ-ДД или ДД.ММ.ГГГГ."
+
+        amount = None
+        try:
+            if 'amount' in columns:
+                amount = _parse_amount(raw.get(columns['amount']))
+            else:
+                credit = _parse_amount(raw.get(columns.get('credit'))) or 0
+                debit = _parse_amount(raw.get(columns.get('debit'))) or 0
+                amount = credit - debit
+            if not amount or abs(amount) > AMOUNT_LIMIT:
+                raise decimal.InvalidOperation
+        except (decimal.InvalidOperation, ValueError, TypeError):
+            row_errors['amount'] = "Сумма должна быть ненулевым числом (не более 99 999 999.99)."
+
+        if row_errors:
+            errors.append({'row': number, 'errors': row_errors})
+            continue
+        rows.append({
+            'line_number': number,
+            'date': day,
+            'amount': abs(amount),
+            'direction': DIRECTION_INCOME if amount > 0 else DIRECTION_EXPENSE,
+            'description': str(raw.get(columns.get('description')) or '').strip(),
+            'reference': str(raw.get(columns.get('reference')) or '').strip()[:100],
+        })
+    return rows, errors
+
+
+def import_statement(
+    company: Company,
+    wallet: Wallet,
+    content,
+    file_name: str = '',
+    tolerance_days: int = 3,
+    user=None,
+) -> Dict[str, Any]:
+    """
+    Загружает выписку: разбор CSV, запись строк в StatementLine
+    (bulk_create по STAGING_CHUNK строк) и сверка с транзакциями кошелька.
+    Строки с ошибками пропускаются и возвращаются в errors.
+    """
+    if wallet.company_id != company.id:
+        raise ValueError("Кошелёк принадлежит другой компании.")
+    rows, errors = parse_statement_csv(content)
+    if not rows:
+        raise ValueError("В выписке нет корректных строк.")
+
+    tolerance = timedelta(days=tolerance_days)
+    with transaction.atomic():
+        statement = BankStatement.objects.create(
+            company=company,
+            wallet=wallet,
+            file_name=file_name[:255],
+            tolerance_days=tolerance_days,
+            uploaded_by=user,
+        )
+        StatementLine.objects.bulk_create(
+            [
+                StatementLine(
+                    statement=statement,
+                    date_from=row['date'] - tolerance,
+                    date_to=row['date'] + tolerance,
+                    **row
+                )
+                for row in rows
+            ],
+            batch_size=STAGING_CHUNK,
+        )
+        stats = match_statement(statement)
+
+    return {
+        'statement': statement.pk,
+        'total': len(rows) + len(errors),
+        'staged': len(rows),
+        'errors': errors,
+        **stats,
+    }
+
+
+def match_statement(statement: BankStatement) -> Dict[str, int]:
+    """
+    Сверяет открытые строки выписки (не найдено / на проверке) с транзакциями
+    кошелька, ещё не привязанными ни к одной строке. Повторный вызов после
+    ручного подтверждения части строк может разрешить оставшиеся.
+    Возвращает число строк по статусам среди сверявшихся.
+    """
+    line_table = StatementLine._meta.db_table
+    tx_table = Transaction._meta.db_table
+    open_statuses = StatementLine.OPEN_STATUSES
+    with transaction.atomic():
+        # Сверки одной выписки не выполняются параллельно
+        BankStatement.objects.select_for_update().filter(pk=statement.pk).first()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT l.id, t.id
+                FROM {line_table} l
+                JOIN {tx_table} t
+                  ON t.wallet_id = %s
+                 AND t.amount = l.amount
+                 AND t.direction = l.direction
+                 AND t.date BETWEEN l.date_from AND l.date_to
+                WHERE l.statement_id = %s
+                  AND l.status IN ({", ".join(["%s"] * len(open_statuses))})
+                  AND NOT EXISTS (
+                      SELECT 1 FROM {line_table} m WHERE m.transaction_id = t.id
+                  )
+                """,
+                [statement.wallet_id, statement.pk, *open_statuses]
+            )
+            pairs = cursor.fetchall()
+
+        candidates = defaultdict(list)
+        claims = defaultdict(int)
+        for line_id, tx_id in pairs:
+            candidates[line_id].append(tx_id)
+            claims[tx_id] += 1
+
+        lines = list(
+            StatementLine.objects.filter(statement=statement, status__in=open_statuses)
+            .only('id', 'status', 'transaction_id', 'candidate_ids')
+        )
+        stats = {
+            StatementLine.STATUS_MATCHED: 0,
+            StatementLine.STATUS_REVIEW: 0,
+            StatementLine.STATUS_UNMATCHED: 0,
+        }
+        for line in lines:
+            found = sorted(candidates.get(line.pk, []))
+            if len(found) == 1 and claims[found[0]] == 1:
+                line.status, line.transaction_id, line.candidate_ids = StatementLine.STATUS_MATCHED, found[0], []
+            elif found:
+                line.status, line.transaction_id, line.candidate_ids = StatementLine.STATUS_REVIEW, None, found
+            else:
+                line.status, line.transaction_id, line.candidate_ids = StatementLine.STATUS_UNMATCHED, None, []
+            stats[line.status] += 1
+        StatementLine.objects.bulk_update(lines, ['status', 'transaction', 'candidate_ids'], batch_size=1000)
+    return stats
+
+
+def confirm_line(line: StatementLine, tx: Transaction) -> StatementLine:
+    """
+    Ручное подтверждение: строка выписки соответствует транзакции tx
+    (транзакция того же кошелька, ещё не привязанная к другой строке).
+    """
+    if tx.wallet_id != line.statement.wallet_id:
+        raise ValueError("Транзакция относится к другому кошельку.")
+    if StatementLine.objects.filter(transaction=tx).exclude(pk=line.pk).exists():
+        raise ValueError("Транзакция уже сопоставлена с другой строкой выписки.")
+    line.status = StatementLine.STATUS_CONFIRMED
+    line.transaction = tx
+    line.candidate_ids = []
+    line.save(update_fields=['status', 'transaction', 'candidate_ids'])
+    return line
+
+
+def ignore_line(line: StatementLine) -> StatementLine:
+    """
+    Строка не требует транзакции (комиссия банка учтена иначе и т.п.).
+    """
+    line.status = StatementLine.STATUS_IGNORED
+    line.transaction = None
+    line.candidate_ids = []
+    line.save(update_fields=['status', 'transaction', 'candidate_ids'])
+    return line
+
+
+def get_statements_for_company(company: Company):
+    """
+    Выписки компании с количеством строк по статусам.
+    """
+    return BankStatement.objects.filter(company=company).annotate(
+        lines_total=Count('lines'),
+        **{
+            f'lines_{status}': Count('lines', filter=Q(lines__status=status))
+            for status, _ in StatementLine.STATUSES
+        }
+    ).order_by('-created_at')
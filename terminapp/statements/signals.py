@@ -0,0 +1,17 @@
+# statements/signals.py
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from cashflow.models import Transaction
+from .models import StatementLine
+
+
+@receiver(pre_delete, sender=Transaction)
+def transaction_deleting(sender, instance, **kwargs):
+    """
+    Строки выписки, сопоставленные с удаляемой транзакцией, снова ждут сверки
+    (саму ссылку обнуляет on_delete=SET_NULL).
+    """
+    StatementLine.objects.filter(transaction=instance).update(
+        status=StatementLine.STATUS_UNMATCHED
+    )
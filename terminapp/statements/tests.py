@@ -0,0 +1,59 @@
+# statements/tests.py
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+
+from account.models import User
+from cashflow.models import Category, Transaction
+from cashflow.services import create_wallet
+from hr.models import Company
+from .models import StatementLine
+from .services import import_statement
+
+
+class StatementTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'pw12345678')
+        self.company = Company.objects.create(name='Компания', subdomain='acme', owner=self.user)
+        self.wallet = create_wallet(self.company, 'Банк')
+        self.income = Category.objects.create(company=self.company, name='Продажи', operation_type='income')
+        self.expense = Category.objects.create(company=self.company, name='Закупки', operation_type='expense')
+
+    def add(self, amount, day, category=None):
+        return Transaction.objects.create(
+            company=self.company, wallet=self.wallet, category=category or self.income,
+            amount=Decimal(amount), date=day
+        )
+
+    def import_csv(self, rows):
+        content = 'date,amount\n' + ''.join(f'{day.isoformat()},{amount}\n' for day, amount in rows)
+        return import_statement(self.company, self.wallet, content, tolerance_days=2)
+
+
+class MatchStatementTests(StatementTestCase):
+    def test_unique_candidate_is_matched_and_ambiguous_goes_to_review(self):
+        day = date.today() - timedelta(days=5)
+        sale = self.add('100', day + timedelta(days=1))
+        # Две одинаковые закупки в окне дат — строки выписки не различить
+        self.add('50', day, category=self.expense)
+        self.add('50', day + timedelta(days=1), category=self.expense)
+
+        stats = self.import_csv([(day, '100'), (day, '-50'), (day + timedelta(days=1), '-50'), (day, '7')])
+
+        self.assertEqual(
+            {key: stats[key] for key in ('matched', 'review', 'unmatched')},
+            {'matched': 1, 'review': 2, 'unmatched': 1},
+        )
+        lines = {line.line_number: line for line in StatementLine.objects.all()}
+        self.assertEqual(lines[1].transaction_id, sale.pk)
+        self.assertEqual(len(lines[2].candidate_ids), 2)
+        self.assertIsNone(lines[3].transaction_id)
+
+    def test_direction_must_match(self):
+        day = date.today() - timedelta(days=5)
+        self.add('30', day, category=self.expense)
+
+        stats = self.import_csv([(day, '30')])
+
+        self.assertEqual(stats['unmatched'], 1)
@@ -0,0 +1,11 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .api import BankStatementViewSet, StatementLineViewSet
+
+router = DefaultRouter()
+router.register(r'statements', BankStatementViewSet, basename='bank-statement')
+router.register(r'lines', StatementLineViewSet, basename='statement-line')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
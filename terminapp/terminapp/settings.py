@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 import os
 import environ
+from corsheaders.defaults import default_headers
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -40,6 +41,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'orders',
     'products',
     'cashflow',
@@ -53,6 +55,9 @@ INSTALLED_APPS = [
     'hr',
     'hero',
     'admin_restrict',
+    'idempotency',
+    'statements',
+    'jobs',
 ]
 
 REST_FRAMEWORK = {
@@ -101,6 +106,8 @@ MIDDLEWARE = [
 ]
 
 CORS_ALLOW_ALL_ORIGINS = True
+# Повторы POST с терминалов (idempotency.api.IdempotentCreateMixin)
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 ROOT_URLCONF = 'terminapp.urls'
 
@@ -133,6 +140,13 @@ DATABASES = {
     }
 }
 
+# Общий кэш воркеров (версия справочников cashflow.reference, cache_page аналитики).
+# При нескольких процессах укажите разделяемый бэкенд, например
+# CACHE_URL=rediscache://redis:6379/1 или CACHE_URL=dbcache://django_cache
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
 
 
 # Password validation
@@ -154,6 +168,30 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Почта (письма отправляет фоновый воркер, см. hr.send_invitation_email)
+EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = env('EMAIL_HOST', default='localhost')
+EMAIL_PORT = env.int('EMAIL_PORT', default=25)
+EMAIL_HOST_USER = env('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = env.bool('EMAIL_USE_TLS', default=False)
+DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default=f'noreply@{DOMAIN}')
+
+# Фоновые задачи (jobs): воркер — manage.py runworker.
+# Периодические задачи: имя -> задача, расписание cron (TIME_ZONE) и аргументы.
+JOBS_PERIODIC = {
+    # Отчёты пересчитываются сразу после создания/изменения (analytics.compute_report);
+    # периодический проход догоняет отчёты, устаревшие после изменения данных
+    'analytics.compute_reports': {'task': 'analytics.compute_reports', 'cron': '*/15 * * * *'},
+    'cashflow.generate_recurring_transactions': {'task': 'cashflow.generate_recurring_transactions', 'cron': '5 0 * * *'},
+    'cashflow.create_balance_checkpoints': {'task': 'cashflow.create_balance_checkpoints', 'cron': '20 0 * * *'},
+    'cashflow.ensure_partitions': {'task': 'cashflow.ensure_partitions', 'cron': '30 0 * * *'},
+    'hr.expire_invitations': {'task': 'hr.expire_invitations', 'cron': '0 * * * *'},
+    'idempotency.purge_expired_keys': {'task': 'idempotency.purge_expired_keys', 'cron': '15 * * * *'},
+    'jobs.purge_finished_jobs': {'task': 'jobs.purge_finished_jobs', 'cron': '45 3 * * *'},
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
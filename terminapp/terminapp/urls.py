@@ -33,5 +33,6 @@ urlpatterns = [
     path('api/products/', include('products.urls')),
     path('api/cashflow/', include('cashflow.urls')),
     path('api/analytics/', include('analytics.urls')),
+    path('api/statements/', include('statements.urls')),
 
 ]
\ No newline at end of file